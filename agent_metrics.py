@@ -0,0 +1,144 @@
+"""
+Pure metric-building helpers shared by ZendeskClient and AsyncZendeskClient.
+They only transform data the clients already fetched and never call the API.
+"""
+
+from datetime import datetime, timezone
+
+POSITIVE_SCORES = ('good', 'great')
+NEGATIVE_SCORES = ('bad', 'not_good')
+
+
+def build_weekly_metrics(user, agent_email, tickets):
+    """Build the base metrics dict from an agent's tickets of the last week"""
+    metrics = {
+        'total_tickets': len(tickets),
+        'urgent_tickets': [],
+        'on_hold_tickets': [],
+        'solved_tickets': 0,
+        'internal_comments': 0,
+        'external_comments': 0,
+        'agent_name': user.get('name', 'Unknown'),
+        'agent_email': agent_email,
+        'old_tickets': [],
+        'positive_csat': [],
+        'negative_csat': [],
+        'sla_breaches': []
+    }
+
+    for ticket in tickets:
+        # Count solved tickets
+        if ticket.get('status') == 'solved':
+            metrics['solved_tickets'] += 1
+
+        # Track urgent tickets
+        if ticket.get('priority') == 'urgent':
+            metrics['urgent_tickets'].append({
+                'id': ticket['id'],
+                'subject': ticket.get('subject', 'No subject'),
+                'status': ticket.get('status'),
+                'url': ticket.get('url')
+            })
+
+        # Track on-hold tickets
+        if ticket.get('status') == 'hold':
+            metrics['on_hold_tickets'].append({
+                'id': ticket['id'],
+                'subject': ticket.get('subject', 'No subject'),
+                'url': ticket.get('url')
+            })
+
+    return metrics
+
+
+def format_old_tickets(tickets):
+    """Shape aged tickets for the report"""
+    return [{
+        'id': ticket['id'],
+        'subject': ticket.get('subject', 'No subject'),
+        'status': ticket.get('status'),
+        'priority': ticket.get('priority'),
+        'created_at': ticket.get('created_at'),
+        'url': ticket.get('url')
+    } for ticket in tickets]
+
+
+def count_author_comments(user_id, comment_lists):
+    """Return (external, internal) counts of user_id's comments across tickets"""
+    external = 0
+    internal = 0
+    for comments in comment_lists:
+        for comment in comments or []:
+            if comment.get('author_id') == user_id:
+                if comment.get('public', True):
+                    external += 1
+                else:
+                    internal += 1
+    return external, internal
+
+
+def csat_entry(ticket, rating, positive=True):
+    """Return the report entry for a rated ticket, or None if it doesn't match"""
+    if not rating:
+        return None
+    score = rating.get('score')
+
+    # Determine if this is positive or negative rating
+    is_positive = score in POSITIVE_SCORES
+    is_negative = score in NEGATIVE_SCORES
+
+    if (positive and is_positive) or (not positive and is_negative):
+        return {
+            'id': ticket['id'],
+            'subject': ticket.get('subject', 'No subject'),
+            'score': score,
+            'comment': rating.get('comment', ''),
+            'url': ticket.get('url')
+        }
+    return None
+
+
+def sla_breach(ticket, slas, now=None):
+    """Return the first breached SLA metric from a ticket's side-loaded `slas`, or None
+
+    Active and paused metrics are breached once `breach_at` has passed and
+    the breach time runs until now. An achieved metric is only a breach if
+    it was fulfilled after `breach_at`; without a fulfilment time it can't
+    be told apart from one met on time, so it isn't reported.
+    """
+    now = now or datetime.now(timezone.utc)
+    for metric in (slas or {}).get('policy_metrics', []):
+        breach_at = _parse_timestamp(metric.get('breach_at'))
+        if not breach_at or breach_at > now:
+            continue
+
+        if metric.get('stage') == 'achieved':
+            fulfilled_at = _parse_timestamp(metric.get('fulfilled_at'))
+            if not fulfilled_at or fulfilled_at <= breach_at:
+                continue
+            breach_minutes = int((fulfilled_at - breach_at).total_seconds() / 60)
+        else:
+            breach_minutes = int((now - breach_at).total_seconds() / 60)
+        return breach_entry(ticket, metric.get('metric'), breach_minutes)
+    return None
+
+
+def _parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def breach_entry(ticket, metric_name, breach_minutes):
+    """Shape an SLA breach for the report"""
+    return {
+        'id': ticket['id'],
+        'subject': ticket.get('subject', 'No subject'),
+        'metric': metric_name,
+        'breach_minutes': breach_minutes,
+        'breach_hours': round(breach_minutes / 60, 1) if breach_minutes > 60 else 0,
+        'url': ticket.get('url')
+    }
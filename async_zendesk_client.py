@@ -0,0 +1,412 @@
+import asyncio
+import base64
+import json
+import time
+import aiohttp
+from config import ZENDESK_POOL_MAXSIZE, ZENDESK_MAX_CONCURRENCY
+from rate_limiter import RETRYABLE_STATUS_CODES
+from ticket_planner import AgentTicketSet, plan_agent_searches
+from agent_metrics import (
+    build_weekly_metrics, format_old_tickets, count_author_comments,
+    csat_entry, sla_breach
+)
+from zendesk_client import ZendeskClient, ZendeskAPIError
+
+class AsyncZendeskClient:
+    """asyncio counterpart of ZendeskClient for whole-team runs.
+
+    Exposes the same metric methods as coroutines on top of one pooled
+    aiohttp session, with in-flight requests bounded by a semaphore. It
+    wraps a ZendeskClient and shares its rate-limit governor, user
+    directory, endpoint capabilities, HTTP cache and ticket sets, so both
+    clients draw on one budget. Shared bulk listings (CSAT index, comment
+    stream, ticket store) are read through the wrapped client; the searches
+    and per-ticket requests run on the event loop, so every section of
+    every agent's report is fetched concurrently.
+
+    Usage:
+        async with AsyncZendeskClient(client) as async_client:
+            results = await async_client.get_team_metrics(['a@example.com', 'b@example.com'])
+    """
+
+    # Logging and raising are identical to the threaded client
+    _raise_on_failures = ZendeskClient._raise_on_failures
+
+    def __init__(self, client, pool_maxsize=None, max_concurrency=None):
+        self.client = client
+        self.pool_maxsize = pool_maxsize or ZENDESK_POOL_MAXSIZE
+        self.max_concurrency = max_concurrency or ZENDESK_MAX_CONCURRENCY
+        self._session = None
+        self._semaphore = None
+        self._connection_checked = False
+        self._ticket_set_tasks = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Close the pooled aiohttp session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _get_session(self):
+        # The session and semaphore must be created inside the running event loop
+        if self._session is None or self._session.closed:
+            credentials = base64.b64encode(':'.join(self.client.auth).encode('utf-8')).decode('ascii')
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_maxsize, keepalive_timeout=60),
+                headers=dict(self.client.headers, Authorization=f"Basic {credentials}"),
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def _make_request(self, endpoint, params=None):
+        """Make authenticated request to Zendesk API
+
+        Same contract as ZendeskClient._make_request: the JSON body, None
+        for a rejected request, and ZendeskAPIError once 429/5xx retries
+        are exhausted.
+        """
+        client = self.client
+        if not self._connection_checked and endpoint != 'users/me.json':
+            await asyncio.to_thread(client.ensure_connection)
+            self._connection_checked = True
+
+        # Endpoints this account doesn't support are skipped without a request
+        if client.capabilities.is_unsupported(endpoint, params):
+            return None
+
+        cache_key = None
+        cached = None
+        request_headers = None
+        if client.http_cache is not None and client.http_cache.is_cacheable(endpoint, params):
+            cache_key = client.http_cache.key(endpoint, params)
+            cached = client.http_cache.lookup(cache_key)
+            if cached:
+                request_headers = {'If-None-Match': cached[0]}
+
+        url = f"{client.base_url}/{endpoint}"
+        query = {key: str(value) for key, value in (params or {}).items()}
+        session = self._get_session()
+        governor = client.governor
+        deadline = time.monotonic() + governor.retry_budget
+        attempt = 0
+        while True:
+            wait = governor.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            status_code = None
+            response_headers = None
+            try:
+                async with self._semaphore:
+                    async with session.get(url, params=query, headers=request_headers) as response:
+                        governor.observe(response.status, response.headers)
+                        if response.status not in RETRYABLE_STATUS_CODES:
+                            return await self._read_response(endpoint, params, response, cache_key, cached)
+                        status_code = response.status
+                        response_headers = response.headers
+                        reason = f"HTTP {status_code}"
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                reason = type(e).__name__
+
+            delay = governor.retry_delay(attempt, status_code, response_headers)
+            if attempt >= governor.max_retries or time.monotonic() + delay > deadline:
+                raise ZendeskAPIError(endpoint, reason, attempt + 1)
+
+            print(f"⏳ Zendesk {reason} on {endpoint} - retrying in {delay:.1f}s "
+                  f"({attempt + 1}/{governor.max_retries})")
+            governor.record_retry()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _read_response(self, endpoint, params, response, cache_key, cached):
+        """Turn a final (non-retryable) response into a body or None, updating the HTTP cache"""
+        http_cache = self.client.http_cache
+        if response.status == 304 and cached:
+            http_cache.record_hit(cache_key)
+            return cached[1]
+        if response.status >= 400:
+            text = await response.text()
+            try:
+                details = f"Error Details: {json.loads(text)}"
+            except ValueError:
+                details = f"Response Text: {text}"
+            self.client.record_failed_request(endpoint, params, response.status, 'HTTPError', details)
+            return None
+        try:
+            body = await response.json(content_type=None)
+        except ValueError as e:
+            self.client.record_failed_request(endpoint, params, response.status, type(e).__name__)
+            return None
+        etag = response.headers.get('ETag')
+        if cache_key and etag:
+            http_cache.store(cache_key, etag, body, revalidated=cached is not None)
+        return body
+
+    async def _paginate(self, endpoint, items_key, params=None, page_size=100):
+        """Yield items from a cursor-paginated list endpoint, page by page
+
+        Nothing is yielded if the first page isn't available; a later page
+        that fails raises ZendeskAPIError.
+        """
+        params = dict(params or {})
+        params['page[size]'] = page_size
+        while True:
+            result = await self._make_request(endpoint, params)
+            if not result:
+                if 'page[after]' in params:
+                    raise ZendeskAPIError(endpoint, 'a continuation page failed', 1)
+                return
+            for item in result.get(items_key, []):
+                yield item
+            meta = result.get('meta', {})
+            if not meta.get('has_more') or not meta.get('after_cursor'):
+                return
+            params['page[after]'] = meta['after_cursor']
+
+    async def map_concurrently(self, func, items):
+        """Await func(item) for every item on the event loop
+
+        Returns one dict per item, in input order, with either 'result' or
+        'error' set, like ZendeskClient.map_concurrently. The semaphore in
+        _make_request caps how many requests are in flight.
+        """
+        items = list(items)
+        results = await asyncio.gather(*(func(item) for item in items), return_exceptions=True)
+        outcomes = []
+        for item, result in zip(items, results):
+            if isinstance(result, Exception):
+                outcomes.append({'item': item, 'result': None, 'error': result})
+            else:
+                outcomes.append({'item': item, 'result': result, 'error': None})
+        return outcomes
+
+    async def fetch_many(self, endpoints):
+        """GET several endpoints concurrently; results come back in input order"""
+        return await self.map_concurrently(self._make_request, endpoints)
+
+    async def get_user_by_email(self, email):
+        """Find user by email address (served from the shared user directory)"""
+        return await asyncio.to_thread(self.client.get_user_by_email, email)
+
+    async def iter_search(self, query, max_results=None, page_size=100, object_type='ticket'):
+        """Stream search results from the export endpoint, reading one page ahead
+
+        A page after the first that fails raises ZendeskAPIError.
+        """
+        if max_results is not None:
+            page_size = max(1, min(page_size, max_results))
+        params = {'query': query, 'filter[type]': object_type, 'page[size]': page_size}
+
+        next_page = asyncio.ensure_future(self._make_request('search/export.json', dict(params)))
+        yielded = 0
+        try:
+            while next_page is not None:
+                result = await next_page
+                next_page = None
+                if not result:
+                    if 'page[after]' in params:
+                        raise ZendeskAPIError('search/export.json', 'a continuation page failed', 1)
+                    return
+
+                results = result.get('results', [])
+                meta = result.get('meta', {})
+                wants_more = max_results is None or yielded + len(results) < max_results
+                if meta.get('has_more') and meta.get('after_cursor') and wants_more:
+                    params['page[after]'] = meta['after_cursor']
+                    next_page = asyncio.ensure_future(self._make_request('search/export.json', dict(params)))
+
+                for item in results:
+                    yield item
+                    yielded += 1
+                    if max_results is not None and yielded >= max_results:
+                        return
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def _search_tickets(self, query, max_results=None):
+        """Run a ticket search and return every matching ticket"""
+        return [ticket async for ticket in self.iter_search(query, max_results=max_results)]
+
+    async def get_agent_ticket_set(self, agent_email, max_age_seconds=300):
+        """Fetch an agent's tickets once with the planned searches and reuse them
+
+        A ticket set the wrapped client already holds (from a snapshot or an
+        earlier report) is reused. Concurrent callers for the same agent
+        share a single in-flight fetch.
+        """
+        user = await self.get_user_by_email(agent_email)
+        if not user:
+            return None
+
+        user_id = user['id']
+        cached = self.client.cached_ticket_set(user_id, max_age_seconds)
+        if cached:
+            return cached
+
+        task = self._ticket_set_tasks.get(user_id)
+        if task is None or task.done():
+            task = asyncio.ensure_future(self._fetch_ticket_set(user_id))
+            self._ticket_set_tasks[user_id] = task
+        # Shielded so one section timing out doesn't cancel the fetch the others wait on
+        return await asyncio.shield(task)
+
+    async def _fetch_ticket_set(self, user_id):
+        results = await asyncio.gather(*(self._search_tickets(query) for query in plan_agent_searches(user_id)))
+        tickets = [ticket for result in results for ticket in result]
+        return self.client.store_ticket_set(AgentTicketSet(user_id, tickets))
+
+    async def get_agent_tickets_last_week(self, agent_email):
+        """Get tickets assigned to agent in the last 7 days"""
+        ticket_set = await self.get_agent_ticket_set(agent_email)
+        if not ticket_set:
+            return None
+        return ticket_set.weekly()
+
+    async def get_ticket_comments(self, ticket_id):
+        """Get all comments for a specific ticket"""
+        return [comment async for comment in self._paginate(f'tickets/{ticket_id}/comments.json', 'comments')]
+
+    async def _count_comments(self, user_id, tickets):
+        """Return (external, internal) comment counts on the given tickets
+
+        Uses the wrapped client's shared comment stream, and one comments
+        request per ticket only while the stream is unavailable.
+        """
+        ticket_ids = [ticket['id'] for ticket in tickets]
+        activity = await asyncio.to_thread(self.client.get_comment_activity)
+        if activity is not None:
+            return activity.counts_for(user_id, ticket_ids)
+
+        outcomes = await self.map_concurrently(self.get_ticket_comments, ticket_ids)
+        self._raise_on_failures('ticket comments', outcomes)
+        return count_author_comments(user_id, [outcome['result'] for outcome in outcomes])
+
+    async def get_agent_performance_metrics(self, agent_email):
+        """Get comprehensive performance metrics for an agent
+
+        The aged, CSAT, SLA and comment sections run concurrently. With the
+        ticket store every section is answered locally, so the wrapped
+        client builds the report.
+        """
+        if await asyncio.to_thread(self.client.sync_ticket_store):
+            return await asyncio.to_thread(self.client.get_agent_performance_metrics, agent_email)
+
+        tickets = await self.get_agent_tickets_last_week(agent_email)
+        if not tickets:
+            return None
+
+        user = await self.get_user_by_email(agent_email)
+        if not user:
+            return None
+
+        metrics = build_weekly_metrics(user, agent_email, tickets)
+        sections = await asyncio.gather(
+            self.get_old_tickets(agent_email),
+            self.get_csat_tickets(agent_email, positive=True),
+            self.get_csat_tickets(agent_email, positive=False),
+            self.get_sla_breach_tickets(agent_email),
+            self._count_comments(user.get('id'), tickets),
+            return_exceptions=True
+        )
+        # Every section is waited for, then the first failure fails the report
+        for section in sections:
+            if isinstance(section, Exception):
+                raise section
+        (
+            metrics['old_tickets'],
+            metrics['positive_csat'],
+            metrics['negative_csat'],
+            metrics['sla_breaches'],
+            (metrics['external_comments'], metrics['internal_comments'])
+        ) = sections
+        return metrics
+
+    async def get_team_metrics(self, agent_emails, timeout_seconds=None):
+        """Build several agents' reports concurrently
+
+        Returns {agent_email: metrics}; an agent whose report failed or ran
+        past timeout_seconds maps to the exception instead, so the caller
+        can tell an outage (ZendeskAPIError) from missing metrics (None).
+        """
+        async def build(agent_email):
+            if timeout_seconds:
+                return await asyncio.wait_for(self.get_agent_performance_metrics(agent_email), timeout_seconds)
+            return await self.get_agent_performance_metrics(agent_email)
+
+        agent_emails = list(agent_emails)
+        results = await asyncio.gather(*(build(email) for email in agent_emails), return_exceptions=True)
+        return dict(zip(agent_emails, results))
+
+    async def get_old_tickets(self, agent_email):
+        """Get tickets assigned to agent that are over 2 weeks old"""
+        ticket_set = await self.get_agent_ticket_set(agent_email)
+        if not ticket_set:
+            return []
+        return format_old_tickets(ticket_set.aged())
+
+    async def get_csat_tickets(self, agent_email, positive=True):
+        """Get tickets with CSAT ratings (positive or negative) in the last week"""
+        ticket_set = await self.get_agent_ticket_set(agent_email)
+        if not ticket_set:
+            return []
+
+        # Tickets solved by this agent in the last week
+        tickets = ticket_set.solved_recently()
+        index = await asyncio.to_thread(self.client.get_csat_index)
+        if index is not None:
+            ratings = [index.rating_for(ticket['id']) for ticket in tickets]
+        else:
+            outcomes = await self.fetch_many([f'tickets/{ticket["id"]}/satisfaction_rating.json' for ticket in tickets])
+            self._raise_on_failures('satisfaction rating', outcomes)
+            ratings = [(outcome['result'] or {}).get('satisfaction_rating') for outcome in outcomes]
+
+        csat_tickets = []
+        for ticket, rating in zip(tickets, ratings):
+            entry = csat_entry(ticket, rating, positive)
+            if entry:
+                csat_tickets.append(entry)
+        return csat_tickets
+
+    async def get_ticket_slas(self, ticket_ids):
+        """Get side-loaded SLA state for tickets, 100 per show_many request, chunks concurrently
+
+        Returns {ticket_id: slas}; tickets without SLA policies map to {}.
+        """
+        ticket_ids = list(ticket_ids)
+        chunks = [ticket_ids[i:i + 100] for i in range(0, len(ticket_ids), 100)]
+        outcomes = await self.map_concurrently(self._show_many_with_slas, chunks)
+        self._raise_on_failures('ticket SLA', outcomes)
+
+        slas = {}
+        for outcome in outcomes:
+            for ticket in (outcome['result'] or {}).get('tickets', []):
+                slas[ticket['id']] = ticket.get('slas') or {}
+        return slas
+
+    async def _show_many_with_slas(self, ticket_ids):
+        params = {'ids': ','.join(str(ticket_id) for ticket_id in ticket_ids), 'include': 'slas'}
+        return await self._make_request('tickets/show_many.json', params)
+
+    async def get_sla_breach_tickets(self, agent_email):
+        """Get tickets with SLA breaches for an agent"""
+        ticket_set = await self.get_agent_ticket_set(agent_email)
+        if not ticket_set:
+            return []
+
+        # Tickets assigned to this agent and updated in the last week
+        tickets = ticket_set.recently_updated()
+        slas = await self.get_ticket_slas(ticket['id'] for ticket in tickets)
+
+        breach_tickets = []
+        for ticket in tickets:
+            breach = sla_breach(ticket, slas.get(ticket['id']))
+            if breach:
+                breach_tickets.append(breach)
+        return breach_tickets
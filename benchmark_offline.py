@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark against recorded Zendesk, Google Calendar and Slack responses
+
+A local stand-in server replays the fixtures in benchmark_fixtures/, with
+optional added latency and injected 429s. Each scenario runs in a fresh
+process with an empty cache directory and reports wall time, API calls per
+endpoint and peak memory (tracemalloc). The results are compared with
+benchmark_fixtures/baseline.json. A different call count on any endpoint
+(a new N+1 pattern, a lost cache), or a request no fixture answers, fails
+the run. Wall time and peak memory beyond the tolerance fail it as well,
+when the run used the baseline's latency and 429 settings.
+
+Each fixture file is {"recorded_at": ..., "responses": [...]} with one entry
+per request: method, path relative to the service root, params (null matches
+any) and the status and body that came back. Timestamps in the bodies are
+moved forward by the time since recorded_at, and dates and Unix times in
+request params are masked before matching, so the recordings don't go stale.
+"""
+
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_fixtures')
+BASELINE_PATH = os.path.join(FIXTURES_DIR, 'baseline.json')
+
+# Service -> URL prefix on the stand-in server; each has a <service>.json fixture file
+SERVICES = {'zendesk': 'zendesk/api/v2/', 'google': 'google/', 'slack': 'slack/'}
+# Only clients that retry 429s get them injected; a Calendar 429 just fails the check
+RATE_LIMITED_SERVICES = ('zendesk', 'slack')
+
+# The team lead's calendar is the first one the bot tries (ZENDESK_EMAIL)
+LEAD_EMAIL = 'team-lead@example.com'
+
+_TIMESTAMP_RE = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$')
+_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}(?:T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:\d{2})?)?')
+_UNIX_TIME_RE = re.compile(r'^\d{10}$')
+# Numeric IDs and calendar IDs (emails) in a path are grouped into one endpoint
+_ID_SEGMENT_RE = re.compile(r'^(?:\d+|[^/]+@[^/]+)$')
+
+
+def load_fixtures(now=None):
+    """Load every service's recorded responses, shifted so they were recorded `now`"""
+    now = now or datetime.now(timezone.utc)
+    fixtures = {}
+    for service in SERVICES:
+        with open(os.path.join(FIXTURES_DIR, f'{service}.json'), 'r') as f:
+            recording = json.load(f)
+        recorded_at = datetime.strptime(recording['recorded_at'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+        delta = int((now - recorded_at).total_seconds())
+        index = {}
+        for entry in recording['responses']:
+            entry = dict(entry, body=_shift(entry['body'], delta))
+            index.setdefault((entry['method'], entry['path']), []).append(entry)
+        fixtures[service] = index
+    return fixtures
+
+
+def _shift(value, seconds):
+    """Move recorded timestamps forward: ISO strings, and Unix times in *_time and timestamp fields"""
+    if isinstance(value, dict):
+        return {key: _shift_field(key, item, seconds) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shift(item, seconds) for item in value]
+    if isinstance(value, str) and _TIMESTAMP_RE.match(value):
+        shifted = datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ') + timedelta(seconds=seconds)
+        return shifted.strftime('%Y-%m-%dT%H:%M:%SZ')
+    return value
+
+
+def _shift_field(key, value, seconds):
+    if (key.endswith('_time') or key == 'timestamp') and type(value) is int:
+        return value + seconds
+    return _shift(value, seconds)
+
+
+def normalize_params(pairs):
+    """Request params as fixtures record them: dates and Unix times masked, `ids` sorted"""
+    params = {}
+    for key, value in pairs:
+        if key == 'ids':
+            value = ','.join(sorted(value.split(','), key=lambda ticket_id: (len(ticket_id), ticket_id)))
+        elif _UNIX_TIME_RE.match(value):
+            value = '{time}'
+        else:
+            value = _DATE_RE.sub('{date}', value)
+        params[key] = value
+    return params
+
+
+def endpoint_label(service, method, path):
+    segments = ['{id}' if _ID_SEGMENT_RE.match(segment) else segment for segment in path.split('/')]
+    return f"{service} {method} {'/'.join(segments)}"
+
+
+class StandInServer:
+    """Local HTTP server replaying recorded responses, with added latency and injected 429s
+
+    Counts per endpoint: calls answered from a fixture, 429s injected, and
+    requests no fixture matched (answered with a 404).
+    """
+
+    def __init__(self, fixtures, latency_seconds=0.0, inject_429_every=0, retry_after=1):
+        self.fixtures = fixtures
+        self.latency_seconds = latency_seconds
+        self.inject_429_every = inject_429_every
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._messages = 0
+        self.counts = self._new_counts()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stand-in-server', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def take_counts(self):
+        """Return the counts since the last call and start new ones"""
+        with self._lock:
+            counts, self.counts = self.counts, self._new_counts()
+        return counts
+
+    @staticmethod
+    def _new_counts():
+        return {'calls': {}, 'rate_limited': {}, 'unmatched': {}}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self, 'GET')
+
+            def do_POST(self):
+                server.handle(self, 'POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, request, method):
+        length = int(request.headers.get('Content-Length') or 0)
+        if length:
+            request.rfile.read(length)
+        url = urlsplit(request.path)
+        route = unquote(url.path).lstrip('/')
+        service = next((name for name, prefix in SERVICES.items() if route.startswith(prefix)), None)
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if service is None:
+            self._respond(request, 404, {'error': 'unknown service'})
+            return
+
+        path = route[len(SERVICES[service]):]
+        params = normalize_params(parse_qsl(url.query, keep_blank_values=True))
+        entry = None
+        for candidate in self.fixtures[service].get((method, path), []):
+            if candidate['params'] is None or candidate['params'] == params:
+                entry = candidate
+                break
+
+        label = endpoint_label(service, method, path)
+        with self._lock:
+            self._requests += 1
+            throttled = (self.inject_429_every and service in RATE_LIMITED_SERVICES
+                         and self._requests % self.inject_429_every == 0)
+            bucket = 'rate_limited' if throttled else 'calls' if entry else 'unmatched'
+            self.counts[bucket][label] = self.counts[bucket].get(label, 0) + 1
+            self._messages += 1
+            message_number = self._messages
+
+        if throttled:
+            body = {'ok': False, 'error': 'ratelimited'} if service == 'slack' else {'error': 'APIRateLimitExceeded'}
+            self._respond(request, 429, body, {'Retry-After': str(self.retry_after)})
+        elif entry is None:
+            self._respond(request, 404, {'error': 'no recorded response', 'path': path, 'params': params})
+        else:
+            body = entry['body']
+            if service == 'slack' and 'ts' in body:
+                # Slack identifies messages by ts, so each post needs its own
+                body = dict(body, ts=f"{int(time.time())}.{message_number:06d}")
+            self._respond(request, entry['status'], body)
+
+    def _respond(self, request, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json; charset=utf-8')
+        request.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(payload)
+
+
+def _service_account_json(token_uri):
+    """Base64 service-account credentials with a throwaway key, getting tokens from the stand-in"""
+    try:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        private_key = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode('ascii')
+    except ImportError:
+        # Older google-auth releases sign with the pure-Python rsa package instead
+        import rsa
+        private_key = rsa.newkeys(2048)[1].save_pkcs1().decode('ascii')
+    info = {
+        'type': 'service_account',
+        'project_id': 'benchmark',
+        'private_key_id': 'benchmark',
+        'private_key': private_key,
+        'client_email': 'benchmark@benchmark.iam.gserviceaccount.com',
+        'client_id': '1',
+        'token_uri': token_uri
+    }
+    return base64.b64encode(json.dumps(info).encode('utf-8')).decode('ascii')
+
+
+def _discovery_document(root_url, directory):
+    """Calendar discovery document pointing at the stand-in; returns its path"""
+    from googleapiclient.discovery_cache import get_static_doc
+    document = json.loads(get_static_doc('calendar', 'v3'))
+    document['rootUrl'] = root_url
+    document['baseUrl'] = root_url + document['servicePath']
+    path = os.path.join(directory, 'calendar_v3.json')
+    with open(path, 'w') as f:
+        json.dump(document, f)
+    return path
+
+
+def agent_emails():
+    """Agents with recorded user lookups, in fixture order"""
+    with open(os.path.join(FIXTURES_DIR, 'zendesk.json'), 'r') as f:
+        responses = json.load(f)['responses']
+    return [user['email'] for entry in responses if entry['path'] == 'users/search.json'
+            for user in entry['body']['users']]
+
+
+def scenario_check():
+    """The cron job: find 1on1s in the window, build every report and deliver it to Slack"""
+    from github_actions_runner import GitHubActionsRunner
+    runner = GitHubActionsRunner()
+    ok = runner.check_for_upcoming_meetings()
+    runner.flush_slack()
+    return ok
+
+
+def scenario_metrics():
+    """Metrics for every recorded agent, one after another on one Zendesk client"""
+    from zendesk_client import ZendeskClient
+    client = ZendeskClient()
+    try:
+        return all(client.get_agent_performance_metrics(email) for email in agent_emails())
+    finally:
+        client.close()
+
+
+def scenario_watch():
+    """Calendar push mode: a notification triggers a sync and every 1on1 is reported exactly once
+
+    The receiver listens on a free local port and gets its notifications
+    from send_test_notification(). A second notification syncs again and
+    must not fire any meeting a second time.
+    """
+    from github_actions_runner import GitHubActionsRunner
+    from calendar_watch import NotificationReceiver, MeetingScheduler, send_test_notification
+    from config import CALENDAR_WATCH_SCHEDULE_HOURS
+
+    runner = GitHubActionsRunner()
+    fired = {}
+    cond = threading.Condition()
+
+    def report(meeting):
+        try:
+            runner.process_meeting_once(meeting)
+        finally:
+            with cond:
+                fired[meeting['agent_email']] = fired.get(meeting['agent_email'], 0) + 1
+                cond.notify_all()
+
+    # The recorded 1on1s all start within the hour, so each one fires on the first sync
+    scheduler = MeetingScheduler(report, lead_minutes=60)
+    receiver = NotificationReceiver(
+        lambda: scheduler.schedule(runner.calendar_monitor.get_upcoming_1on1s(CALENDAR_WATCH_SCHEDULE_HOURS)),
+        'benchmark-watch-token', host='127.0.0.1', port=0
+    )
+    receiver.start()
+    url = f"http://127.0.0.1:{receiver.port}{receiver.path}"
+    expected = set(agent_emails())
+    try:
+        if send_test_notification(url, 'wrong-token') != 403:
+            raise RuntimeError("notification with a wrong token was accepted")
+        if send_test_notification(url, 'benchmark-watch-token') != 200:
+            raise RuntimeError("notification was rejected")
+        with cond:
+            if not cond.wait_for(lambda: set(fired) >= expected, timeout=120):
+                raise RuntimeError(f"reports fired for {sorted(fired)}, expected {sorted(expected)}")
+
+        send_test_notification(url, 'benchmark-watch-token')
+        deadline = time.monotonic() + 30
+        while receiver.stats['syncs'] < 2:
+            if time.monotonic() > deadline:
+                raise RuntimeError("second notification did not trigger a sync")
+            time.sleep(0.05)
+        with cond:
+            # A meeting scheduled again would fire right away; give its timer a moment
+            cond.wait_for(lambda: any(count > 1 for count in fired.values()), timeout=0.5)
+        if scheduler.pending() or any(count != 1 for count in fired.values()):
+            raise RuntimeError(f"meetings fired more than once: {fired}, pending {scheduler.pending()}")
+    finally:
+        receiver.stop()
+        scheduler.cancel_all()
+        runner.flush_slack()
+    return True
+
+
+SCENARIOS = {'check': scenario_check, 'metrics': scenario_metrics, 'watch': scenario_watch}
+
+
+def _run_scenario(name, env, verbose, results):
+    """Child process entry point: configure, import, then time and trace one scenario"""
+    os.environ.update(env)
+    if not verbose:
+        sys.stdout = open(os.devnull, 'w')
+    # Imported before timing so module loading isn't measured
+    import github_actions_runner  # noqa: F401
+    import zendesk_client  # noqa: F401
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        ok = bool(SCENARIOS[name]())
+        error = None
+    except Exception as e:
+        ok = False
+        error = f"{type(e).__name__}: {e}"
+    wall_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.put({'ok': ok, 'error': error, 'wall_seconds': wall_seconds, 'peak_memory_kb': peak // 1024})
+
+
+def run_scenario(name, server, env, verbose=False, timeout=300):
+    """Run one scenario in a fresh process with its own empty cache directory"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    with tempfile.TemporaryDirectory(prefix='benchmark-cache-') as cache_dir:
+        process = context.Process(
+            target=_run_scenario, args=(name, dict(env, BOT_CACHE_DIR=cache_dir), verbose, results)
+        )
+        process.start()
+        try:
+            result = results.get(timeout=timeout)
+        except Exception:
+            result = {'ok': False, 'error': f"no result within {timeout}s", 'wall_seconds': None, 'peak_memory_kb': None}
+        process.join(10)
+        if process.is_alive():
+            process.terminate()
+    # Background Slack delivery has been flushed by now, so every request is counted
+    result.update(server.take_counts())
+    return result
+
+
+def compare(name, result, baseline, same_options, time_tolerance, memory_tolerance):
+    """Regressions of one scenario against its baseline, as messages"""
+    failures = []
+    if not result['ok']:
+        failures.append(f"{name}: scenario failed{' (' + result['error'] + ')' if result['error'] else ''}")
+    for label, count in sorted(result['unmatched'].items()):
+        failures.append(f"{name}: {count} requests to {label} have no recorded response")
+    if baseline is None:
+        failures.append(f"{name}: no baseline - run with --update-baseline")
+        return failures
+
+    expected = baseline['calls']
+    for label in sorted(set(expected) | set(result['calls'])):
+        count = result['calls'].get(label, 0)
+        if count > expected.get(label, 0):
+            failures.append(f"{name}: {label} called {count} times, baseline {expected.get(label, 0)}")
+        elif count < expected.get(label, 0):
+            failures.append(f"{name}: {label} called {count} times, baseline {expected[label]} "
+                            f"(if this is an improvement, run with --update-baseline)")
+
+    if same_options and result['wall_seconds'] is not None:
+        limit = baseline['wall_seconds'] * (1 + time_tolerance)
+        if result['wall_seconds'] > limit:
+            failures.append(f"{name}: {result['wall_seconds']:.2f}s wall time, baseline "
+                            f"{baseline['wall_seconds']:.2f}s (limit {limit:.2f}s)")
+        limit = baseline['peak_memory_kb'] * (1 + memory_tolerance)
+        if result['peak_memory_kb'] > limit:
+            failures.append(f"{name}: {result['peak_memory_kb']} KB peak memory, baseline "
+                            f"{baseline['peak_memory_kb']} KB (limit {limit:.0f} KB)")
+    return failures
+
+
+def report(name, result, baseline):
+    calls = result['calls']
+    wall = f"{result['wall_seconds']:.2f}s" if result['wall_seconds'] is not None else 'n/a'
+    print(f"\n📊 {name}: {wall} wall, {result['peak_memory_kb'] or 0} KB peak memory, "
+          f"{sum(calls.values())} API calls")
+    expected = (baseline or {}).get('calls', {})
+    for label in sorted(set(calls) | set(expected) | set(result['rate_limited'])):
+        line = f"   {label:<48} {calls.get(label, 0):>5}"
+        if baseline is not None:
+            line += f"  (baseline {expected.get(label, 0)})"
+        if result['rate_limited'].get(label):
+            line += f"  +{result['rate_limited'][label]} x 429"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline end-to-end benchmark against recorded API responses')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated scenarios to run')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Latency added to every response')
+    parser.add_argument('--inject-429', type=int, default=0, metavar='N',
+                        help='Answer every Nth Zendesk/Slack request with a 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds on injected 429s')
+    parser.add_argument('--time-tolerance', type=float, default=1.0,
+                        help='Allowed wall time increase over the baseline (1.0 = twice as slow)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.5,
+                        help='Allowed peak memory increase over the baseline (0.5 = 50%% more)')
+    parser.add_argument('--update-baseline', action='store_true', help='Store this run as the new baseline')
+    parser.add_argument('--verbose', action='store_true', help="Show the bot's own log output")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    options = {'latency_ms': args.latency_ms, 'inject_429': args.inject_429, 'retry_after': args.retry_after}
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r') as f:
+            baseline = json.load(f)
+    same_options = baseline.get('options') == options
+    if baseline and not same_options:
+        print("ℹ️ Latency/429 settings differ from the baseline - only API call counts are compared")
+
+    server = StandInServer(load_fixtures(), latency_seconds=args.latency_ms / 1000,
+                           inject_429_every=args.inject_429, retry_after=args.retry_after)
+    server.start()
+    print(f"⏱️ Offline benchmark: {args.latency_ms:g} ms latency, "
+          f"{'429 on every ' + str(args.inject_429) + ' requests' if args.inject_429 else 'no injected 429s'}")
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='benchmark-') as directory:
+        env = {
+            'SLACK_BOT_TOKEN': 'xoxb-benchmark',
+            'SLACK_CHANNEL_ID': 'CBENCHMARK',
+            'SLACK_API_URL': server.url + SERVICES['slack'],
+            'ZENDESK_SUBDOMAIN': 'example',
+            'ZENDESK_EMAIL': LEAD_EMAIL,
+            'ZENDESK_API_TOKEN': 'benchmark-token',
+            'ZENDESK_API_URL': server.url + SERVICES['zendesk'],
+            'GOOGLE_CREDENTIALS_JSON': _service_account_json(server.url + SERVICES['google'] + 'token'),
+            'CALENDAR_DISCOVERY_DOC': _discovery_document(server.url + SERVICES['google'], directory)
+        }
+        try:
+            for name in names:
+                results[name] = run_scenario(name, server, env, verbose=args.verbose)
+        finally:
+            server.stop()
+
+    scenarios = baseline.get('scenarios', {})
+    failures = []
+    for name in names:
+        report(name, results[name], scenarios.get(name))
+        failures += compare(name, results[name], scenarios.get(name), same_options,
+                            args.time_tolerance, args.memory_tolerance)
+
+    if args.update_baseline:
+        broken = [name for name in names if not results[name]['ok'] or results[name]['unmatched']]
+        if broken:
+            print(f"\n❌ Not updating the baseline: {', '.join(broken)} failed or made unrecorded requests")
+            sys.exit(1)
+        if not same_options:
+            scenarios = {}  # Timings from other settings aren't comparable
+        for name in names:
+            scenarios[name] = {
+                'wall_seconds': round(results[name]['wall_seconds'], 3),
+                'peak_memory_kb': results[name]['peak_memory_kb'],
+                'calls': dict(sorted(results[name]['calls'].items()))
+            }
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump({'options': options, 'scenarios': scenarios}, f, indent=2)
+            f.write('\n')
+        print(f"\n💾 Baseline updated: {BASELINE_PATH}")
+        return
+
+    if failures:
+        print(f"\n❌ {len(failures)} regressions against the baseline:")
+        for failure in failures:
+            print(f"   - {failure}")
+        sys.exit(1)
+    print("\n✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for rendering the 1on1 summary as Slack Block Kit messages
+"""
+
+import argparse
+import time
+from slack_blocks import render_performance_summary
+
+SUBJECTS = (
+    "Login page times out after the latest release",
+    "Refund for order #{i} not received",
+    "Customer jane.doe@example.com can't reach 10.0.0.12 after <upgrade> & reset",
+    "Question about API rate limits",
+    "Invoice PDF shows the wrong VAT number"
+)
+
+def make_metrics(ticket_count):
+    """Synthetic metrics for an agent with `ticket_count` tickets in every list"""
+    tickets = [
+        {
+            'id': 100000 + i,
+            # Every fifth subject contains an email, an IP and mrkdwn characters
+            'subject': SUBJECTS[i % len(SUBJECTS)].format(i=i),
+            'status': 'solved' if i % 3 == 0 else 'open',
+            'priority': ('urgent', 'high', 'normal')[i % 3],
+            'url': f"https://example.zendesk.com/api/v2/tickets/{100000 + i}.json",
+            'score': 'great' if i % 2 else 'good',
+            'comment': f"Thanks! Reach me at customer{i}@example.com",
+            'breach_hours': i % 4,
+            'breach_minutes': 45
+        }
+        for i in range(ticket_count)
+    ]
+    return {
+        'agent_name': 'Jane Agent',
+        'total_tickets': ticket_count,
+        'solved_tickets': ticket_count // 3,
+        'internal_comments': 40,
+        'external_comments': 12,
+        'urgent_tickets': tickets,
+        'on_hold_tickets': tickets,
+        'old_tickets': tickets,
+        'positive_csat': tickets,
+        'negative_csat': tickets,
+        'sla_breaches': tickets
+    }
+
+def benchmark(ticket_count, repeat):
+    metrics = make_metrics(ticket_count)
+    meeting = {'start_time': '2024-01-15T14:00:00Z'}
+    render_performance_summary(metrics, meeting)  # warm up
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        messages = render_performance_summary(metrics, meeting)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    blocks = sum(len(message['blocks']) for message in messages)
+    print(f"  {ticket_count:>6} tickets: {elapsed * 1000:8.2f} ms/render, "
+          f"{len(messages)} message(s), {blocks} blocks")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Slack summary rendering')
+    parser.add_argument('--sizes', default='10,100,1000,10000', help='Comma-separated ticket counts')
+    parser.add_argument('--repeat', type=int, default=20, help='Renders per size')
+    args = parser.parse_args()
+
+    print("⏱️ Slack summary render cost")
+    for size in args.sizes.split(','):
+        benchmark(int(size), args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,61 @@ import os
 import json
 import base64
 import tempfile
-from datetime import datetime, timedelta
-from google.auth.transport.requests import Request
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from google.oauth2.credentials import Credentials
 from google.oauth2.service_account import Credentials as ServiceAccountCredentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 import pytz
-from config import GOOGLE_CREDENTIALS_FILE, GOOGLE_CREDENTIALS_JSON
+from config import (
+    GOOGLE_CREDENTIALS_FILE, GOOGLE_CREDENTIALS_JSON, CALENDAR_DIAGNOSTICS,
+    CALENDAR_INCREMENTAL_SYNC, CALENDAR_SYNC_HORIZON_DAYS, CALENDAR_FULL_SYNC_HOURS,
+    CALENDAR_DISCOVERY_DOC
+)
+from calendar_sync import CalendarSync
+import startup_timing
 
 SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
 
 class CalendarMonitor:
-    def __init__(self):
-        self.service = self._authenticate()
+    def __init__(self, diagnostics=False, incremental_sync=None):
+        # Diagnostics mode adds calendar listings and unfiltered event scans to each check
+        self.diagnostics = diagnostics or CALENDAR_DIAGNOSTICS
+        self._calendar_id = None
+        if incremental_sync is None:
+            incremental_sync = CALENDAR_INCREMENTAL_SYNC
+        # In incremental mode meeting queries are answered from a locally synced copy
+        self.calendar_sync = None
+        if incremental_sync:
+            self.calendar_sync = CalendarSync(CALENDAR_SYNC_HORIZON_DAYS, CALENDAR_FULL_SYNC_HOURS)
+            self._calendar_id = self.calendar_sync.calendar_id
+        # Credentials are checked up front; the service object is built on first use
+        self._credentials = self._authenticate()
+        self._service = None
+        self._service_lock = threading.Lock()
+    
+    @property
+    def service(self):
+        if self._service is None:
+            with self._service_lock:
+                if self._service is None:
+                    self._service = self._build_service(self._credentials)
+        return self._service
+    
+    def _build_service(self, creds):
+        """Build the Calendar client from a local discovery document (no discovery request)"""
+        # Imported here: googleapiclient.discovery is slow to import and only
+        # needed once the first request is made
+        from googleapiclient.discovery import build, build_from_document
+        
+        started = time.perf_counter()
+        document = _load_discovery_document()
+        if document is not None:
+            service = build_from_document(document, credentials=creds)
+        else:
+            service = build('calendar', 'v3', credentials=creds)
+        print(f"⚡ Calendar service built in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return service
     
     def _authenticate(self):
         # If we have JSON credentials from environment (GitHub Actions/CI)
@@ -42,7 +83,7 @@ class CalendarMonitor:
                     # It's OAuth2 credentials
                     creds = Credentials.from_authorized_user_info(creds_info, SCOPES)
                 
-                return build('calendar', 'v3', credentials=creds)
+                return creds
             except (json.JSONDecodeError, Exception) as e:
                 print(f"Error parsing GOOGLE_CREDENTIALS_JSON: {e}")
                 raise
@@ -53,6 +94,10 @@ class CalendarMonitor:
             creds = Credentials.from_authorized_user_file('token.json', SCOPES)
         
         if not creds or not creds.valid:
+            # Only needed for the local OAuth flow, so not imported on every start
+            from google.auth.transport.requests import Request
+            from google_auth_oauthlib.flow import InstalledAppFlow
+            
             if creds and creds.expired and creds.refresh_token:
                 creds.refresh(Request())
             else:
@@ -66,50 +111,86 @@ class CalendarMonitor:
             with open('token.json', 'w') as token:
                 token.write(creds.to_json())
         
-        return build('calendar', 'v3', credentials=creds)
+        return creds
     
     def get_upcoming_1on1s(self, hours_ahead=24):
         """Get 1on1 meetings within the next specified hours"""
+        if self.calendar_sync is not None:
+            start = datetime.now(timezone.utc)
+            events = self._synced_events(start, start + timedelta(hours=hours_ahead))
+            return self._parse_events(events or [])
+        
         now = datetime.utcnow().isoformat() + 'Z'
         future_time = (datetime.utcnow() + timedelta(hours=hours_ahead)).isoformat() + 'Z'
         
-        # Try multiple calendar IDs to find the right one
+        events = self._list_events(now, future_time, q='1on1')
+        if events is None:
+            return []
+        
+        return self._parse_events(events)
+    
+    @property
+    def calendar_id(self):
+        """The calendar ID that was last read successfully, if any"""
+        return self._calendar_id
+    
+    def _calendar_ids(self):
+        """Calendar IDs to try, starting with the one that worked last"""
         calendar_ids_to_try = [
+            self._calendar_id,
             os.getenv('ZENDESK_EMAIL'),  # Try your email first (most likely to work)
             'primary',  # Default (service account's own calendar)
             os.getenv('GOOGLE_CALENDAR_ID'),  # If you want to set a specific calendar ID
         ]
         
-        # Remove None values
-        calendar_ids_to_try = [cal_id for cal_id in calendar_ids_to_try if cal_id]
+        # Remove None values and duplicates, keeping order
+        return list(dict.fromkeys(cal_id for cal_id in calendar_ids_to_try if cal_id))
+    
+    def _list_events(self, time_min, time_max, q=None):
+        """List events in a time range from the first accessible calendar
         
-        events_result = None
+        Returns None if no calendar could be read.
+        """
+        params = {
+            'timeMin': time_min,
+            'timeMax': time_max,
+            'singleEvents': True,
+            'orderBy': 'startTime'
+        }
+        if q:
+            params['q'] = q
         
-        for calendar_id in calendar_ids_to_try:
-            if not calendar_id:
-                continue
+        for calendar_id in self._calendar_ids():
             try:
                 print(f"🔍 Trying calendar ID: {calendar_id}")
-                events_result = self.service.events().list(
-                    calendarId=calendar_id,
-                    timeMin=now,
-                    timeMax=future_time,
-                    singleEvents=True,
-                    orderBy='startTime',
-                    q='1on1'
-                ).execute()
-                print(f"✅ Successfully accessed calendar: {calendar_id}")
-                break
+                request = self.service.events().list(calendarId=calendar_id, **params)
+                startup_timing.mark('first Calendar API call')
+                events_result = request.execute()
+                if self._calendar_id != calendar_id:
+                    print(f"✅ Successfully accessed calendar: {calendar_id}")
+                self._calendar_id = calendar_id
+                return events_result.get('items', [])
             except Exception as e:
                 print(f"❌ Failed to access calendar {calendar_id}: {e}")
                 continue
         
-        if not events_result:
-            print("❌ Could not access any calendar")
-            return []
+        print("❌ Could not access any calendar")
+        return None
+    
+    def _synced_events(self, start, end):
+        """Apply calendar changes since the last sync, then read events starting in [start, end] locally
         
-        events = events_result.get('items', [])
-        return self._parse_events(events)
+        If the calendar couldn't be synced the window is listed directly
+        instead; returns None if that fails too.
+        """
+        service = self.service
+        startup_timing.mark('first Calendar API call')
+        if not self.calendar_sync.sync(service, self._calendar_ids()):
+            print("⚠️ Calendar sync failed - listing the window directly")
+            return self._list_events(start.strftime('%Y-%m-%dT%H:%M:%SZ'), end.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                                     q='1on1')
+        self._calendar_id = self.calendar_sync.calendar_id
+        return self.calendar_sync.events_between(start, end)
     
     def _parse_events(self, events):
         """Parse calendar events to extract relevant information"""
@@ -138,103 +219,97 @@ class CalendarMonitor:
         
         return parsed_events
     
-    def get_meetings_starting_in_minutes(self, minutes=30):
-        """Get 1on1 meetings starting in exactly the specified minutes"""
-        target_time = datetime.utcnow() + timedelta(minutes=minutes)
-        target_start = target_time - timedelta(minutes=2)  # 2-minute window
-        target_end = target_time + timedelta(minutes=2)
+    def get_meetings_in_window(self, min_minutes=25, max_minutes=35, now=None):
+        """Get 1on1 meetings starting between min_minutes and max_minutes from now
         
-        print(f"🔍 Searching calendar from {target_start.isoformat()}Z to {target_end.isoformat()}Z (looking {minutes} min ahead)")
+        The whole window is fetched with one events().list call and each
+        meeting is tagged with 'minutes_until', its lead time in whole minutes.
+        """
+        now = now or datetime.now(timezone.utc)
+        window_start = now + timedelta(minutes=min_minutes)
+        window_end = now + timedelta(minutes=max_minutes)
+        time_min = window_start.strftime('%Y-%m-%dT%H:%M:%SZ')
+        time_max = window_end.strftime('%Y-%m-%dT%H:%M:%SZ')
         
-        # First, try to list all calendars to see what we have access to
-        if minutes == 25:  # Only do this once
-            try:
-                calendars_result = self.service.calendarList().list().execute()
-                calendars = calendars_result.get('items', [])
-                print(f"📋 Available calendars ({len(calendars)}):")
-                for cal in calendars:
-                    print(f"   - '{cal.get('summary', 'No name')}' (ID: {cal.get('id')}) - Access: {cal.get('accessRole')}")
-            except Exception as e:
-                print(f"❌ Could not list calendars: {e}")
-        
-        # Try multiple calendar IDs to find the right one
-        calendar_ids_to_try = [
-            os.getenv('ZENDESK_EMAIL'),  # Try your email first (most likely to work)
-            'primary',  # Default (service account's own calendar)
-            os.getenv('GOOGLE_CALENDAR_ID'),  # If you want to set a specific calendar ID
-        ]
+        print(f"🔍 Searching calendar from {time_min} to {time_max} ({min_minutes}-{max_minutes} min ahead)")
         
-        # Remove None values
-        calendar_ids_to_try = [cal_id for cal_id in calendar_ids_to_try if cal_id]
+        if self.calendar_sync is not None:
+            events = self._synced_events(window_start, window_end)
+        else:
+            events = self._list_events(time_min, time_max, q='1on1')
+        if events is None:
+            return []
+        print(f"📅 Found {len(events)} events with '1on1' in search")
         
-        events_result = None
-        successful_calendar_id = None
+        if self.diagnostics:
+            self._log_diagnostics(time_min, time_max)
         
-        for calendar_id in calendar_ids_to_try:
-            if not calendar_id:
-                continue
-            try:
-                print(f"   🔍 Trying calendar ID: {calendar_id}")
-                events_result = self.service.events().list(
-                    calendarId=calendar_id,
-                    timeMin=target_start.isoformat() + 'Z',
-                    timeMax=target_end.isoformat() + 'Z',
-                    singleEvents=True,
-                    orderBy='startTime',
-                    q='1on1'
-                ).execute()
-                successful_calendar_id = calendar_id
-                print(f"   ✅ Successfully accessed calendar: {calendar_id}")
-                break
-            except Exception as e:
-                print(f"   ❌ Failed to access calendar {calendar_id}: {e}")
+        meetings = []
+        for meeting in self._parse_events(events):
+            start = parse_start_time(meeting['start_time'])
+            # events().list matches on overlap; only meetings starting in the window count
+            if start is None or not window_start <= start <= window_end:
                 continue
+            meeting['minutes_until'] = round((start - now).total_seconds() / 60)
+            meetings.append(meeting)
         
-        if not events_result:
-            print("   ❌ Could not access any calendar")
-            return []
-        
-        events = events_result.get('items', [])
-        print(f"📅 Found {len(events)} events with '1on1' in search")
-        
-        # Debug: Also search without query to see all events in time range
-        if successful_calendar_id:
-            all_events_result = self.service.events().list(
-                calendarId=successful_calendar_id,
-                timeMin=target_start.isoformat() + 'Z',
-                timeMax=target_end.isoformat() + 'Z',
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-        else:
-            all_events_result = {'items': []}
+        return meetings
+    
+    def get_meetings_starting_in_minutes(self, minutes=30):
+        """Get 1on1 meetings starting in exactly the specified minutes"""
+        # 2-minute window either side
+        return self.get_meetings_in_window(minutes - 2, minutes + 2)
+    
+    def _log_diagnostics(self, time_min, time_max):
+        """Log accessible calendars and every event around the window (diagnostics mode only)"""
+        try:
+            calendars_result = self.service.calendarList().list().execute()
+            calendars = calendars_result.get('items', [])
+            print(f"📋 Available calendars ({len(calendars)}):")
+            for cal in calendars:
+                print(f"   - '{cal.get('summary', 'No name')}' (ID: {cal.get('id')}) - Access: {cal.get('accessRole')}")
+        except Exception as e:
+            print(f"❌ Could not list calendars: {e}")
         
-        all_events = all_events_result.get('items', [])
+        all_events = self._list_events(time_min, time_max) or []
         print(f"📅 Found {len(all_events)} total events in time range:")
         for event in all_events:
             print(f"   - '{event.get('summary', 'No title')}' at {event.get('start', {}).get('dateTime', 'No time')}")
         
-        # Also search in a much wider time range to see if there are ANY events today
-        if minutes == 25:  # Only do this once
-            try:
-                today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-                today_end = today_start + timedelta(days=1)
-                wide_search = self.service.events().list(
-                    calendarId=successful_calendar_id if successful_calendar_id else 'primary',
-                    timeMin=today_start.isoformat() + 'Z',
-                    timeMax=today_end.isoformat() + 'Z',
-                    singleEvents=True,
-                    orderBy='startTime'
-                ).execute()
-                
-                wide_events = wide_search.get('items', [])
-                print(f"🌅 Found {len(wide_events)} total events today:")
-                for event in wide_events[:5]:  # Show first 5
-                    start_time = event.get('start', {}).get('dateTime', event.get('start', {}).get('date', 'No time'))
-                    print(f"   - '{event.get('summary', 'No title')}' at {start_time}")
-                if len(wide_events) > 5:
-                    print(f"   ... and {len(wide_events) - 5} more events")
-            except Exception as e:
-                print(f"❌ Could not search today's events: {e}")
+        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        today_end = today_start + timedelta(days=1)
+        wide_events = self._list_events(today_start.isoformat() + 'Z', today_end.isoformat() + 'Z')
+        if wide_events is None:
+            print("❌ Could not search today's events")
+            return
         
-        return self._parse_events(events)
+        print(f"🌅 Found {len(wide_events)} total events today:")
+        for event in wide_events[:5]:  # Show first 5
+            start_time = event.get('start', {}).get('dateTime', event.get('start', {}).get('date', 'No time'))
+            print(f"   - '{event.get('summary', 'No title')}' at {start_time}")
+        if len(wide_events) > 5:
+            print(f"   ... and {len(wide_events) - 5} more events")
+
+def _load_discovery_document():
+    """Calendar v3 discovery document from CALENDAR_DISCOVERY_DOC or the copy bundled with googleapiclient"""
+    if CALENDAR_DISCOVERY_DOC:
+        try:
+            with open(CALENDAR_DISCOVERY_DOC, 'r') as f:
+                return f.read()
+        except OSError as e:
+            print(f"⚠️ Could not read discovery document {CALENDAR_DISCOVERY_DOC}: {e}")
+    
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+    except ImportError:
+        return None
+    return get_static_doc('calendar', 'v3')
+
+def parse_start_time(value):
+    """Parse an event start into an aware UTC datetime; all-day events have no lead time"""
+    if not value or 'T' not in value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc)
+    except ValueError:
+        return None
@@ -0,0 +1,171 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from googleapiclient.errors import HttpError
+from local_cache import cache_path, load_json, save_json
+
+
+class CalendarSync:
+    """Local copy of upcoming 1on1 events kept current with Calendar sync tokens.
+
+    The first sync lists the calendar from yesterday to `horizon_days` ahead
+    and keeps the returned nextSyncToken; later syncs send only that token
+    and apply the deltas (new, moved and cancelled events). The token, the
+    calendar ID that worked and the events are cached on disk between runs,
+    so each tick costs one small request however busy the calendar is.
+
+    Incremental deltas only report events that changed, so unchanged events
+    that move into the horizon are picked up by a full resync every
+    `full_sync_hours`. A failed incremental sync (expired token or any other
+    error) also falls back to a full sync.
+    """
+
+    def __init__(self, horizon_days=7, full_sync_hours=24, filename='calendar_sync.json'):
+        self.horizon_days = horizon_days
+        self.full_sync_seconds = full_sync_hours * 3600
+        self.path = cache_path(filename)
+        self._lock = threading.Lock()
+        state = load_json(self.path, {}) or {}
+        self.calendar_id = state.get('calendar_id')
+        self.sync_token = state.get('sync_token')
+        self.full_synced_at = state.get('full_synced_at', 0)
+        self.events = state.get('events', {})
+        self.stats = {'full_syncs': 0, 'incremental_syncs': 0, 'requests': 0, 'changes': 0}
+
+    def sync(self, service, calendar_ids):
+        """Bring the local events up to date; returns False if no calendar could be read"""
+        with self._lock:
+            if self.sync_token and self.calendar_id and time.time() - self.full_synced_at < self.full_sync_seconds:
+                try:
+                    self._incremental_sync(service)
+                    self._save()
+                    return True
+                except HttpError as e:
+                    # 410 Gone: the token expired and a full sync is required
+                    if getattr(e.resp, 'status', None) == 410:
+                        print("ℹ️ Calendar sync token expired - running a full sync")
+                    else:
+                        print(f"⚠️ Incremental calendar sync failed: {e} - running a full sync")
+                except Exception as e:
+                    print(f"⚠️ Incremental calendar sync failed: {e} - running a full sync")
+
+            # Try the calendar that worked last before the fallbacks
+            ordered_ids = list(dict.fromkeys([self.calendar_id] + list(calendar_ids)))
+            for calendar_id in ordered_ids:
+                if not calendar_id:
+                    continue
+                try:
+                    self._full_sync(service, calendar_id)
+                except Exception as e:
+                    print(f"❌ Failed to sync calendar {calendar_id}: {e}")
+                    continue
+                self._save()
+                return True
+
+            print("❌ Could not access any calendar")
+            return False
+
+    def _full_sync(self, service, calendar_id):
+        now = datetime.now(timezone.utc)
+        params = {
+            'calendarId': calendar_id,
+            'singleEvents': True,
+            'timeMin': (now - timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'timeMax': (now + timedelta(days=self.horizon_days)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'maxResults': 250
+        }
+        events = {}
+        sync_token = self._list_pages(service, params, events)
+
+        self.calendar_id = calendar_id
+        self.sync_token = sync_token
+        self.full_synced_at = time.time()
+        self.events = events
+        self.stats['full_syncs'] += 1
+        print(f"📆 Full calendar sync of {calendar_id}: {len(events)} upcoming 1on1 events")
+
+    def _incremental_sync(self, service):
+        params = {
+            'calendarId': self.calendar_id,
+            'singleEvents': True,
+            'syncToken': self.sync_token,
+            'maxResults': 250
+        }
+        changes_before = self.stats['changes']
+        sync_token = self._list_pages(service, params, self.events)
+        if sync_token:
+            self.sync_token = sync_token
+        self.stats['incremental_syncs'] += 1
+        changed = self.stats['changes'] - changes_before
+        if changed:
+            print(f"📆 Calendar sync applied {changed} changed events")
+
+    def _list_pages(self, service, params, events):
+        """Apply every page of an events().list call to `events`; returns nextSyncToken"""
+        while True:
+            result = service.events().list(**params).execute()
+            self.stats['requests'] += 1
+            for event in result.get('items', []):
+                self._apply(event, events)
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return result.get('nextSyncToken')
+            params = dict(params, pageToken=page_token)
+
+    def _apply(self, event, events):
+        event_id = event.get('id')
+        if not event_id:
+            return
+        self.stats['changes'] += 1
+        # Cancelled events and events renamed away from 1on1 leave the cache
+        if event.get('status') == 'cancelled' or '1on1' not in event.get('summary', '').lower():
+            events.pop(event_id, None)
+            return
+        events[event_id] = {
+            'id': event_id,
+            'summary': event.get('summary'),
+            'start': event.get('start', {}),
+            'attendees': [
+                {'email': attendee.get('email'), 'organizer': attendee.get('organizer', False)}
+                for attendee in event.get('attendees', [])
+            ]
+        }
+
+    def _save(self):
+        # Events that already started more than a day ago can't be upcoming again
+        cutoff = datetime.now(timezone.utc) - timedelta(days=1)
+        self.events = {
+            event_id: event for event_id, event in self.events.items()
+            if (_event_start(event) or cutoff) >= cutoff
+        }
+        save_json(self.path, {
+            'calendar_id': self.calendar_id,
+            'sync_token': self.sync_token,
+            'full_synced_at': self.full_synced_at,
+            'events': self.events
+        })
+
+    def events_between(self, start, end):
+        """Return cached events starting between two aware datetimes, ordered by start"""
+        with self._lock:
+            matches = []
+            for event in self.events.values():
+                event_start = _event_start(event)
+                if event_start is not None and start <= event_start <= end:
+                    matches.append((event_start, event))
+        return [event for _, event in sorted(matches, key=lambda match: match[0])]
+
+
+def _event_start(event):
+    start = event.get('start', {})
+    value = start.get('dateTime') or start.get('date')
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        # All-day events only carry a date
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
@@ -0,0 +1,204 @@
+import hmac
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from calendar_monitor import parse_start_time
+
+
+def register_watch(service, calendar_id, address, token, ttl_seconds=86400):
+    """Open an events.watch channel that posts changes of a calendar to `address`"""
+    return service.events().watch(calendarId=calendar_id, body={
+        'id': str(uuid.uuid4()),
+        'type': 'web_hook',
+        'address': address,
+        'token': token,
+        'params': {'ttl': str(int(ttl_seconds))}
+    }).execute()
+
+
+def stop_watch(service, channel):
+    """Close a watch channel so Google stops posting to it"""
+    service.channels().stop(body={'id': channel['id'], 'resourceId': channel['resourceId']}).execute()
+
+
+def channel_expires_at(channel):
+    """Return a channel's expiration as an aware datetime (Google sends epoch milliseconds)"""
+    return datetime.fromtimestamp(int(channel.get('expiration', 0)) / 1000, tz=timezone.utc)
+
+
+def send_test_notification(url, token, channel_id='', state='exists'):
+    """Post a notification shaped like Google's to a receiver; returns the HTTP status"""
+    response = requests.post(url, headers={
+        'X-Goog-Channel-ID': channel_id,
+        'X-Goog-Channel-Token': token,
+        'X-Goog-Resource-State': state,
+        'X-Goog-Message-Number': '1'
+    }, timeout=10)
+    return response.status_code
+
+
+class NotificationReceiver:
+    """Small HTTP server that turns Calendar push notifications into on_change() calls.
+
+    Google only says that something changed, so every accepted notification
+    just requests a sync. Syncs run on one worker thread so Google gets its
+    200 immediately, and a burst of notifications during a sync collapses
+    into a single follow-up sync.
+    """
+
+    def __init__(self, on_change, token, host='0.0.0.0', port=8080, path='/calendar/notifications'):
+        self.on_change = on_change
+        self.token = token
+        self.path = path
+        # Empty until a channel is registered; then other channels are rejected
+        self.channel_ids = set()
+        self.stats = {'received': 0, 'rejected': 0, 'syncs': 0}
+        self._pending = threading.Event()
+        self._stopped = threading.Event()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._threads = []
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        for target in (self._server.serve_forever, self._worker):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"📡 Listening for calendar notifications on port {self.port}{self.path}")
+
+    def stop(self):
+        self._stopped.set()
+        self._pending.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def request_sync(self):
+        """Queue a sync as if a notification had arrived"""
+        self._pending.set()
+
+    def _handler_class(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                status = receiver._handle(self.path, self.headers)
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _handle(self, path, headers):
+        if path.split('?', 1)[0] != self.path:
+            return 404
+        token = headers.get('X-Goog-Channel-Token', '')
+        channel_id = headers.get('X-Goog-Channel-ID', '')
+        if not hmac.compare_digest(token, self.token) or (self.channel_ids and channel_id not in self.channel_ids):
+            self.stats['rejected'] += 1
+            return 403
+
+        self.stats['received'] += 1
+        # 'sync' only confirms that a new channel was opened
+        if headers.get('X-Goog-Resource-State') != 'sync':
+            self._pending.set()
+        return 200
+
+    def _worker(self):
+        while not self._stopped.is_set():
+            if not self._pending.wait(timeout=1):
+                continue
+            self._pending.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.on_change()
+                self.stats['syncs'] += 1
+            except Exception as e:
+                print(f"❌ Calendar change handling failed: {e}")
+
+
+class MeetingScheduler:
+    """In-process timers that call `callback(meeting)` lead_minutes before each meeting.
+
+    schedule() is given the full list of upcoming meetings after every sync:
+    new meetings get a timer, moved meetings are rescheduled and meetings that
+    disappeared are cancelled. A meeting fires at most once per start time.
+    """
+
+    def __init__(self, callback, lead_minutes=30):
+        self.callback = callback
+        self.lead = timedelta(minutes=lead_minutes)
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._fired = set()
+
+    def schedule(self, meetings, now=None):
+        now = now or datetime.now(timezone.utc)
+        seen = set()
+        with self._lock:
+            # Fired meetings only matter until they start; older entries are dropped
+            self._fired = {(key, start) for key, start in self._fired if start > now}
+            for meeting in meetings:
+                start = parse_start_time(meeting.get('start_time'))
+                # Meetings that already started (or all-day events) get no report
+                if start is None or start <= now:
+                    continue
+                key = f"{meeting.get('id')}_{meeting.get('agent_email')}"
+                seen.add(key)
+                if (key, start) in self._fired:
+                    continue
+
+                existing = self._timers.get(key)
+                if existing and existing[0] == start:
+                    continue
+                if existing:
+                    existing[1].cancel()
+                    print(f"🔁 Rescheduling report for '{meeting.get('summary')}' (meeting moved)")
+
+                # A meeting found inside the lead time is reported right away
+                delay = max(0.0, (start - self.lead - now).total_seconds())
+                timer = threading.Timer(delay, self._fire, (key, start, meeting))
+                timer.daemon = True
+                self._timers[key] = (start, timer)
+                timer.start()
+
+            for key in list(self._timers):
+                if key not in seen:
+                    self._timers.pop(key)[1].cancel()
+        return len(self._timers)
+
+    def _fire(self, key, start, meeting):
+        with self._lock:
+            current = self._timers.get(key)
+            if not current or current[0] != start:
+                return
+            del self._timers[key]
+            self._fired.add((key, start))
+        meeting = dict(meeting)
+        meeting['minutes_until'] = round((start - datetime.now(timezone.utc)).total_seconds() / 60)
+        try:
+            self.callback(meeting)
+        except Exception as e:
+            print(f"❌ Scheduled report for '{meeting.get('summary')}' failed: {e}")
+
+    def pending(self):
+        """Return (key, start) for every meeting waiting on a timer"""
+        with self._lock:
+            return sorted(((key, start) for key, (start, _) in self._timers.items()), key=lambda item: item[1])
+
+    def cancel_all(self):
+        with self._lock:
+            for _, timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
@@ -0,0 +1,80 @@
+from collections import defaultdict, deque
+
+
+class CommentActivity:
+    """Public/private comment counts per author and ticket.
+
+    Built from a single pass over the incremental ticket events export, so
+    one stream answers the comment counts for every agent instead of one
+    comments.json request per ticket per agent. prune() drops comments that
+    fell out of the reporting window, so a long-running process doesn't keep
+    every comment it has ever read.
+    """
+
+    def __init__(self, start_time):
+        self.start_time = int(start_time)
+        # Unix time the export has been read up to; the next refresh resumes here
+        self.cursor = int(start_time)
+        # author_id -> ticket_id -> [public, private]
+        self._counts = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        self._seen_comments = set()
+        # (timestamp, comment_id, author_id, ticket_id, public) in stream order, for prune()
+        self._comments = deque()
+        self.events_processed = 0
+
+    def add_events(self, ticket_events):
+        """Aggregate comment child events from a page of ticket events"""
+        for event in ticket_events:
+            ticket_id = event.get('ticket_id')
+            timestamp = event.get('timestamp') or self.cursor
+            for child in event.get('child_events', []):
+                if child.get('event_type') != 'Comment':
+                    continue
+                # Export pages can overlap at their time boundaries
+                comment_id = child.get('id')
+                if comment_id is not None:
+                    if comment_id in self._seen_comments:
+                        continue
+                    self._seen_comments.add(comment_id)
+
+                author_id = child.get('author_id')
+                if author_id is None:
+                    continue
+                public = child.get('public', True)
+                self._counts[author_id][ticket_id][0 if public else 1] += 1
+                self._comments.append((timestamp, comment_id, author_id, ticket_id, public))
+            self.events_processed += 1
+
+    def prune(self, before):
+        """Forget comments made before the Unix time `before`; returns how many were dropped"""
+        dropped = 0
+        while self._comments and self._comments[0][0] < before:
+            _, comment_id, author_id, ticket_id, public = self._comments.popleft()
+            self._seen_comments.discard(comment_id)
+            per_ticket = self._counts[author_id]
+            bucket = per_ticket[ticket_id]
+            bucket[0 if public else 1] -= 1
+            if bucket == [0, 0]:
+                del per_ticket[ticket_id]
+                if not per_ticket:
+                    del self._counts[author_id]
+            dropped += 1
+        self.start_time = max(self.start_time, int(before))
+        return dropped
+
+    def counts_for(self, author_id, ticket_ids=None):
+        """Return (external, internal) comment counts for an author
+
+        When `ticket_ids` is given only comments on those tickets are counted.
+        """
+        per_ticket = self._counts.get(author_id, {})
+        if ticket_ids is not None:
+            ticket_ids = set(ticket_ids)
+        external = 0
+        internal = 0
+        for ticket_id, (public, private) in per_ticket.items():
+            if ticket_ids is not None and ticket_id not in ticket_ids:
+                continue
+            external += public
+            internal += private
+        return external, internal
@@ -26,4 +26,100 @@ missing_vars = [var for var in required_vars if not os.getenv(var)]
 if missing_vars:
     raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
 
-ZENDESK_BASE_URL = f"https://{ZENDESK_SUBDOMAIN}.zendesk.com/api/v2"
+# Optional API base URL overrides, e.g. the local stand-in server used by benchmark_offline.py
+ZENDESK_API_URL = os.getenv('ZENDESK_API_URL')
+SLACK_API_URL = os.getenv('SLACK_API_URL', 'https://www.slack.com/api/')
+
+ZENDESK_BASE_URL = (ZENDESK_API_URL or f"https://{ZENDESK_SUBDOMAIN}.zendesk.com/api/v2").rstrip('/')
+
+# Zendesk HTTP connection pooling
+ZENDESK_POOL_CONNECTIONS = int(os.getenv('ZENDESK_POOL_CONNECTIONS', '4'))
+ZENDESK_POOL_MAXSIZE = int(os.getenv('ZENDESK_POOL_MAXSIZE', '16'))
+
+# Zendesk rate limiting and retries
+ZENDESK_RATE_LIMIT_PER_MINUTE = int(os.getenv('ZENDESK_RATE_LIMIT_PER_MINUTE', '200'))
+ZENDESK_MAX_RETRIES = int(os.getenv('ZENDESK_MAX_RETRIES', '4'))
+ZENDESK_RETRY_BUDGET_SECONDS = float(os.getenv('ZENDESK_RETRY_BUDGET_SECONDS', '120'))
+
+# Local cache directory for state kept between runs
+BOT_CACHE_DIR = os.getenv('BOT_CACHE_DIR', '.cache')
+
+# Zendesk user directory
+ZENDESK_USER_CACHE_TTL_HOURS = float(os.getenv('ZENDESK_USER_CACHE_TTL_HOURS', '24'))
+ZENDESK_AGENT_GROUP_ID = os.getenv('ZENDESK_AGENT_GROUP_ID')
+
+# Bulk comment counting from the incremental ticket events export
+ZENDESK_COMMENT_ACTIVITY_MAX_AGE_MINUTES = float(os.getenv('ZENDESK_COMMENT_ACTIVITY_MAX_AGE_MINUTES', '5'))
+
+# Maximum concurrent per-ticket Zendesk requests
+ZENDESK_MAX_CONCURRENCY = int(os.getenv('ZENDESK_MAX_CONCURRENCY', '8'))
+
+# Bulk CSAT lookups from satisfaction_ratings.json
+ZENDESK_CSAT_INDEX_MAX_AGE_MINUTES = float(os.getenv('ZENDESK_CSAT_INDEX_MAX_AGE_MINUTES', '5'))
+ZENDESK_CSAT_WINDOW_DAYS = int(os.getenv('ZENDESK_CSAT_WINDOW_DAYS', '30'))
+
+# How long unavailable Zendesk endpoints are skipped
+ZENDESK_CAPABILITY_TTL_HOURS = float(os.getenv('ZENDESK_CAPABILITY_TTL_HOURS', '24'))
+
+# After a failed comment stream, CSAT listing or ticket store sync, how long the slower fallback is used before retrying
+ZENDESK_FALLBACK_RETRY_MINUTES = float(os.getenv('ZENDESK_FALLBACK_RETRY_MINUTES', '15'))
+
+# Local SQLite ticket store kept current by incremental exports (admin token required)
+ZENDESK_TICKET_STORE = os.getenv('ZENDESK_TICKET_STORE', 'false').lower() == 'true'
+ZENDESK_TICKET_STORE_SYNC_MINUTES = float(os.getenv('ZENDESK_TICKET_STORE_SYNC_MINUTES', '5'))
+
+# Conditional-request (ETag) cache for Zendesk GETs; stores response bodies on disk
+ZENDESK_HTTP_CACHE = os.getenv('ZENDESK_HTTP_CACHE', 'false').lower() == 'true'
+ZENDESK_HTTP_CACHE_MAX_MB = float(os.getenv('ZENDESK_HTTP_CACHE_MAX_MB', '50'))
+
+# How long a successful Zendesk credential check is trusted before re-verifying
+ZENDESK_AUTH_CHECK_TTL_HOURS = float(os.getenv('ZENDESK_AUTH_CHECK_TTL_HOURS', '12'))
+
+# Log calendar listings and unfiltered event scans on every meeting check (debugging only)
+CALENDAR_DIAGNOSTICS = os.getenv('CALENDAR_DIAGNOSTICS', 'false').lower() == 'true'
+
+# Answer meeting queries from a local calendar copy kept current with sync tokens
+CALENDAR_INCREMENTAL_SYNC = os.getenv('CALENDAR_INCREMENTAL_SYNC', 'false').lower() == 'true'
+CALENDAR_SYNC_HORIZON_DAYS = int(os.getenv('CALENDAR_SYNC_HORIZON_DAYS', '7'))
+CALENDAR_FULL_SYNC_HOURS = float(os.getenv('CALENDAR_FULL_SYNC_HOURS', '24'))
+
+# Event-driven mode (--watch): Calendar push notifications instead of cron polling
+MEETING_LEAD_MINUTES = int(os.getenv('MEETING_LEAD_MINUTES', '30'))
+CALENDAR_WATCH_ADDRESS = os.getenv('CALENDAR_WATCH_ADDRESS')
+CALENDAR_WATCH_TOKEN = os.getenv('CALENDAR_WATCH_TOKEN')
+CALENDAR_WATCH_PORT = int(os.getenv('CALENDAR_WATCH_PORT', '8080'))
+CALENDAR_WATCH_TTL_HOURS = float(os.getenv('CALENDAR_WATCH_TTL_HOURS', '24'))
+CALENDAR_WATCH_RESYNC_MINUTES = float(os.getenv('CALENDAR_WATCH_RESYNC_MINUTES', '60'))
+CALENDAR_WATCH_SCHEDULE_HOURS = int(os.getenv('CALENDAR_WATCH_SCHEDULE_HOURS', '24'))
+
+# Optional path to a Calendar v3 discovery document; defaults to the copy bundled with googleapiclient
+CALENDAR_DISCOVERY_DOC = os.getenv('CALENDAR_DISCOVERY_DOC')
+
+# Daemon mode (--daemon): check cadence and the status/heartbeat endpoint port
+DAEMON_INTERVAL_MINUTES = float(os.getenv('DAEMON_INTERVAL_MINUTES', '5'))
+DAEMON_STATUS_PORT = int(os.getenv('DAEMON_STATUS_PORT', '8081'))
+
+# Ledger of handled meetings, so overlapping scan windows never report a meeting twice
+MEETING_LEDGER_TTL_DAYS = float(os.getenv('MEETING_LEDGER_TTL_DAYS', '3'))
+MEETING_LEDGER_MAX_ATTEMPTS = int(os.getenv('MEETING_LEDGER_MAX_ATTEMPTS', '3'))
+
+# Ahead-of-time metric snapshots (--precompute, and hourly in daemon mode)
+PRECOMPUTE_HOURS_AHEAD = int(os.getenv('PRECOMPUTE_HOURS_AHEAD', '24'))
+PRECOMPUTE_INTERVAL_MINUTES = float(os.getenv('PRECOMPUTE_INTERVAL_MINUTES', '60'))
+SNAPSHOT_MAX_AGE_HOURS = float(os.getenv('SNAPSHOT_MAX_AGE_HOURS', '24'))
+
+# Parallel report building when several 1on1s fall in the same check window
+MEETING_WORKERS = int(os.getenv('MEETING_WORKERS', '4'))
+MEETING_TIMEOUT_SECONDS = float(os.getenv('MEETING_TIMEOUT_SECONDS', '240'))
+# Build a batch's reports on one asyncio event loop (AsyncZendeskClient) instead of worker threads
+ZENDESK_ASYNC_METRICS = os.getenv('ZENDESK_ASYNC_METRICS', 'false').lower() == 'true'
+
+# Slack delivery: queued and sent in the background, with undelivered posts kept on disk
+SLACK_ASYNC_DELIVERY = os.getenv('SLACK_ASYNC_DELIVERY', 'true').lower() == 'true'
+SLACK_ERROR_COALESCE_SECONDS = float(os.getenv('SLACK_ERROR_COALESCE_SECONDS', '10'))
+SLACK_OUTBOX_MAX_AGE_MINUTES = float(os.getenv('SLACK_OUTBOX_MAX_AGE_MINUTES', '60'))
+SLACK_FLUSH_TIMEOUT_SECONDS = float(os.getenv('SLACK_FLUSH_TIMEOUT_SECONDS', '60'))
+
+# Slack delivery mode: 'post' (a new message per summary) or 'digest' (one thread per batch, reruns edit in place)
+SLACK_DELIVERY_MODE = os.getenv('SLACK_DELIVERY_MODE', 'post').lower()
+SLACK_MESSAGE_MAP_TTL_DAYS = float(os.getenv('SLACK_MESSAGE_MAP_TTL_DAYS', '3'))
@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# config.py refuses to import without these; the unit tests never call the real APIs
+for name, value in {
+    'SLACK_BOT_TOKEN': 'test-token',
+    'SLACK_CHANNEL_ID': 'CTEST',
+    'ZENDESK_SUBDOMAIN': 'test',
+    'ZENDESK_EMAIL': 'test@example.com',
+    'ZENDESK_API_TOKEN': 'test-token'
+}.items():
+    os.environ.setdefault(name, value)
+os.environ.setdefault('BOT_CACHE_DIR', tempfile.mkdtemp(prefix='bot-cache-tests-'))
@@ -0,0 +1,49 @@
+import hashlib
+import threading
+import time
+from local_cache import cache_path, load_json, save_json
+
+
+def credential_fingerprint(*parts):
+    """Hash credentials into a cache key that never stores the secrets themselves"""
+    raw = '\0'.join(str(part or '') for part in parts)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class CredentialCache:
+    """Remembers credentials that recently authenticated successfully.
+
+    Entries are keyed by credential fingerprint, so rotating a token or
+    pointing at another account triggers a fresh check, and expire after
+    ttl_seconds so revoked credentials are noticed on a later run.
+    """
+
+    def __init__(self, ttl_seconds, filename='zendesk_auth.json'):
+        self.ttl_seconds = ttl_seconds
+        self.path = cache_path(filename)
+        self._lock = threading.Lock()
+        self._verified = load_json(self.path, {}) or {}
+
+    def is_verified(self, fingerprint):
+        """True if these credentials were verified within the TTL"""
+        with self._lock:
+            verified_at = self._verified.get(fingerprint, 0)
+        return time.time() - verified_at < self.ttl_seconds
+
+    def record(self, fingerprint):
+        """Mark these credentials as verified now"""
+        now = time.time()
+        with self._lock:
+            # Drop expired fingerprints so rotated tokens don't accumulate
+            self._verified = {
+                key: verified_at for key, verified_at in self._verified.items()
+                if now - verified_at < self.ttl_seconds
+            }
+            self._verified[fingerprint] = now
+            save_json(self.path, self._verified)
+
+    def forget(self, fingerprint):
+        """Drop a fingerprint, e.g. after an authentication failure"""
+        with self._lock:
+            if self._verified.pop(fingerprint, None) is not None:
+                save_json(self.path, self._verified)
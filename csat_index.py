@@ -0,0 +1,29 @@
+class CsatIndex:
+    """Satisfaction ratings for a time window, keyed by ticket.
+
+    Built from one paginated satisfaction_ratings.json listing, so the
+    positive and negative CSAT sections of every agent are answered locally
+    instead of with one satisfaction_rating.json request per solved ticket.
+    """
+
+    def __init__(self, start_time):
+        self.start_time = int(start_time)
+        self._by_ticket = {}
+
+    def add_ratings(self, ratings):
+        """Index a page of satisfaction ratings, keeping the latest per ticket"""
+        for rating in ratings:
+            ticket_id = rating.get('ticket_id')
+            if ticket_id is None:
+                continue
+            current = self._by_ticket.get(ticket_id)
+            if current and (current.get('updated_at') or '') > (rating.get('updated_at') or ''):
+                continue
+            self._by_ticket[ticket_id] = rating
+
+    def rating_for(self, ticket_id):
+        """Return the rating for a ticket, or None if it wasn't rated"""
+        return self._by_ticket.get(ticket_id)
+
+    def __len__(self):
+        return len(self._by_ticket)
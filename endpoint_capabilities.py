@@ -0,0 +1,97 @@
+import re
+import threading
+import time
+from local_cache import cache_path, load_json, save_json
+
+UNSUPPORTED_STATUS_CODES = (403, 404)
+
+# Only features an account or token may lack are remembered; every one has a
+# fallback. A 403/404 from anything else (user search, ticket listings) is
+# reported as an error instead of being skipped for the TTL.
+OPTIONAL_ENDPOINTS = (
+    'incremental/ticket_events.json',
+    'incremental/tickets/cursor.json',
+    'satisfaction_ratings.json',
+    'tickets/show_many.json?include=slas'
+)
+
+_ID_SEGMENT = re.compile(r'/\d+(?=/|\.json)')
+
+
+def endpoint_key(endpoint, params=None):
+    """Normalize an endpoint so every ticket/user ID maps to the same key
+
+    A side-load (`include`) is part of the key, since the base endpoint
+    works without it.
+    """
+    key = _ID_SEGMENT.sub('/{id}', endpoint.split('?', 1)[0])
+    include = (params or {}).get('include')
+    return f"{key}?include={include}" if include else key
+
+
+class EndpointCapabilities:
+    """Remembers optional Zendesk endpoints this account/token can't use.
+
+    Once an endpoint in OPTIONAL_ENDPOINTS answers 403/404 it is skipped
+    without a request until the entry expires, in this run and (via the
+    on-disk cache) later runs. Entries are stored per credential
+    fingerprint, so a new token or account starts with a clean slate.
+    """
+
+    def __init__(self, ttl_seconds, fingerprint, filename='zendesk_capabilities.json'):
+        self.ttl_seconds = ttl_seconds
+        self.fingerprint = fingerprint
+        self.path = cache_path(filename)
+        self._lock = threading.Lock()
+        data = load_json(self.path, {}) or {}
+        # Files written before entries were keyed by fingerprint are ignored
+        self._accounts = {
+            account: entries for account, entries in data.items()
+            if isinstance(entries, dict) and all(isinstance(entry, dict) for entry in entries.values())
+        }
+        self._unsupported = self._accounts.setdefault(fingerprint, {})
+        self.skipped = 0
+
+    def _is_fresh(self, entry):
+        return time.time() - entry.get('recorded_at', 0) < self.ttl_seconds
+
+    def is_unsupported(self, endpoint, params=None):
+        """True if the endpoint is known not to work for this account"""
+        key = endpoint_key(endpoint, params)
+        with self._lock:
+            entry = self._unsupported.get(key)
+            if not entry:
+                return False
+            if not self._is_fresh(entry):
+                del self._unsupported[key]
+                return False
+            self.skipped += 1
+            return True
+
+    def record_failure(self, endpoint, status_code, params=None):
+        """Remember an optional endpoint if the failure means it isn't available
+
+        Returns True when the endpoint was recorded as unsupported.
+        """
+        if status_code not in UNSUPPORTED_STATUS_CODES:
+            return False
+        key = endpoint_key(endpoint, params)
+        if key not in OPTIONAL_ENDPOINTS:
+            return False
+
+        with self._lock:
+            self._unsupported[key] = {'status': status_code, 'recorded_at': time.time()}
+            self._save()
+        print(f"ℹ️ Zendesk endpoint {key} is not available (HTTP {status_code}) - "
+              f"skipping it for {self.ttl_seconds / 3600:g}h")
+        return True
+
+    def _save(self):
+        # Drop expired entries and accounts so old tokens don't accumulate
+        for account in list(self._accounts):
+            entries = self._accounts[account]
+            for key in [key for key, entry in entries.items() if not self._is_fresh(entry)]:
+                del entries[key]
+            if not entries and account != self.fingerprint:
+                del self._accounts[account]
+        save_json(self.path, self._accounts)
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from local_cache import cache_path, load_json, save_json
+
+# Streams and cursors are different on every call; caching them only wastes space
+UNCACHEABLE_PREFIXES = ('incremental/', 'search/export.json', 'users/me.json')
+# A window anchored on "now" gives a new key on every run, so it could never hit
+TIME_WINDOW_PARAMS = ('start_time', 'end_time')
+
+
+class HttpCache:
+    """Size-bounded on-disk cache of GET bodies revalidated with ETags.
+
+    A cached entry is sent back to Zendesk as If-None-Match; a 304 means the
+    stored body is still current, so unchanged resources cost a cheap
+    conditional request instead of a full download. Entries are evicted
+    least-recently-used first once the cache exceeds max_bytes. Index
+    changes stay in memory until save() or close(), so a run writes
+    index.json once instead of on every response. Body files missing from
+    the index (left by a run that died before saving) are deleted on load.
+    """
+
+    def __init__(self, max_bytes, directory='http'):
+        self.max_bytes = max_bytes
+        self.directory = cache_path(directory)
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self.index_path = os.path.join(self.directory, 'index.json')
+        self._lock = threading.Lock()
+        self._index = load_json(self.index_path, {}) or {}
+        self._dirty = False
+        self.stats = {'hits': 0, 'misses': 0, 'revalidations': 0, 'updates': 0, 'evictions': 0}
+        self._remove_orphans()
+
+    def is_cacheable(self, endpoint, params=None):
+        if endpoint.startswith(UNCACHEABLE_PREFIXES):
+            return False
+        return not any(name in (params or {}) for name in TIME_WINDOW_PARAMS)
+
+    def _remove_orphans(self):
+        for name in os.listdir(self.directory):
+            key, extension = os.path.splitext(name)
+            if extension == '.json' and name != 'index.json' and key not in self._index:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def key(self, endpoint, params=None):
+        raw = endpoint + '?' + json.dumps(params or {}, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def lookup(self, key):
+        """Return (etag, body) for a cached response, or None on a miss"""
+        with self._lock:
+            entry = self._index.get(key)
+        if entry:
+            body = load_json(self._entry_path(key))
+            if body is not None:
+                with self._lock:
+                    self.stats['revalidations'] += 1
+                return entry['etag'], body
+        with self._lock:
+            self.stats['misses'] += 1
+            if self._index.pop(key, None) is not None:
+                self._dirty = True
+        return None
+
+    def record_hit(self, key):
+        """Mark a 304 response: the cached body was still current"""
+        with self._lock:
+            self.stats['hits'] += 1
+            if key in self._index:
+                self._index[key]['last_used'] = time.time()
+                self._dirty = True
+
+    def store(self, key, etag, body, revalidated=False):
+        """Cache a 200 response that carried an ETag"""
+        path = self._entry_path(key)
+        save_json(path, body)
+        with self._lock:
+            if revalidated:
+                self.stats['updates'] += 1
+            self._index[key] = {
+                'etag': etag,
+                'size': os.path.getsize(path),
+                'last_used': time.time()
+            }
+            self._evict()
+            self._dirty = True
+
+    def save(self):
+        """Write the index if it changed since the last save"""
+        with self._lock:
+            if self._dirty:
+                save_json(self.index_path, self._index)
+                self._dirty = False
+
+    def close(self):
+        self.save()
+
+    def _evict(self):
+        total = sum(entry['size'] for entry in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            total -= entry['size']
+            del self._index[key]
+            self.stats['evictions'] += 1
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._index)
+            stats['bytes'] = sum(entry['size'] for entry in self._index.values())
+        return stats
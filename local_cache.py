@@ -0,0 +1,34 @@
+import json
+import os
+import tempfile
+from config import BOT_CACHE_DIR
+
+
+def cache_path(filename):
+    """Return the path of a file inside the local cache directory"""
+    os.makedirs(BOT_CACHE_DIR, mode=0o700, exist_ok=True)
+    return os.path.join(BOT_CACHE_DIR, filename)
+
+
+def load_json(path, default=None):
+    """Load a JSON cache file, falling back to `default` if missing or corrupt"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data):
+    """Atomically write a JSON cache file readable only by the current user"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,122 @@
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    event_id TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    agent_email TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (event_id, start_time, agent_email)
+);
+CREATE INDEX IF NOT EXISTS idx_meetings_updated ON meetings (updated_at);
+"""
+
+IN_PROGRESS = 'in_progress'
+# The summary is in the Slack outbox; delivery marks it SENT or FAILED
+QUEUED = 'queued'
+SENT = 'sent'
+# Nothing to report (the agent has no metrics); not retried
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+
+class MeetingLedger:
+    """Persistent record of which 1on1 reports were already handled.
+
+    Keyed by (event id, start time, agent), so a meeting seen again by the
+    next tick is skipped before any Zendesk work, while a moved meeting gets
+    a new report. claim() is atomic across processes. A run that crashed
+    mid-report leaves an in_progress row that can be reclaimed once its lease
+    expires. Failed reports are retried up to max_attempts; skipped ones are
+    not. A queued row whose delivery was never reported (the outbox file was
+    lost) can be reclaimed after queued_lease_seconds. Rows expire after
+    ttl_days.
+    """
+
+    def __init__(self, path, ttl_days=3, max_attempts=3, lease_seconds=900, queued_lease_seconds=3600):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.queued_lease_seconds = queued_lease_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(SCHEMA)
+        self.purge_expired()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def claim(self, event_id, start_time, agent_email):
+        """Reserve a meeting for this run; False if it was already handled or is being handled"""
+        key = (str(event_id), str(start_time), agent_email or '')
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so two runs can't both claim
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    'SELECT status, attempts, updated_at FROM meetings '
+                    'WHERE event_id = ? AND start_time = ? AND agent_email = ?', key
+                ).fetchone()
+                if row is not None and not self._claimable(row, now):
+                    self._conn.execute('COMMIT')
+                    return False
+                attempts = row['attempts'] + 1 if row is not None else 1
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO meetings '
+                    '(event_id, start_time, agent_email, status, attempts, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                    (*key, IN_PROGRESS, attempts, now)
+                )
+                self._conn.execute('COMMIT')
+                return True
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def _claimable(self, row, now):
+        if row['status'] == FAILED:
+            return row['attempts'] < self.max_attempts
+        if row['status'] == IN_PROGRESS:
+            return now - row['updated_at'] >= self.lease_seconds
+        if row['status'] == QUEUED:
+            return now - row['updated_at'] >= self.queued_lease_seconds
+        return False
+
+    def mark(self, event_id, start_time, agent_email, status, only_if=None):
+        """Record the outcome of a claimed meeting
+
+        With `only_if` the row is only updated while it still has that status,
+        so QUEUED doesn't overwrite an outcome delivery already reported.
+        """
+        query = ('UPDATE meetings SET status = ?, updated_at = ? '
+                 'WHERE event_id = ? AND start_time = ? AND agent_email = ?')
+        params = [status, time.time(), str(event_id), str(start_time), agent_email or '']
+        if only_if is not None:
+            query += ' AND status = ?'
+            params.append(only_if)
+        with self._lock:
+            self._conn.execute(query, params)
+
+    def status_of(self, event_id, start_time, agent_email):
+        """Return the recorded status of a meeting, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status FROM meetings WHERE event_id = ? AND start_time = ? AND agent_email = ?',
+                (str(event_id), str(start_time), agent_email or '')
+            ).fetchone()
+        return row['status'] if row else None
+
+    def purge_expired(self):
+        """Drop entries older than the TTL; returns how many were removed"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'DELETE FROM meetings WHERE updated_at < ?', (time.time() - self.ttl_seconds,)
+            )
+        return cursor.rowcount
@@ -0,0 +1,66 @@
+import hashlib
+import os
+import time
+from datetime import datetime, timezone
+from local_cache import cache_path, load_json, save_json
+
+# Fields the metric sections read; everything else is dropped before caching
+SNAPSHOT_TICKET_FIELDS = ('id', 'subject', 'status', 'priority', 'url', 'created_at', 'updated_at')
+
+
+class SnapshotStore:
+    """Per-agent metric snapshots computed ahead of their 1on1s.
+
+    A snapshot keeps the agent's planned ticket set (searched for the
+    meeting's date windows) and the metrics built from it. At report time
+    only tickets updated after `computed_at` are fetched and merged in, and
+    the stored metrics are a fallback if Zendesk is unavailable then.
+    """
+
+    def __init__(self, max_age_hours=24, directory='snapshots'):
+        self.max_age_seconds = max_age_hours * 3600
+        self.directory = cache_path(directory)
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+
+    def _path(self, agent_email):
+        # Hashed so agent emails don't appear in file names
+        digest = hashlib.sha256(agent_email.strip().lower().encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def save(self, agent_email, meeting_start, tickets, metrics, computed_at=None):
+        computed_at = computed_at or datetime.now(timezone.utc)
+        save_json(self._path(agent_email), {
+            'agent_email': agent_email,
+            'meeting_start': meeting_start,
+            'computed_at': computed_at.isoformat(),
+            'tickets': [
+                {field: ticket.get(field) for field in SNAPSHOT_TICKET_FIELDS if ticket.get(field) is not None}
+                for ticket in tickets
+            ],
+            'metrics': metrics
+        })
+
+    def load(self, agent_email):
+        """Return the agent's snapshot with `computed_at` parsed, or None if missing or expired"""
+        snapshot = load_json(self._path(agent_email))
+        if not snapshot:
+            return None
+        try:
+            snapshot['computed_at'] = datetime.fromisoformat(snapshot['computed_at'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        age = (datetime.now(timezone.utc) - snapshot['computed_at']).total_seconds()
+        if age >= self.max_age_seconds:
+            return None
+        return snapshot
+
+    def purge_expired(self):
+        """Delete snapshot files older than the maximum age; returns how many were removed"""
+        removed = 0
+        cutoff = time.time() - self.max_age_seconds
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.json') and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        return removed
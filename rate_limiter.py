@@ -0,0 +1,121 @@
+import random
+import threading
+import time
+
+# Statuses that mean "try again later" rather than "this request is wrong"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RateLimitGovernor:
+    """Token bucket that paces Zendesk requests and honours rate-limit headers.
+
+    The bucket refills at the account's per-minute limit. Zendesk's
+    X-Rate-Limit / X-Rate-Limit-Remaining headers resize and drain it so that
+    the bot slows down before the account limit is reached (other
+    integrations share the same budget), and Retry-After on a 429 blocks
+    every caller until the window reopens.
+
+    reserve() only computes the wait, so threaded and asyncio callers can
+    sleep in whatever way suits them; acquire() is the threaded version.
+    """
+
+    def __init__(self, requests_per_minute=200, safety_margin=0.1, max_retries=4,
+                 retry_budget=120, base_backoff=1.0, max_backoff=30.0):
+        self.capacity = float(requests_per_minute)
+        self.refill_rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.safety_margin = safety_margin
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.blocked_until = 0.0
+        self.throttled_seconds = 0.0
+        self.retries = 0
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self._last_refill = now
+
+    def reserve(self):
+        """Take one token and return how many seconds the caller must wait first"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self.blocked_until - now)
+            if self.tokens < 1:
+                wait = max(wait, (1 - self.tokens) / self.refill_rate)
+            self.tokens -= 1
+            self.throttled_seconds += wait
+            return wait
+
+    def acquire(self):
+        """Block the current thread until a request may be sent"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def observe(self, status_code, headers):
+        """Update the bucket from a response's status and rate-limit headers"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            limit = _header_number(headers, 'X-Rate-Limit')
+            if limit:
+                self.capacity = limit
+                self.refill_rate = limit / 60.0
+
+            remaining = _header_number(headers, 'X-Rate-Limit-Remaining')
+            if remaining is not None:
+                # Keep a reserve for the rest of the account; going below it
+                # drives the bucket negative, which spaces out later requests
+                reserve = self.capacity * self.safety_margin
+                self.tokens = min(self.tokens, remaining - reserve)
+
+            if status_code == 429:
+                retry_after = _header_number(headers, 'Retry-After')
+                if retry_after is None:
+                    retry_after = 60.0
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                self.tokens = min(self.tokens, 0)
+
+    def retry_delay(self, attempt, status_code=None, headers=None):
+        """Seconds to wait before retry number `attempt` (0-based)"""
+        if status_code == 429 and headers is not None:
+            retry_after = _header_number(headers, 'Retry-After')
+            if retry_after is not None:
+                return retry_after
+        # Jitter keeps concurrent callers from retrying in lockstep
+        cap = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+        return random.uniform(cap / 2, cap)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def get_stats(self):
+        """Return throttling counters for logging"""
+        with self._lock:
+            return {
+                'retries': self.retries,
+                'throttled_seconds': round(self.throttled_seconds, 1),
+                'limit_per_minute': int(self.capacity)
+            }
+
+
+def _header_number(headers, name):
+    """Read a numeric header, returning None when missing or malformed"""
+    if not headers:
+        return None
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
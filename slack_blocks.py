@@ -0,0 +1,302 @@
+"""
+Block Kit rendering for the 1on1 performance summary.
+
+Sanitizer patterns and line templates are compiled once at import. Each
+ticket is sanitized and linked once per render, however many sections list
+it. The result is split into messages that fit Slack's limits.
+"""
+
+import re
+from datetime import datetime, timezone
+
+# Slack limits: blocks per message and characters per section text
+MAX_BLOCKS_PER_MESSAGE = 50
+MAX_SECTION_CHARS = 3000
+# Slack doesn't publish a total; stay well clear of msg_too_long
+MAX_MESSAGE_CHARS = 12000
+
+# Email and IPv4 addresses. Kept as two patterns: a combined alternation
+# measured slower, and each is skipped when its literal ('@', three dots) is absent
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+_IP_RE = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b')
+# Redacted text is capped before display to prevent data exposure
+MAX_FIELD_CHARS = 200
+
+# Line templates; %-style with positional arguments is the cheapest formatting per ticket line
+LINKED_REF = '<%s|#%s: %s>'
+PLAIN_REF = '#%s: %s'
+URGENT_LINE = '%s %s (Status: %s)'
+ON_HOLD_LINE = '⏸️ %s'
+OLD_LINE = '%s %s - %s priority'
+CSAT_LINE = '%s %s'
+CSAT_COMMENT_LINE = '      💬 _"%s"_'
+SLA_LINE = '⏰ %s - %s over SLA'
+MORE_LINE = '... and %d more%s'
+SECTION_TITLE = '*%s (%d):*'
+DIGEST_LINE = '• %s (in %s min)'
+SNAPSHOT_NOTE = '⚠️ Zendesk was unavailable - these figures are from a snapshot taken at %s UTC (%d min ago)'
+PRIORITY_EMOJI = {'urgent': '🔴', 'high': '🟡'}
+
+
+def redact(text):
+    """Remove emails and IP addresses and cap the length (no mrkdwn escaping)"""
+    if not text:
+        return ''
+    text = str(text)
+    if '@' in text:
+        text = _EMAIL_RE.sub('[EMAIL]', text)
+    if text.count('.') >= 3:
+        text = _IP_RE.sub('[IP]', text)
+    if len(text) > MAX_FIELD_CHARS:
+        text = text[:MAX_FIELD_CHARS - 3] + '...'
+    return text
+
+
+def escape(text):
+    """Escape mrkdwn control characters; this also keeps subjects from breaking <url|text> links"""
+    if '&' in text or '<' in text or '>' in text:
+        return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return text
+
+
+def clip(text, length):
+    """Shorten redacted text to `length` characters for display, then escape it"""
+    if len(text) > length:
+        text = text[:length].rstrip() + '...'
+    return escape(text)
+
+
+def zendesk_ticket_link(ticket):
+    """Agent-facing URL for a ticket, only when its API URL is on a zendesk.com host"""
+    ticket_id = ticket.get('id')
+    ticket_url = ticket.get('url') or ''
+    if not ticket_id or '.zendesk.com' not in ticket_url:
+        return None
+    parts = ticket_url.split('/', 3)
+    if len(parts) >= 3 and parts[2].endswith('.zendesk.com'):
+        return f"https://{parts[2]}/agent/tickets/{ticket_id}"
+    return None
+
+
+class _Render:
+    """State for one render: a ticket listed in several sections is sanitized and linked once"""
+
+    def __init__(self):
+        self._tickets = {}
+        self._refs = {}
+
+    def ref(self, ticket, length):
+        ticket_id = ticket.get('id')
+        key = (ticket_id, length)
+        ref = self._refs.get(key)
+        if ref is None:
+            prepared = self._tickets.get(ticket_id)
+            if prepared is None:
+                prepared = self._tickets[ticket_id] = (
+                    redact(ticket.get('subject') or 'No subject'), zendesk_ticket_link(ticket)
+                )
+            subject, url = prepared
+            if url:
+                ref = LINKED_REF % (url, ticket_id, clip(subject, length))
+            else:
+                ref = PLAIN_REF % (ticket_id, clip(subject, length))
+            self._refs[key] = ref
+        return ref
+
+
+def _section_blocks(title, count, lines, empty_line):
+    """Section blocks for a titled list, split by line when one block would be too long"""
+    chunk = [SECTION_TITLE % (title, count)]
+    size = len(chunk[0])
+    blocks = []
+    for line in lines or [empty_line]:
+        if size + 1 + len(line) > MAX_SECTION_CHARS:
+            blocks.append(_mrkdwn_section('\n'.join(chunk)))
+            chunk = []
+            size = -1
+        chunk.append(line)
+        size += 1 + len(line)
+    blocks.append(_mrkdwn_section('\n'.join(chunk)))
+    return blocks
+
+
+def _mrkdwn_section(text):
+    return {'type': 'section', 'text': {'type': 'mrkdwn', 'text': text}}
+
+
+def _more(items, shown, suffix=''):
+    hidden = len(items) - shown
+    return [MORE_LINE % (hidden, suffix)] if hidden > 0 else []
+
+
+def _breach_time(ticket):
+    if ticket.get('breach_hours', 0) > 0:
+        return f"{ticket['breach_hours']}h"
+    return f"{ticket.get('breach_minutes', 0)}m"
+
+
+def _csat_lines(render, tickets, limit, score, good_emoji, other_emoji, suffix):
+    lines = []
+    for ticket in tickets[:limit]:
+        emoji = good_emoji if ticket.get('score') == score else other_emoji
+        lines.append(CSAT_LINE % (emoji, render.ref(ticket, 30)))
+        comment = redact(ticket.get('comment'))
+        if comment:
+            lines.append(CSAT_COMMENT_LINE % clip(comment, 30))
+    return lines + _more(tickets, limit, suffix)
+
+
+def discussion_points(metrics):
+    """Talking points derived from the metrics"""
+    points = []
+    total = metrics['total_tickets']
+    if total == 0:
+        points.append("• 🤔 No tickets assigned last week - discuss workload distribution")
+    elif metrics['solved_tickets'] / total < 0.7:
+        points.append("• 📈 Ticket resolution rate could be improved")
+    if len(metrics['urgent_tickets']) > 3:
+        points.append("• 🚨 High number of urgent tickets - discuss prioritization")
+    if metrics['on_hold_tickets']:
+        points.append("• ⏸️ Review on-hold tickets and next steps")
+    if metrics.get('old_tickets'):
+        points.append("• 📅 Address aging tickets - consider escalation or closure")
+    if metrics.get('negative_csat'):
+        points.append("• 😔 Review negative feedback and improvement opportunities")
+    if metrics.get('sla_breaches'):
+        points.append("• ⏰ Discuss SLA breach prevention strategies")
+    if metrics['internal_comments'] > metrics['external_comments'] * 2:
+        points.append("• 💭 High internal comment ratio - review communication efficiency")
+    return points
+
+
+def build_performance_blocks(metrics, meeting_info):
+    """All Block Kit blocks for one agent's summary, before splitting into messages"""
+    render = _Render()
+    agent_name = escape(redact(metrics.get('agent_name') or 'Unknown Agent'))
+    meeting_time = escape(str(meeting_info.get('start_time', 'Unknown time')))
+
+    urgent = metrics['urgent_tickets']
+    on_hold = metrics['on_hold_tickets']
+    old = metrics.get('old_tickets') or []
+    positive = metrics.get('positive_csat') or []
+    negative = metrics.get('negative_csat') or []
+    breaches = metrics.get('sla_breaches') or []
+
+    blocks = [
+        {'type': 'header', 'text': {'type': 'plain_text', 'text': '🎯 1on1 Performance Summary', 'emoji': True}},
+        {'type': 'section', 'fields': [
+            {'type': 'mrkdwn', 'text': f"*👤 Agent:*\n{agent_name}"},
+            {'type': 'mrkdwn', 'text': f"*📅 Meeting:*\n{meeting_time}"}
+        ]},
+        {'type': 'section', 'text': {'type': 'mrkdwn', 'text': '*📊 Last Week Performance:*'}, 'fields': [
+            {'type': 'mrkdwn', 'text': f"📋 Total Tickets: *{metrics['total_tickets']}*"},
+            {'type': 'mrkdwn', 'text': f"✅ Solved Tickets: *{metrics['solved_tickets']}*"},
+            {'type': 'mrkdwn', 'text': f"💬 Internal Comments: *{metrics['internal_comments']}*"},
+            {'type': 'mrkdwn', 'text': f"🗣️ External Comments: *{metrics['external_comments']}*"}
+        ]},
+        {'type': 'divider'}
+    ]
+    # Metrics from a precomputed snapshot stand in for live ones when Zendesk is down
+    if metrics.get('snapshot_computed_at'):
+        blocks.insert(1, {'type': 'context', 'elements': [
+            {'type': 'mrkdwn', 'text': _snapshot_note(metrics['snapshot_computed_at'])}
+        ]})
+
+    blocks += _section_blocks('🚨 Urgent Tickets', len(urgent), [
+        URGENT_LINE % (
+            '✅' if ticket.get('status') == 'solved' else '🔴',
+            render.ref(ticket, 50),
+            escape(str(ticket.get('status', 'unknown')))
+        )
+        for ticket in urgent
+    ], '✨ No urgent tickets')
+
+    blocks += _section_blocks('⏸️ On-Hold Tickets', len(on_hold), [
+        ON_HOLD_LINE % render.ref(ticket, 40) for ticket in on_hold
+    ], '✨ No tickets on hold')
+
+    blocks += _section_blocks('📅 Old Tickets - Over 2 Weeks', len(old), [
+        OLD_LINE % (
+            PRIORITY_EMOJI.get(ticket.get('priority'), '⚪'),
+            render.ref(ticket, 40),
+            escape(str(ticket.get('priority') or 'normal'))
+        )
+        for ticket in old[:5]
+    ] + _more(old, 5), '✨ No old tickets')
+
+    blocks += _section_blocks('😊 Positive CSAT Feedback', len(positive), _csat_lines(
+        render, positive, 3, 'great', '⭐', '👍', ' positive ratings'
+    ), '📝 No positive CSAT ratings this week')
+
+    blocks += _section_blocks('😔 Negative CSAT Feedback', len(negative), _csat_lines(
+        render, negative, 3, 'bad', '👎', '😐', ' negative ratings'
+    ), '✨ No negative CSAT ratings this week')
+
+    blocks += _section_blocks('⏰ SLA Breaches', len(breaches), [
+        SLA_LINE % (render.ref(ticket, 30), _breach_time(ticket))
+        for ticket in breaches[:5]
+    ] + _more(breaches, 5, ' breaches'), '✨ No SLA breaches')
+
+    points = discussion_points(metrics)
+    if points:
+        blocks.append({'type': 'divider'})
+        blocks.append(_mrkdwn_section('*💡 Discussion Points:*\n' + '\n'.join(points)))
+    return blocks
+
+
+def _snapshot_note(computed_at):
+    computed_at = datetime.fromisoformat(computed_at)
+    age_minutes = (datetime.now(timezone.utc) - computed_at).total_seconds() / 60
+    return SNAPSHOT_NOTE % (computed_at.strftime('%H:%M'), max(0, round(age_minutes)))
+
+
+def _block_chars(block):
+    text = block.get('text', {}).get('text', '')
+    return len(text) + sum(len(field['text']) for field in block.get('fields', ()))
+
+
+def split_messages(blocks, fallback_text):
+    """Pack blocks into as few messages as Slack's block and size limits allow
+
+    Returns a list of chat.postMessage payloads ({'text', 'blocks'}); `text`
+    is the notification/fallback text, marked with the part number when the
+    summary needs more than one message.
+    """
+    chunks = [[]]
+    size = 0
+    for block in blocks:
+        chars = _block_chars(block)
+        if chunks[-1] and (len(chunks[-1]) >= MAX_BLOCKS_PER_MESSAGE or size + chars > MAX_MESSAGE_CHARS):
+            chunks.append([])
+            size = 0
+        chunks[-1].append(block)
+        size += chars
+
+    if len(chunks) == 1:
+        return [{'text': fallback_text, 'blocks': chunks[0]}]
+    return [
+        {'text': f"{fallback_text} (part {number}/{len(chunks)})", 'blocks': chunk}
+        for number, chunk in enumerate(chunks, start=1)
+    ]
+
+
+def render_performance_summary(metrics, meeting_info):
+    """Render an agent's summary as one or more chat.postMessage payloads"""
+    agent_name = escape(redact(metrics.get('agent_name') or 'Unknown Agent'))
+    fallback_text = f"🎯 1on1 Performance Summary for {agent_name}"
+    if metrics.get('snapshot_computed_at'):
+        fallback_text += ' (from a snapshot)'
+    return split_messages(build_performance_blocks(metrics, meeting_info), fallback_text)
+
+
+def render_meeting_digest(meetings):
+    """Parent message for several 1on1s found in one check; their summaries go in its thread"""
+    lines = [
+        DIGEST_LINE % (clip(redact(meeting.get('summary') or '1on1'), 80), meeting.get('minutes_until', '?'))
+        for meeting in meetings
+    ]
+    blocks = _section_blocks('📋 1on1s starting soon', len(meetings), lines, '')
+    blocks.append({'type': 'context', 'elements': [
+        {'type': 'mrkdwn', 'text': 'Each agent\'s performance summary is in the thread 🧵'}
+    ]})
+    return split_messages(blocks, f"📋 {len(meetings)} 1on1s starting soon - summaries in the thread")
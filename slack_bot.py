@@ -1,230 +1,192 @@
-import re
+import hashlib
+import threading
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
-from config import SLACK_BOT_TOKEN, SLACK_CHANNEL_ID
+from slack_blocks import render_performance_summary, render_meeting_digest
+from slack_outbox import SlackOutbox, new_job
+from slack_messages import SlackMessageMap, meeting_message_key
+from local_cache import cache_path
+from config import (
+    SLACK_BOT_TOKEN, SLACK_CHANNEL_ID, SLACK_API_URL, SLACK_ASYNC_DELIVERY, SLACK_OUTBOX_MAX_AGE_MINUTES,
+    SLACK_ERROR_COALESCE_SECONDS, SLACK_DELIVERY_MODE, SLACK_MESSAGE_MAP_TTL_DAYS
+)
+
+# Distinct errors listed in one digest post
+MAX_DIGEST_LINES = 20
+
+# chat.update failures meaning the recorded message is gone; the summary is posted again instead
+MESSAGE_GONE_ERRORS = {'message_not_found', 'cant_update_message', 'edit_window_closed'}
+
+class MeetingDigest:
+    """Parent message for a batch of 1on1s, posted when the first summary in the batch is ready"""
+    
+    def __init__(self, key, messages):
+        self.key = key
+        self.messages = messages
+        self.job_id = None
+        self.lock = threading.Lock()
 
 class SlackBot:
-    def __init__(self):
-        self.client = WebClient(token=SLACK_BOT_TOKEN)
+    def __init__(self, outbox=None, delivery_mode=None, on_delivery=None):
+        self.client = WebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_URL)
         self.channel_id = SLACK_CHANNEL_ID
+        # 'post': one new message per summary. 'digest': summaries of a batch go in
+        # one digest thread, and a rerun edits the earlier summary instead of reposting
+        self.delivery_mode = delivery_mode or SLACK_DELIVERY_MODE
+        self.message_map = None
+        # on_delivery(ledger_key, delivered) learns whether a summary sent with a ledger_key went out
+        self.on_delivery = on_delivery
+        if self.delivery_mode == 'digest':
+            self.message_map = SlackMessageMap(cache_path('slack_messages.json'), ttl_days=SLACK_MESSAGE_MAP_TTL_DAYS)
+        if outbox is None and SLACK_ASYNC_DELIVERY:
+            outbox = SlackOutbox(
+                self._send_job,
+                cache_path('slack_outbox.json'),
+                self._format_error_digest,
+                max_age_seconds=SLACK_OUTBOX_MAX_AGE_MINUTES * 60,
+                error_coalesce_seconds=SLACK_ERROR_COALESCE_SECONDS,
+                on_finished=self._job_finished
+            )
+        self.outbox = outbox
     
-    def send_performance_summary(self, metrics, meeting_info):
-        """Send agent performance summary to Slack"""
-        if not metrics:
-            self.send_message("❌ Unable to retrieve performance metrics for the upcoming 1on1.")
-            return
-        
-        # Format the performance summary
-        message = self._format_performance_message(metrics, meeting_info)
-        
+    def _post(self, payload):
+        return self.client.chat_postMessage(channel=self.channel_id, **payload)
+    
+    def _submit(self, job, wait=False):
+        """Queue a job, or deliver it now; returns the job id, or None if a direct send failed"""
+        if self.outbox is not None and not wait:
+            return self.outbox.enqueue(job)
         try:
-            response = self.client.chat_postMessage(
-                channel=self.channel_id,
-                text=message,
-                parse='full'
-            )
-            return response
+            self._send_job(job, job.update)
         except SlackApiError as e:
             print(f"Error sending message: {e.response['error']}")
+            self._job_finished(job, False)
             return None
+        self._job_finished(job, True)
+        return job['id']
     
-    def _sanitize_slack_content(self, content):
-        """Sanitize content for Slack to prevent information leakage"""
-        if not content:
-            return content
-            
-        # Remove email addresses
-        content = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', content)
-        # Remove IP addresses
-        content = re.sub(r'\b(?:\d{1,3}\.){3}\d{1,3}\b', '[IP]', content)
-        # Limit length to prevent data exposure
-        if len(content) > 200:
-            content = content[:197] + "..."
-        return content
+    def _job_finished(self, job, delivered):
+        if job.get('ledger_key') and self.on_delivery is not None:
+            self.on_delivery(job['ledger_key'], delivered)
     
-    def _build_secure_zendesk_url(self, ticket):
-        """Build Zendesk URL with validation"""
-        try:
-            ticket_id = ticket.get('id')
-            ticket_url = ticket.get('url', '')
-            
-            if not ticket_id or not ticket_url:
-                return None
-                
-            # Validate that URL is from Zendesk
-            if '.zendesk.com' not in ticket_url:
-                return None
-                
-            # Extract subdomain safely
-            parts = ticket_url.split('/')
-            if len(parts) >= 3:
-                hostname = parts[2]
-                if hostname.endswith('.zendesk.com'):
-                    return f"https://{hostname}/agent/tickets/{ticket_id}"
-            
-            return None
-        except Exception:
-            return None
+    def _send_job(self, job, checkpoint):
+        """Make the Slack calls for a job; raises SlackApiError or OSError on failure
+        
+        With a map entry for the job's key the recorded messages are edited
+        with chat.update; parts beyond them are posted and parts the new
+        version no longer has are deleted. Progress is reported through
+        checkpoint() so a retry resumes after the last delivered part.
+        """
+        existing = None
+        if job.get('key') and self.message_map is not None:
+            existing = self.message_map.get(job['key'], self.channel_id)
+        previous = existing['ts'] if existing else []
+        thread_ts = existing['thread_ts'] if existing else None
+        if existing is None and job.get('reply_to') and self.message_map is not None:
+            parent = self.message_map.get(job['reply_to'], self.channel_id)
+            if parent:
+                thread_ts = parent['ts'][0]
+        
+        for index in range(len(job['posted']), len(job['messages'])):
+            payload = job['messages'][index]
+            ts = previous[index] if index < len(previous) else None
+            if ts and not self._update(ts, payload):
+                previous = previous[:index]
+                ts = None
+            if ts is None:
+                reply_ts = thread_ts or (job['posted'][0] if job['thread'] and job['posted'] else None)
+                response = self._post(dict(payload, thread_ts=reply_ts) if reply_ts else payload)
+                ts = response['ts']
+            checkpoint({'posted': job['posted'] + [ts]})
+        
+        for ts in previous[len(job['messages']):]:
+            self._delete_quietly(ts)
+        if job.get('key') and self.message_map is not None:
+            self.message_map.record(job['key'], self.channel_id, job['posted'], thread_ts)
     
-    def _format_performance_message(self, metrics, meeting_info):
-        """Format the performance metrics into a readable Slack message"""
-        agent_name = self._sanitize_slack_content(metrics.get('agent_name', 'Unknown Agent'))
-        meeting_time = meeting_info.get('start_time', 'Unknown time')
-        
-        message = f"""
-🎯 *1on1 Performance Summary*
-👤 *Agent:* {agent_name}
-📅 *Meeting:* {meeting_time}
-
-📊 *Last Week Performance:*
-• 📋 Total Tickets: {metrics['total_tickets']}
-• ✅ Solved Tickets: {metrics['solved_tickets']}
-• 💬 Internal Comments: {metrics['internal_comments']}
-• 🗣️ External Comments: {metrics['external_comments']}
-
-🚨 *Urgent Tickets ({len(metrics['urgent_tickets'])}):*
-"""
-        
-        if metrics['urgent_tickets']:
-            for ticket in metrics['urgent_tickets']:
-                status_emoji = "🔴" if ticket['status'] != 'solved' else "✅"
-                message += f"   {status_emoji} #{ticket['id']}: {ticket['subject'][:50]}... (Status: {ticket['status']})\n"
-        else:
-            message += "   ✨ No urgent tickets\n"
-        
-        message += f"\n⏸️ *On-Hold Tickets ({len(metrics['on_hold_tickets'])}):*\n"
-        
-        if metrics['on_hold_tickets']:
-            for ticket in metrics['on_hold_tickets']:
-                zendesk_url = self._build_secure_zendesk_url(ticket)
-                subject = self._sanitize_slack_content(ticket.get('subject', 'No subject'))
-                if zendesk_url:
-                    message += f"   ⏸️ [#{ticket['id']}: {subject[:40]}...]({zendesk_url})\n"
-                else:
-                    message += f"   ⏸️ #{ticket['id']}: {subject[:40]}...\n"
-        else:
-            message += "   ✨ No tickets on hold\n"
-        
-        # Add old tickets section
-        message += f"\n📅 *Old Tickets - Over 2 Weeks ({len(metrics.get('old_tickets', []))}):*\n"
-        
-        if metrics.get('old_tickets'):
-            for ticket in metrics['old_tickets'][:5]:  # Limit to first 5
-                priority_emoji = "🔴" if ticket.get('priority') == 'urgent' else "🟡" if ticket.get('priority') == 'high' else "⚪"
-                zendesk_url = self._build_secure_zendesk_url(ticket)
-                subject = self._sanitize_slack_content(ticket.get('subject', 'No subject'))
-                if zendesk_url:
-                    message += f"   {priority_emoji} [#{ticket['id']}: {subject[:40]}...]({zendesk_url}) - {ticket.get('status', 'unknown')} priority\n"
-                else:
-                    message += f"   {priority_emoji} #{ticket['id']}: {subject[:40]}... - {ticket.get('status', 'unknown')} priority\n"
-            
-            if len(metrics.get('old_tickets', [])) > 5:
-                message += f"   ... and {len(metrics['old_tickets']) - 5} more\n"
-        else:
-            message += "   ✨ No old tickets\n"
-        
-        # Add CSAT sections
-        message += f"\n😊 *Positive CSAT Feedback ({len(metrics.get('positive_csat', []))}):*\n"
-        
-        if metrics.get('positive_csat'):
-            for ticket in metrics['positive_csat'][:3]:  # Limit to first 3
-                score_emoji = "⭐" if ticket.get('score') == 'great' else "👍"
-                zendesk_url = self._build_secure_zendesk_url(ticket)
-                subject = self._sanitize_slack_content(ticket.get('subject', 'No subject'))
-                comment = self._sanitize_slack_content(ticket.get('comment', ''))
-                comment_preview = comment[:30] + "..." if len(comment) > 30 else comment
-                if zendesk_url:
-                    message += f"   {score_emoji} [#{ticket['id']}: {subject[:30]}...]({zendesk_url})\n"
-                else:
-                    message += f"   {score_emoji} #{ticket['id']}: {subject[:30]}...\n"
-                if comment_preview:
-                    message += f"      💬 \"{comment_preview}\"\n"
-            
-            if len(metrics.get('positive_csat', [])) > 3:
-                message += f"   ... and {len(metrics['positive_csat']) - 3} more positive ratings\n"
-        else:
-            message += "   📝 No positive CSAT ratings this week\n"
-        
-        message += f"\n😔 *Negative CSAT Feedback ({len(metrics.get('negative_csat', []))}):*\n"
-        
-        if metrics.get('negative_csat'):
-            for ticket in metrics['negative_csat'][:3]:  # Limit to first 3
-                score_emoji = "👎" if ticket.get('score') == 'bad' else "😐"
-                zendesk_url = self._build_secure_zendesk_url(ticket)
-                subject = self._sanitize_slack_content(ticket.get('subject', 'No subject'))
-                comment = self._sanitize_slack_content(ticket.get('comment', ''))
-                comment_preview = comment[:30] + "..." if len(comment) > 30 else comment
-                if zendesk_url:
-                    message += f"   {score_emoji} [#{ticket['id']}: {subject[:30]}...]({zendesk_url})\n"
-                else:
-                    message += f"   {score_emoji} #{ticket['id']}: {subject[:30]}...\n"
-                if comment_preview:
-                    message += f"      💬 \"{comment_preview}\"\n"
-            
-            if len(metrics.get('negative_csat', [])) > 3:
-                message += f"   ... and {len(metrics['negative_csat']) - 3} more negative ratings\n"
-        else:
-            message += "   ✨ No negative CSAT ratings this week\n"
-        
-        # Add SLA breach section
-        message += f"\n⏰ *SLA Breaches ({len(metrics.get('sla_breaches', []))}):*\n"
-        
-        if metrics.get('sla_breaches'):
-            for ticket in metrics['sla_breaches'][:5]:  # Limit to first 5
-                zendesk_url = self._build_secure_zendesk_url(ticket)
-                subject = self._sanitize_slack_content(ticket.get('subject', 'No subject'))
-                breach_time = f"{ticket.get('breach_hours', 0)}h" if ticket.get('breach_hours', 0) > 0 else f"{ticket.get('breach_minutes', 0)}m"
-                if zendesk_url:
-                    message += f"   ⏰ [#{ticket['id']}: {subject[:30]}...]({zendesk_url}) - {breach_time} over SLA\n"
-                else:
-                    message += f"   ⏰ #{ticket['id']}: {subject[:30]}... - {breach_time} over SLA\n"
-            
-            if len(metrics.get('sla_breaches', [])) > 5:
-                message += f"   ... and {len(metrics['sla_breaches']) - 5} more breaches\n"
-        else:
-            message += "   ✨ No SLA breaches\n"
-        
-        message += "\n💡 *Discussion Points:*\n"
-        
-        # Add discussion points based on metrics
-        if metrics['total_tickets'] == 0:
-            message += "• 🤔 No tickets assigned last week - discuss workload distribution\n"
-        elif metrics['solved_tickets'] / metrics['total_tickets'] < 0.7:
-            message += "• 📈 Ticket resolution rate could be improved\n"
-        
-        if len(metrics['urgent_tickets']) > 3:
-            message += "• 🚨 High number of urgent tickets - discuss prioritization\n"
-        
-        if len(metrics['on_hold_tickets']) > 0:
-            message += "• ⏸️ Review on-hold tickets and next steps\n"
-        
-        if len(metrics.get('old_tickets', [])) > 0:
-            message += "• 📅 Address aging tickets - consider escalation or closure\n"
-        
-        if len(metrics.get('negative_csat', [])) > 0:
-            message += "• 😔 Review negative feedback and improvement opportunities\n"
-        
-        if len(metrics.get('sla_breaches', [])) > 0:
-            message += "• ⏰ Discuss SLA breach prevention strategies\n"
-        
-        if metrics['internal_comments'] > metrics['external_comments'] * 2:
-            message += "• 💭 High internal comment ratio - review communication efficiency\n"
-        
-        return message
+    def _update(self, ts, payload):
+        """Edit a posted message; False if it no longer exists"""
+        try:
+            self.client.chat_update(channel=self.channel_id, ts=ts, **payload)
+            return True
+        except SlackApiError as e:
+            if e.response.get('error') in MESSAGE_GONE_ERRORS:
+                return False
+            raise
     
-    def send_message(self, message):
-        """Send a simple message to Slack"""
+    def _delete_quietly(self, ts):
         try:
-            response = self.client.chat_postMessage(
-                channel=self.channel_id,
-                text=message
-            )
-            return response
+            self.client.chat_delete(channel=self.channel_id, ts=ts)
         except SlackApiError as e:
-            print(f"Error sending message: {e.response['error']}")
+            print(f"⚠️ Could not delete outdated Slack message {ts}: {e.response.get('error')}")
+    
+    def flush(self, timeout=60):
+        """Wait for queued posts to be delivered; returns how many are still pending"""
+        if self.outbox is None:
+            return 0
+        return self.outbox.flush(timeout)
+    
+    def start_digest(self, meetings):
+        """Digest for a batch of meetings found in one check; None unless digest mode applies"""
+        if self.delivery_mode != 'digest' or len(meetings) < 2:
             return None
+        keys = sorted(meeting_message_key(meeting) for meeting in meetings)
+        key = 'digest:' + hashlib.sha256('|'.join(keys).encode('utf-8')).hexdigest()[:32]
+        return MeetingDigest(key, render_meeting_digest(meetings))
+    
+    def send_performance_summary(self, metrics, meeting_info, digest=None, ledger_key=None):
+        """Send agent performance summary to Slack
+        
+        Summaries too large for one message continue in the first
+        message's thread, so the channel still gets one post per meeting.
+        In digest mode a summary that was sent before is edited in place,
+        and with a `digest` (see start_digest) it is posted in the
+        digest's thread. `ledger_key` is handed to on_delivery once the
+        summary is delivered or given up on.
+        """
+        if not metrics:
+            self.send_message("❌ Unable to retrieve performance metrics for the upcoming 1on1.")
+            return
+        
+        messages = render_performance_summary(metrics, meeting_info)
+        options = {'ledger_key': ledger_key}
+        if self.message_map is not None:
+            options['key'] = meeting_message_key(meeting_info)
+        if digest is not None:
+            with digest.lock:
+                if digest.job_id is None:
+                    digest.job_id = self._submit(new_job(digest.messages, key=digest.key))
+            options['reply_to'] = digest.key
+            options['after'] = digest.job_id
+        return self._submit(new_job(messages, thread=True, **options))
+    
+    def send_message(self, message, wait=False):
+        """Send a simple message to Slack
+        
+        Queued for background delivery unless `wait` is set, in which case
+        it is posted right away.
+        """
+        return self._submit(new_job([{'text': message}]), wait=wait)
     
     def send_error_notification(self, error_message):
-        """Send error notification to Slack"""
-        message = f"❌ *Zendesk Slackbot Error*\n```{error_message}```"
-        return self.send_message(message)
+        """Send error notification to Slack; bursts of errors are combined into one post"""
+        if self.outbox is not None:
+            self.outbox.add_error(error_message)
+            return True
+        return self._submit(new_job([self._format_error_digest([error_message])]), wait=True)
+    
+    def _format_error_digest(self, error_messages):
+        """One Slack post for one or more error messages, repeats counted"""
+        counts = {}
+        for error_message in error_messages:
+            counts[error_message] = counts.get(error_message, 0) + 1
+        if len(counts) == 1:
+            error_message, count = next(iter(counts.items()))
+            suffix = f" (x{count})" if count > 1 else ""
+            return {'text': f"❌ *Zendesk Slackbot Error*{suffix}\n```{error_message}```"}
+        lines = [f"{error_message} (x{count})" if count > 1 else error_message
+                 for error_message, count in counts.items()]
+        if len(lines) > MAX_DIGEST_LINES:
+            lines = lines[:MAX_DIGEST_LINES] + [f"... and {len(lines) - MAX_DIGEST_LINES} more"]
+        body = '\n'.join(lines)
+        return {'text': f"❌ *Zendesk Slackbot Errors ({len(error_messages)})*\n```{body}```"}
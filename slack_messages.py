@@ -0,0 +1,48 @@
+import threading
+import time
+from local_cache import load_json, save_json
+
+
+def meeting_message_key(meeting):
+    """Map key for a meeting's summary; the start time is left out so a moved meeting keeps its message"""
+    return f"{meeting.get('id')}:{meeting.get('agent_email')}"
+
+
+class SlackMessageMap:
+    """Which Slack messages hold each summary, so a rerun can edit them in place.
+
+    Maps a key (see meeting_message_key) to the channel, the ts of every
+    message part, and the thread the parts were posted into. It is saved
+    between runs, and entries expire after ttl_days.
+    """
+
+    def __init__(self, path, ttl_days=3):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self._lock = threading.Lock()
+        cutoff = time.time() - self.ttl_seconds
+        entries = load_json(path, {}) or {}
+        self._entries = {key: entry for key, entry in entries.items() if entry.get('at', 0) >= cutoff}
+
+    def get(self, key, channel):
+        """Return the entry for `key` in `channel`, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.get('channel') != channel:
+                return None
+            return dict(entry)
+
+    def record(self, key, channel, message_ts, thread_ts=None):
+        with self._lock:
+            self._entries[key] = {
+                'channel': channel,
+                'ts': list(message_ts),
+                'thread_ts': thread_ts,
+                'at': time.time()
+            }
+            save_json(self.path, self._entries)
+
+    def forget(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                save_json(self.path, self._entries)
@@ -0,0 +1,265 @@
+import random
+import threading
+import time
+import uuid
+from slack_sdk.errors import SlackApiError
+from local_cache import load_json, save_json
+
+# Slack API errors worth retrying; anything else (channel_not_found,
+# invalid_blocks, ...) will fail the same way again
+RETRYABLE_SLACK_ERRORS = {'ratelimited', 'internal_error', 'fatal_error', 'service_unavailable', 'request_timeout'}
+
+# Attempts for a job that fails with an unexpected exception before it is dropped
+MAX_UNEXPECTED_ATTEMPTS = 3
+
+
+def new_job(messages, thread=False, key=None, reply_to=None, after=None, ledger_key=None):
+    """A unit of Slack delivery: one or more chat.postMessage payloads
+
+    With `thread`, later messages reply to the first. `key` names the
+    summary so a later job with the same key updates it in place, and
+    `reply_to` is the key of a message whose thread the job posts into.
+    `after` is the id of a queued job that must be delivered first.
+    `ledger_key` is the meeting ledger entry whose outcome depends on this
+    job. `posted` collects the ts of each message as it goes out, so a
+    retry resumes where the last attempt stopped.
+    """
+    return {
+        'id': uuid.uuid4().hex,
+        'created_at': time.time(),
+        'messages': list(messages),
+        'thread': thread,
+        'key': key,
+        'reply_to': reply_to,
+        'after': after,
+        'ledger_key': ledger_key,
+        'posted': [],
+        'attempts': 0,
+        'not_before': 0
+    }
+
+
+class SlackOutbox:
+    """Durable outbound queue for Slack posts, sent by a background thread.
+
+    Callers enqueue and return at once, so Slack latency stays off the
+    metrics path. `send(job, checkpoint)` performs the Slack calls for a
+    job and reports progress through `checkpoint(changes)`. A 429 pauses
+    all sending for the Retry-After period. Transient failures are retried
+    with jittered exponential backoff.
+    Error notifications are buffered for `error_coalesce_seconds` and sent
+    as one digest. Everything not yet delivered is saved to `path`, so the
+    next run resends it unless it is older than `max_age_seconds`.
+    `on_finished(job, delivered)` is called once per job when it is
+    delivered, dropped, or expired.
+    """
+
+    def __init__(self, send, path, render_errors, max_age_seconds=3600, error_coalesce_seconds=10,
+                 base_backoff=1.0, max_backoff=60.0, on_finished=None):
+        self._send = send
+        self._on_finished = on_finished
+        self.path = path
+        self._render_errors = render_errors
+        self.max_age_seconds = max_age_seconds
+        self.error_coalesce_seconds = error_coalesce_seconds
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._cond = threading.Condition()
+        self._thread = None
+        self._flushing = False
+        self._blocked_until = 0.0
+        self.stats = {'delivered': 0, 'retries': 0, 'rate_limited_seconds': 0.0, 'dropped': 0}
+
+        state = load_json(path, {}) or {}
+        cutoff = time.time() - max_age_seconds
+        # Fields missing from files written by older versions get their defaults
+        self._jobs = [{**new_job([]), **job} for job in state.get('jobs', [])]
+        self._errors = [error for error in state.get('errors', []) if error.get('at', 0) >= cutoff]
+        expired = self._take_expired()
+        if expired:
+            print(f"📬 {len(expired)} Slack messages from an earlier run are too old to send - dropping them")
+            self._finished(expired, False)
+        if self._jobs or self._errors:
+            print(f"📬 Resending {len(self._jobs)} Slack messages and {len(self._errors)} "
+                  f"error notifications left over from an earlier run")
+            for job in self._jobs:
+                job['not_before'] = 0
+            self._start()
+
+    def enqueue(self, job):
+        """Queue a job built by new_job(); returns its id"""
+        with self._cond:
+            self._jobs.append(job)
+            self._save()
+            self._cond.notify()
+        self._start()
+        return job['id']
+
+    def add_error(self, text):
+        """Buffer an error notification for the next digest"""
+        with self._cond:
+            self._errors.append({'text': text, 'at': time.time()})
+            self._save()
+            self._cond.notify()
+        self._start()
+
+    def pending(self):
+        with self._cond:
+            return len(self._jobs) + (1 if self._errors else 0)
+
+    def flush(self, timeout=60):
+        """Send buffered errors now and wait for the queue to drain; returns how many posts are left"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flushing = True
+            self._cond.notify()
+            while self._jobs or self._errors:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            self._flushing = False
+            left = len(self._jobs) + (1 if self._errors else 0)
+        if left:
+            print(f"📬 {left} Slack posts not delivered yet - kept for the next run")
+        return left
+
+    def _start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='slack-outbox', daemon=True)
+                self._thread.start()
+
+    def _save(self):
+        # Caller holds the lock
+        save_json(self.path, {'jobs': self._jobs, 'errors': self._errors})
+
+    def _take_expired(self):
+        """Remove and return jobs older than max_age_seconds (caller holds the lock, or is __init__)"""
+        cutoff = time.time() - self.max_age_seconds
+        expired = [job for job in self._jobs if job['created_at'] < cutoff]
+        if expired:
+            self._jobs = [job for job in self._jobs if job['created_at'] >= cutoff]
+            self.stats['dropped'] += len(expired)
+            self._save()
+        return expired
+
+    def _finished(self, jobs, delivered):
+        # Called without the lock held
+        if self._on_finished is None:
+            return
+        for job in jobs:
+            try:
+                self._on_finished(job, delivered)
+            except Exception as e:
+                print(f"⚠️ Slack delivery callback failed: {e}")
+
+    def _next_job(self):
+        """Return the next job that may be sent now, or how long to wait for one (caller holds the lock)"""
+        now = time.time()
+        if self._errors:
+            due = self._errors[0]['at'] + self.error_coalesce_seconds
+            if self._flushing or due <= now:
+                texts = [error['text'] for error in self._errors]
+                self._errors = []
+                self._jobs.append(new_job([self._render_errors(texts)]))
+                self._save()
+
+        wait = None
+        blocked = max(0.0, self._blocked_until - time.monotonic())
+        queued = {job['id'] for job in self._jobs}
+        for job in self._jobs:
+            if job.get('after') in queued:
+                continue  # Its parent message hasn't gone out yet
+            delay = max(blocked, job['not_before'] - now)
+            if delay <= 0:
+                return job, None
+            wait = delay if wait is None else min(wait, delay)
+        if self._errors and not self._flushing:
+            due = self._errors[0]['at'] + self.error_coalesce_seconds - now
+            wait = due if wait is None else min(wait, due)
+        return None, wait
+
+    def _run(self):
+        while True:
+            with self._cond:
+                expired = self._take_expired()
+                job, wait = (None, 0) if expired else self._next_job()
+                if job is None and not expired:
+                    self._cond.notify_all()  # Wakes flush() once the queue is empty
+                    self._cond.wait(wait)
+                    continue
+            if expired:
+                print(f"📬 {len(expired)} Slack messages could not be delivered in time - dropping them")
+                self._finished(expired, False)
+                continue
+            self._deliver(job)
+
+    def _deliver(self, job):
+        try:
+            self._send(job, lambda changes: self._checkpoint(job, changes))
+        except SlackApiError as e:
+            self._handle_failure(job, e.response.status_code, e.response.get('error'), e.response.headers)
+            return
+        except OSError as e:
+            # Network errors and timeouts
+            self._handle_failure(job, None, f"connection_error: {e}", None)
+            return
+        except Exception as e:
+            # Anything else (a bad payload, a bug) must not kill the delivery thread
+            self._handle_failure(job, None, f"unexpected_error: {e!r}", None, max_attempts=MAX_UNEXPECTED_ATTEMPTS)
+            return
+
+        with self._cond:
+            self._jobs.remove(job)
+            self.stats['delivered'] += 1
+            self._save()
+            self._cond.notify_all()
+        self._finished([job], True)
+
+    def _checkpoint(self, job, changes):
+        with self._cond:
+            job.update(changes)
+            self._save()
+
+    def _handle_failure(self, job, status_code, slack_error, headers, max_attempts=None):
+        dropped = False
+        with self._cond:
+            if max_attempts is not None and job['attempts'] + 1 >= max_attempts:
+                print(f"❌ Slack post failed {max_attempts} times ({slack_error}) - dropping it")
+                self._jobs.remove(job)
+                self.stats['dropped'] += 1
+                dropped = True
+            elif status_code == 429:
+                retry_after = _retry_after(headers)
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                self.stats['rate_limited_seconds'] += retry_after
+                print(f"⏳ Slack rate limit hit - pausing delivery for {retry_after:g}s")
+            elif status_code is None or status_code >= 500 or slack_error in RETRYABLE_SLACK_ERRORS:
+                cap = min(self.max_backoff, self.base_backoff * (2 ** job['attempts']))
+                delay = random.uniform(cap / 2, cap)
+                job['attempts'] += 1
+                job['not_before'] = time.time() + delay
+                self.stats['retries'] += 1
+                print(f"⚠️ Slack post failed ({slack_error}) - retrying in {delay:.1f}s")
+            else:
+                print(f"❌ Slack rejected a message ({slack_error}) - dropping it")
+                self._jobs.remove(job)
+                self.stats['dropped'] += 1
+                dropped = True
+            self._save()
+            self._cond.notify_all()
+        if dropped:
+            self._finished([job], False)
+
+
+def _retry_after(headers):
+    """Seconds from a Retry-After header, defaulting to a minute"""
+    headers = headers or {}
+    value = headers.get('Retry-After', headers.get('retry-after'))
+    if isinstance(value, list):
+        value = value[0] if value else None
+    try:
+        return max(1.0, float(value))
+    except (TypeError, ValueError):
+        return 60.0
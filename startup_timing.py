@@ -0,0 +1,41 @@
+"""
+Startup timing: how long after process launch each startup milestone was
+reached, e.g. the first Calendar API call of a cron run.
+"""
+
+import os
+import time
+
+
+def _process_started_at():
+    """Wall-clock launch time of this process, or the import time where /proc isn't available"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the parenthesised command name; starttime is field 22
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+PROCESS_STARTED_AT = _process_started_at()
+_marks = {}
+_reported = set()
+
+
+def mark(label):
+    """Record the first time `label` happened; returns seconds since process launch"""
+    if label not in _marks:
+        _marks[label] = time.time() - PROCESS_STARTED_AT
+    return _marks[label]
+
+
+def report():
+    """Log recorded milestones in the order they were reached, each only once per process"""
+    for label, elapsed in sorted(_marks.items(), key=lambda item: item[1]):
+        if label in _reported:
+            continue
+        _reported.add(label)
+        print(f"⏱️ {label}: {elapsed * 1000:.0f} ms after process launch")
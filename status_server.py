@@ -0,0 +1,66 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StatusServer:
+    """Tiny HTTP endpoint exposing a long-running process's status.
+
+    GET /status returns get_status() as JSON. GET /healthz returns 200 while
+    get_status()['healthy'] is true and 503 otherwise, for load balancers and
+    container health checks.
+    """
+
+    def __init__(self, get_status, host='0.0.0.0', port=8081):
+        self.get_status = get_status
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"💓 Status endpoint listening on port {self.port} (/status, /healthz)")
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path not in ('/status', '/healthz'):
+                    self._send(404, {'error': 'not found'})
+                    return
+                try:
+                    status = server.get_status()
+                except Exception as e:
+                    self._send(500, {'healthy': False, 'error': str(e)})
+                    return
+                code = 200 if status.get('healthy') else 503
+                self._send(code, status if path == '/status' else {'healthy': status.get('healthy')})
+
+            def _send(self, code, body):
+                payload = json.dumps(body, default=_json_default).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def _json_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
@@ -0,0 +1,222 @@
+import asyncio
+import re
+from datetime import datetime, timedelta, timezone
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import local_cache
+from async_zendesk_client import AsyncZendeskClient
+from rate_limiter import RateLimitGovernor
+from zendesk_client import ZendeskClient, ZendeskAPIError
+
+AGENT = {'id': 42, 'name': 'Ada', 'email': 'ada@example.com', 'role': 'agent'}
+
+
+def iso(days_ago):
+    return (datetime.now(timezone.utc) - timedelta(days=days_ago)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def ticket(ticket_id, status, created, updated, priority='normal'):
+    return {'id': ticket_id, 'subject': f'Ticket {ticket_id}', 'status': status, 'priority': priority,
+            'assignee_id': AGENT['id'], 'created_at': iso(created), 'updated_at': iso(updated)}
+
+
+RECENT = [ticket(1, 'solved', 2, 1, 'urgent'), ticket(2, 'open', 3, 2), ticket(3, 'solved', 4, 3)]
+AGED = [ticket(4, 'open', 30, 10, 'high')]
+BREACHED = {'policy_metrics': [{'metric': 'first_reply_time', 'stage': 'active', 'breach_at': iso(1)}]}
+
+
+class StandInZendesk:
+    """Answers the Zendesk endpoints a report needs and records every request
+
+    `bulk=False` makes the comment stream and CSAT listing answer 403, so
+    the per-ticket fallbacks are used. Individual paths can be overridden
+    with `overrides[path] = (status, body, headers)` or a list of those,
+    used one per request.
+    """
+
+    def __init__(self, bulk=True):
+        self.bulk = bulk
+        self.overrides = {}
+        self.requests = []
+        self.delay = 0
+
+    async def handle(self, request):
+        path = request.path.split('/api/v2/', 1)[1]
+        query = dict(request.query)
+        self.requests.append((path, query))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        override = self.overrides.get(path)
+        if isinstance(override, list):
+            override = override.pop(0) if override else None
+        status, body, headers = override or self.respond(path, query)
+        return web.json_response(body, status=status, headers=headers)
+
+    def respond(self, path, query):
+        if path == 'users/me.json':
+            return 200, {'user': AGENT}, None
+        if path == 'users/search.json':
+            users = [AGENT] if AGENT['email'] in query['query'] else []
+            return 200, {'users': users, 'count': len(users)}, None
+        if path == 'search/export.json':
+            if 'created<=' in query['query']:
+                return 200, {'results': AGED, 'meta': {'has_more': False}}, None
+            # The weekly search comes back over two pages
+            if query.get('page[after]') == 'p2':
+                return 200, {'results': RECENT[1:], 'meta': {'has_more': False}}, None
+            return 200, {'results': RECENT[:1], 'meta': {'has_more': True, 'after_cursor': 'p2'}}, None
+        if path in ('incremental/ticket_events.json', 'satisfaction_ratings.json') and not self.bulk:
+            return 403, {'error': 'Forbidden'}, None
+        if path == 'incremental/ticket_events.json':
+            return 200, {'ticket_events': [
+                {'ticket_id': 1, 'timestamp': int(datetime.now().timestamp()) - 3600, 'child_events': [
+                    {'id': 10, 'event_type': 'Comment', 'author_id': 42, 'public': True},
+                    {'id': 11, 'event_type': 'Comment', 'author_id': 42, 'public': False}]},
+                {'ticket_id': 2, 'timestamp': int(datetime.now().timestamp()) - 3600, 'child_events': [
+                    {'id': 12, 'event_type': 'Comment', 'author_id': 42, 'public': True}]}
+            ], 'end_time': int(datetime.now().timestamp()), 'end_of_stream': True}, None
+        if path == 'satisfaction_ratings.json':
+            return 200, {'satisfaction_ratings': [
+                {'ticket_id': 1, 'score': 'good', 'comment': 'Thanks!', 'updated_at': iso(1)},
+                {'ticket_id': 3, 'score': 'bad', 'comment': 'Slow', 'updated_at': iso(2)}
+            ], 'meta': {'has_more': False}}, None
+        if path == 'tickets/show_many.json':
+            ids = [int(ticket_id) for ticket_id in query['ids'].split(',')]
+            return 200, {'tickets': [{'id': ticket_id, 'slas': BREACHED if ticket_id == 2 else {}}
+                                     for ticket_id in ids]}, None
+        match = re.fullmatch(r'tickets/(\d+)/(comments|satisfaction_rating)\.json', path)
+        if match and match.group(2) == 'comments':
+            comments = {1: [{'author_id': 42, 'public': True}, {'author_id': 42, 'public': False}],
+                        2: [{'author_id': 42, 'public': True}]}.get(int(match.group(1)), [])
+            return 200, {'comments': comments, 'meta': {'has_more': False}}, None
+        if match:
+            rating = {1: {'score': 'good', 'comment': 'Thanks!'}, 3: {'score': 'bad', 'comment': 'Slow'}}
+            return 200, {'satisfaction_rating': rating.get(int(match.group(1)))}, None
+        return 404, {'error': 'RecordNotFound'}, None
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch, tmp_path):
+    # User index, capabilities and credential checks start empty for every test
+    monkeypatch.setattr(local_cache, 'BOT_CACHE_DIR', str(tmp_path))
+
+
+def make_client(server):
+    governor = RateLimitGovernor(requests_per_minute=6000, max_retries=2, retry_budget=5, base_backoff=0.01)
+    client = ZendeskClient(governor=governor)
+    client.base_url = str(server.make_url('/api/v2'))
+    return client
+
+
+def run(stand_in, scenario):
+    """Serve `stand_in` on a local port and run scenario(server) on the same event loop"""
+    async def main():
+        app = web.Application()
+        app.router.add_route('GET', '/{tail:.*}', stand_in.handle)
+        async with TestServer(app) as server:
+            return await scenario(server)
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize('bulk', [True, False])
+def test_metrics_match_the_threaded_client(bulk):
+    stand_in = StandInZendesk(bulk=bulk)
+
+    async def scenario(server):
+        threaded = make_client(server)
+        expected = await asyncio.to_thread(threaded.get_agent_performance_metrics, AGENT['email'])
+        threaded.close()
+        stand_in.requests.clear()
+
+        client = make_client(server)
+        async with AsyncZendeskClient(client) as async_client:
+            actual = await async_client.get_agent_performance_metrics(AGENT['email'])
+        client.close()
+        return expected, actual
+
+    expected, actual = run(stand_in, scenario)
+    assert actual == expected
+    assert actual['total_tickets'] == 3
+    assert (actual['external_comments'], actual['internal_comments']) == (2, 1)
+    assert [entry['id'] for entry in actual['positive_csat']] == [1]
+    assert [entry['id'] for entry in actual['negative_csat']] == [3]
+    assert [entry['id'] for entry in actual['sla_breaches']] == [2]
+    assert [entry['id'] for entry in actual['old_tickets']] == [4]
+
+    paths = [path for path, _ in stand_in.requests]
+    if bulk:
+        assert not any(path.startswith('tickets/') and path != 'tickets/show_many.json' for path in paths)
+    else:
+        # The optional listings were remembered as unsupported by the first client
+        assert 'satisfaction_ratings.json' not in paths
+        assert {'tickets/1/comments.json', 'tickets/2/comments.json', 'tickets/3/comments.json'} <= set(paths)
+        assert {'tickets/1/satisfaction_rating.json', 'tickets/3/satisfaction_rating.json'} <= set(paths)
+
+
+def test_team_metrics_map_each_agent_to_its_result():
+    stand_in = StandInZendesk()
+
+    async def scenario(server):
+        client = make_client(server)
+        async with AsyncZendeskClient(client) as async_client:
+            results = await async_client.get_team_metrics([AGENT['email'], 'nobody@example.com'])
+        client.close()
+        return results
+
+    results = run(stand_in, scenario)
+    assert results[AGENT['email']]['agent_name'] == 'Ada'
+    assert results['nobody@example.com'] is None
+
+
+class ExpiredCursorZendesk(StandInZendesk):
+    """Fails the second page of the weekly search"""
+
+    def respond(self, path, query):
+        if path == 'search/export.json' and query.get('page[after]') == 'p2':
+            return 404, {'error': 'InvalidCursor'}, None
+        return super().respond(path, query)
+
+
+def test_failed_continuation_page_fails_the_report():
+    stand_in = ExpiredCursorZendesk()
+
+    async def scenario(server):
+        client = make_client(server)
+        async with AsyncZendeskClient(client) as async_client:
+            results = await async_client.get_team_metrics([AGENT['email']])
+        client.close()
+        return results
+
+    assert isinstance(run(stand_in, scenario)[AGENT['email']], ZendeskAPIError)
+
+
+def test_throttled_requests_are_retried():
+    stand_in = StandInZendesk()
+    stand_in.overrides['tickets/show_many.json'] = [(429, {'error': 'TooManyRequests'}, {'Retry-After': '0'})]
+
+    async def scenario(server):
+        client = make_client(server)
+        async with AsyncZendeskClient(client) as async_client:
+            slas = await async_client.get_ticket_slas([1, 2])
+        client.close()
+        return slas, client.governor.get_stats()['retries']
+
+    slas, retries = run(stand_in, scenario)
+    assert slas == {1: {}, 2: BREACHED}
+    assert retries == 1
+
+
+def test_agents_past_the_timeout_map_to_timeout_errors():
+    stand_in = StandInZendesk()
+
+    async def scenario(server):
+        client = make_client(server)
+        await asyncio.to_thread(client.get_user_by_email, AGENT['email'])
+        stand_in.delay = 1
+        async with AsyncZendeskClient(client) as async_client:
+            results = await async_client.get_team_metrics([AGENT['email']], timeout_seconds=0.1)
+        client.close()
+        return results
+
+    assert isinstance(run(stand_in, scenario)[AGENT['email']], asyncio.TimeoutError)
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from calendar_sync import CalendarSync
+
+
+def event(event_id, hours=2, summary='1on1 Ada'):
+    start = (datetime.now(timezone.utc) + timedelta(hours=hours)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return {'id': event_id, 'summary': summary, 'start': {'dateTime': start},
+            'attendees': [{'email': 'ada@example.com'}]}
+
+
+def http_error(status):
+    return HttpError(httplib2.Response({'status': status}), b'{}')
+
+
+class FakeService:
+    """events().list(**params).execute() answering from per-calendar results or errors"""
+
+    def __init__(self, calendars):
+        self.calendars = calendars
+        self.requests = []
+        self.incremental_error = None
+
+    def events(self):
+        return self
+
+    def list(self, **params):
+        self.requests.append(params)
+        return self
+
+    def execute(self):
+        params = self.requests[-1]
+        if 'syncToken' in params:
+            if self.incremental_error:
+                raise self.incremental_error
+            return {'items': [], 'nextSyncToken': 'token-2'}
+        result = self.calendars.get(params['calendarId'])
+        if isinstance(result, Exception):
+            raise result
+        return {'items': result, 'nextSyncToken': 'token-1'}
+
+
+@pytest.fixture
+def sync(tmp_path):
+    return CalendarSync(filename=str(tmp_path / 'calendar_sync.json'))
+
+
+def test_full_sync_falls_back_across_calendars_then_goes_incremental(sync):
+    service = FakeService({'me@example.com': http_error(404), 'primary': [event('a')]})
+    assert sync.sync(service, ['me@example.com', 'primary'])
+    assert sync.calendar_id == 'primary'
+    assert [e['id'] for e in sync.events.values()] == ['a']
+
+    service.requests.clear()
+    assert sync.sync(service, ['me@example.com', 'primary'])
+    assert service.requests[0]['syncToken'] == 'token-1'
+    assert sync.sync_token == 'token-2'
+
+
+@pytest.mark.parametrize('error', [http_error(410), http_error(500), ValueError('bad response')])
+def test_failed_incremental_sync_runs_a_full_sync(sync, error):
+    service = FakeService({'primary': [event('a')]})
+    sync.sync(service, ['primary'])
+    service.calendars['primary'] = [event('a'), event('b')]
+    service.incremental_error = error
+
+    assert sync.sync(service, ['primary'])
+    assert sorted(sync.events) == ['a', 'b']
+    assert sync.stats['full_syncs'] == 2
+
+
+def test_no_readable_calendar_fails(sync):
+    service = FakeService({'primary': http_error(403)})
+    assert not sync.sync(service, ['primary'])
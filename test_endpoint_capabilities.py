@@ -0,0 +1,52 @@
+import pytest
+from endpoint_capabilities import EndpointCapabilities, endpoint_key
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'capabilities.json')
+
+
+@pytest.mark.parametrize('endpoint, params', [
+    ('satisfaction_ratings.json', {'score': 'received'}),
+    ('incremental/ticket_events.json', {'start_time': 1}),
+    ('tickets/show_many.json', {'ids': '1,2', 'include': 'slas'}),
+])
+def test_optional_endpoints_are_skipped_after_403_or_404(path, endpoint, params):
+    capabilities = EndpointCapabilities(3600, 'account', path)
+    assert capabilities.record_failure(endpoint, 403, params)
+    assert capabilities.is_unsupported(endpoint, params)
+
+
+@pytest.mark.parametrize('endpoint, params', [
+    ('users/search.json', {'query': 'a@example.com'}),
+    ('tickets/show_many.json', {'ids': '1,2'}),
+    ('groups/7/users.json', None),
+])
+def test_core_endpoints_are_never_skipped(path, endpoint, params):
+    capabilities = EndpointCapabilities(3600, 'account', path)
+    assert not capabilities.record_failure(endpoint, 404, params)
+    assert not capabilities.is_unsupported(endpoint, params)
+
+
+def test_other_errors_are_not_remembered(path):
+    capabilities = EndpointCapabilities(3600, 'account', path)
+    assert not capabilities.record_failure('satisfaction_ratings.json', 500)
+    assert not capabilities.is_unsupported('satisfaction_ratings.json')
+
+
+def test_entries_are_kept_per_credential(path):
+    EndpointCapabilities(3600, 'account', path).record_failure('satisfaction_ratings.json', 403)
+    assert EndpointCapabilities(3600, 'account', path).is_unsupported('satisfaction_ratings.json')
+    assert not EndpointCapabilities(3600, 'rotated', path).is_unsupported('satisfaction_ratings.json')
+
+
+def test_entries_expire(path):
+    capabilities = EndpointCapabilities(0, 'account', path)
+    capabilities.record_failure('satisfaction_ratings.json', 403)
+    assert not capabilities.is_unsupported('satisfaction_ratings.json')
+
+
+def test_side_load_is_part_of_the_key():
+    assert endpoint_key('tickets/123/comments.json') == 'tickets/{id}/comments.json'
+    assert endpoint_key('tickets/show_many.json', {'include': 'slas'}) == 'tickets/show_many.json?include=slas'
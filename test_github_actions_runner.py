@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from config import PRECOMPUTE_INTERVAL_MINUTES
+import github_actions_runner
+from github_actions_runner import GitHubActionsRunner
+from meeting_ledger import MeetingLedger, SENT, QUEUED
+from zendesk_client import ZendeskClient, ZendeskAPIError
+
+
+class FakeSlackBot:
+    def __init__(self):
+        self.digests = []
+
+    def start_digest(self, meetings):
+        self.digests.append([meeting['agent_email'] for meeting in meetings])
+        return 'digest' if len(meetings) > 1 else None
+
+
+def meeting(name):
+    return {'id': f'event-{name}', 'start_time': '2026-10-16T10:00:00Z', 'summary': f'1on1 {name}',
+            'agent_email': f'{name}@example.com'}
+
+
+@pytest.fixture
+def bare_runner(monkeypatch, tmp_path):
+    monkeypatch.setattr(GitHubActionsRunner, '_initialize_clients', lambda self: None)
+    runner = GitHubActionsRunner()
+    runner.meeting_ledger = MeetingLedger(str(tmp_path / 'ledger.sqlite'))
+    return runner
+
+
+@pytest.fixture
+def runner(bare_runner):
+    runner = bare_runner
+    runner.slack_bot = FakeSlackBot()
+    runner.processed = []
+    runner.prepared = {}
+
+    def process_meeting(meeting, cancelled=None, digest=None, ledger_key=None, prepared=None):
+        runner.processed.append((meeting['agent_email'], digest))
+        runner.prepared[meeting['agent_email']] = prepared
+        return True
+    runner.process_meeting = process_meeting
+    return runner
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_digest_lists_only_meetings_this_run_claimed(runner, workers):
+    ada, bob, cy = meeting('ada'), meeting('bob'), meeting('cy')
+    key = (ada['id'], ada['start_time'], ada['agent_email'])
+    runner.meeting_ledger.claim(*key)
+    runner.meeting_ledger.mark(*key, SENT)
+
+    runner.process_meetings([ada, bob, cy], workers=workers)
+
+    assert runner.slack_bot.digests == [['bob@example.com', 'cy@example.com']]
+    assert sorted(runner.processed) == [('bob@example.com', 'digest'), ('cy@example.com', 'digest')]
+    assert runner.meeting_ledger.status_of(bob['id'], bob['start_time'], bob['agent_email']) == QUEUED
+
+
+def test_nothing_is_started_when_every_meeting_was_handled(runner):
+    ada = meeting('ada')
+    runner.process_meetings([ada])
+    runner.slack_bot.digests.clear()
+    runner.processed.clear()
+
+    runner.process_meetings([ada])
+    assert runner.slack_bot.digests == []
+    assert runner.processed == []
+
+
+def test_recent_snapshot_metrics_are_labelled(runner):
+    computed_at = datetime.now(timezone.utc) - timedelta(minutes=10)
+    metrics = runner._snapshot_metrics({'computed_at': computed_at, 'metrics': {'total_tickets': 3}})
+    assert metrics == {'total_tickets': 3, 'snapshot_computed_at': computed_at.isoformat()}
+
+
+def test_snapshots_older_than_the_precompute_interval_are_refused(runner):
+    computed_at = datetime.now(timezone.utc) - timedelta(minutes=PRECOMPUTE_INTERVAL_MINUTES + 1)
+    assert runner._snapshot_metrics({'computed_at': computed_at, 'metrics': {'total_tickets': 3}}) is None
+
+
+class FakeCalendar:
+    def __init__(self, meetings):
+        self.meetings = meetings
+
+    def get_meetings_in_window(self, min_minutes, max_minutes):
+        return self.meetings
+
+
+def test_check_continues_when_the_group_prefetch_fails(runner, monkeypatch):
+    def prefetch(group_id):
+        raise ZendeskAPIError('groups/7/users.json', 'HTTP 503', 3)
+    monkeypatch.setattr(github_actions_runner, 'ZENDESK_AGENT_GROUP_ID', '7')
+    runner.zendesk_client = ZendeskClient()
+    runner.zendesk_client.prefetch_group_users = prefetch
+    runner.calendar_monitor = FakeCalendar([meeting('ada')])
+
+    assert runner.check_for_upcoming_meetings()
+    assert runner.processed == [('ada@example.com', None)]
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_async_metrics_are_built_for_the_claimed_meetings_up_front(runner, monkeypatch, workers):
+    built = []
+
+    def build_team_metrics(meetings, timeout_seconds):
+        built.append([meeting['agent_email'] for meeting in meetings])
+        return {meeting['agent_email']: (None, {'agent_email': meeting['agent_email']}, None) for meeting in meetings}
+    monkeypatch.setattr(runner, '_build_team_metrics', build_team_metrics)
+    runner.async_metrics = True
+    ada, bob = meeting('ada'), meeting('bob')
+    key = (ada['id'], ada['start_time'], ada['agent_email'])
+    runner.meeting_ledger.claim(*key)
+    runner.meeting_ledger.mark(*key, SENT)
+
+    runner.process_meetings([ada, bob], workers=workers)
+    assert built == [['bob@example.com']]
+    assert runner.prepared == {'bob@example.com': (None, {'agent_email': 'bob@example.com'}, None)}
+
+
+class FakeSlackSummaries:
+    def __init__(self):
+        self.summaries = []
+        self.errors = []
+
+    def send_performance_summary(self, metrics, meeting_info, digest=None, ledger_key=None):
+        self.summaries.append(metrics)
+        return True
+
+    def send_error_notification(self, message):
+        self.errors.append(message)
+
+
+def test_prepared_outage_falls_back_to_a_recent_snapshot(bare_runner):
+    runner = bare_runner
+    runner.slack_bot = FakeSlackSummaries()
+    computed_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+    snapshot = {'computed_at': computed_at, 'metrics': {'total_tickets': 1}}
+    error = ZendeskAPIError('search/export.json', 'HTTP 503', 5)
+
+    result = runner.process_meeting(dict(meeting('ada'), minutes_until=30), prepared=(snapshot, None, error))
+    assert result is True
+    assert runner.slack_bot.summaries[0]['snapshot_computed_at'] == computed_at.isoformat()
+
+
+def test_prepared_failure_other_than_an_outage_is_raised(bare_runner):
+    runner = bare_runner
+    runner.slack_bot = FakeSlackSummaries()
+    with pytest.raises(TimeoutError):
+        runner.process_meeting(dict(meeting('ada'), minutes_until=30),
+                               prepared=(None, None, TimeoutError('timed out after 240s building the report')))
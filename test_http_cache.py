@@ -0,0 +1,102 @@
+import os
+import pytest
+import http_cache
+from http_cache import HttpCache
+from local_cache import save_json
+
+BODY = {'ticket': {'id': 1, 'subject': 'x' * 200}}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(http_cache, 'time', clock)
+    return clock
+
+
+def entry_size(tmp_path):
+    path = tmp_path / 'size.json'
+    save_json(str(path), BODY)
+    return os.path.getsize(path)
+
+
+def body_files(directory):
+    return sorted(name for name in os.listdir(directory) if name != 'index.json')
+
+
+def test_stored_bodies_are_returned_with_their_etag(tmp_path):
+    cache = HttpCache(10_000, str(tmp_path / 'http'))
+    key = cache.key('tickets/1.json')
+    assert cache.lookup(key) is None
+    cache.store(key, '"v1"', BODY)
+    assert cache.lookup(key) == ('"v1"', BODY)
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    cache = HttpCache(entry_size(tmp_path) * 2, str(tmp_path / 'http'))
+    first, second, third = (cache.key(f'tickets/{n}.json') for n in (1, 2, 3))
+    cache.store(first, '"1"', BODY)
+    cache.store(second, '"2"', BODY)
+    cache.record_hit(first)
+    cache.store(third, '"3"', BODY)
+
+    assert cache.lookup(second) is None
+    assert cache.lookup(first) is not None
+    assert cache.lookup(third) is not None
+    assert cache.get_stats()['evictions'] == 1
+    assert body_files(cache.directory) == sorted([f'{first}.json', f'{third}.json'])
+
+
+def test_index_is_written_on_save_and_reloaded(tmp_path):
+    directory = str(tmp_path / 'http')
+    cache = HttpCache(10_000, directory)
+    key = cache.key('groups/1/users.json', {'page[size]': 100})
+    cache.store(key, '"v1"', BODY)
+    assert not os.path.exists(os.path.join(directory, 'index.json'))
+    cache.close()
+
+    reloaded = HttpCache(10_000, directory)
+    assert reloaded.lookup(key) == ('"v1"', BODY)
+
+
+def test_bodies_missing_from_the_index_are_deleted_on_load(tmp_path):
+    directory = str(tmp_path / 'http')
+    cache = HttpCache(10_000, directory)
+    kept, orphan = cache.key('tickets/1.json'), cache.key('tickets/2.json')
+    cache.store(kept, '"1"', BODY)
+    cache.save()
+    cache.store(orphan, '"2"', BODY)
+
+    reloaded = HttpCache(10_000, directory)
+    assert body_files(directory) == [f'{kept}.json']
+    assert reloaded.lookup(orphan) is None
+
+
+def test_lost_body_is_a_miss(tmp_path):
+    cache = HttpCache(10_000, str(tmp_path / 'http'))
+    key = cache.key('tickets/1.json')
+    cache.store(key, '"1"', BODY)
+    os.remove(os.path.join(cache.directory, f'{key}.json'))
+    assert cache.lookup(key) is None
+    assert cache.get_stats()['entries'] == 0
+
+
+@pytest.mark.parametrize('endpoint, params, cacheable', [
+    ('tickets/show_many.json', {'ids': '1,2'}, True),
+    ('incremental/tickets/cursor.json', {'cursor': 'c'}, False),
+    ('search/export.json', {'query': 'status:open'}, False),
+    ('satisfaction_ratings.json', {'score': 'received', 'start_time': 1700000000}, False),
+    ('satisfaction_ratings.json', {'score': 'received', 'end_time': 1700000000}, False),
+])
+def test_streams_and_time_windows_are_not_cached(tmp_path, endpoint, params, cacheable):
+    cache = HttpCache(10_000, str(tmp_path / 'http'))
+    assert cache.is_cacheable(endpoint, params) is cacheable
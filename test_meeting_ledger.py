@@ -0,0 +1,102 @@
+import pytest
+from meeting_ledger import MeetingLedger, IN_PROGRESS, QUEUED, SENT, SKIPPED, FAILED
+
+KEY = ('event-1', '2026-10-16T10:00:00Z', 'agent@example.com')
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = MeetingLedger(str(tmp_path / 'ledger.sqlite'), max_attempts=3)
+    yield ledger
+    ledger.close()
+
+
+def test_claim_is_exclusive_while_in_progress(ledger):
+    assert ledger.claim(*KEY)
+    assert ledger.status_of(*KEY) == IN_PROGRESS
+    assert not ledger.claim(*KEY)
+
+
+def test_claim_is_exclusive_across_connections(tmp_path):
+    """Two runs sharing the file can't both claim a meeting"""
+    path = str(tmp_path / 'ledger.sqlite')
+    first, second = MeetingLedger(path), MeetingLedger(path)
+    try:
+        assert first.claim(*KEY)
+        assert not second.claim(*KEY)
+    finally:
+        first.close()
+        second.close()
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    ledger = MeetingLedger(str(tmp_path / 'ledger.sqlite'), lease_seconds=0)
+    try:
+        assert ledger.claim(*KEY)
+        assert ledger.claim(*KEY)
+    finally:
+        ledger.close()
+
+
+@pytest.mark.parametrize('status', [SENT, SKIPPED])
+def test_handled_meetings_are_never_reclaimed(ledger, status):
+    assert ledger.claim(*KEY)
+    ledger.mark(*KEY, status)
+    assert not ledger.claim(*KEY)
+    assert ledger.status_of(*KEY) == status
+
+
+def test_failed_meetings_are_retried_up_to_max_attempts(ledger):
+    for _ in range(3):
+        assert ledger.claim(*KEY)
+        ledger.mark(*KEY, FAILED)
+    assert not ledger.claim(*KEY)
+
+
+def test_queued_meeting_waits_for_delivery(tmp_path):
+    ledger = MeetingLedger(str(tmp_path / 'ledger.sqlite'), queued_lease_seconds=3600)
+    try:
+        assert ledger.claim(*KEY)
+        ledger.mark(*KEY, QUEUED, only_if=IN_PROGRESS)
+        assert not ledger.claim(*KEY)
+        ledger.mark(*KEY, SENT)
+        assert ledger.status_of(*KEY) == SENT
+    finally:
+        ledger.close()
+
+
+def test_queued_meeting_is_reclaimed_after_its_lease(tmp_path):
+    """The outbox never reported back (its file was lost)"""
+    ledger = MeetingLedger(str(tmp_path / 'ledger.sqlite'), queued_lease_seconds=0)
+    try:
+        assert ledger.claim(*KEY)
+        ledger.mark(*KEY, QUEUED)
+        assert ledger.claim(*KEY)
+    finally:
+        ledger.close()
+
+
+def test_conditional_mark_keeps_a_reported_outcome(ledger):
+    """Delivery can be reported before the runner records QUEUED"""
+    assert ledger.claim(*KEY)
+    ledger.mark(*KEY, SENT)
+    ledger.mark(*KEY, QUEUED, only_if=IN_PROGRESS)
+    assert ledger.status_of(*KEY) == SENT
+
+
+def test_moved_meeting_is_a_new_entry(ledger):
+    assert ledger.claim(*KEY)
+    ledger.mark(*KEY, SENT)
+    assert ledger.claim(KEY[0], '2026-10-17T10:00:00Z', KEY[2])
+
+
+def test_purge_expired_drops_old_rows(tmp_path):
+    ledger = MeetingLedger(str(tmp_path / 'ledger.sqlite'), ttl_days=1)
+    try:
+        assert ledger.claim(*KEY)
+        ledger.mark(*KEY, SENT)
+        ledger.ttl_seconds = -1
+        assert ledger.purge_expired() == 1
+        assert ledger.status_of(*KEY) is None
+    finally:
+        ledger.close()
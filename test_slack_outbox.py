@@ -0,0 +1,166 @@
+import threading
+import time
+import pytest
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web import SlackResponse
+from local_cache import save_json
+from slack_outbox import SlackOutbox, new_job, MAX_UNEXPECTED_ATTEMPTS
+
+
+def slack_error(error, status_code=200, headers=None):
+    response = SlackResponse(client=None, http_verb='POST', api_url='', req_args={},
+                             data={'ok': False, 'error': error}, headers=headers or {}, status_code=status_code)
+    return SlackApiError(error, response)
+
+
+class FakeSlack:
+    """send() stand-in: records each attempt and raises the queued failures for a text first"""
+
+    def __init__(self, failures=None):
+        self.failures = {text: list(errors) for text, errors in (failures or {}).items()}
+        self.attempts = []
+        self.lock = threading.Lock()
+
+    def __call__(self, job, checkpoint):
+        text = job['messages'][0]['text']
+        with self.lock:
+            self.attempts.append(text)
+            errors = self.failures.get(text)
+            error = errors.pop(0) if errors else None
+        if error is not None:
+            raise error
+        checkpoint({'posted': ['1.0']})
+
+
+@pytest.fixture
+def make_outbox(tmp_path):
+    finished = []
+
+    def make(send, **options):
+        options.setdefault('base_backoff', 0.01)
+        outbox = SlackOutbox(send, str(tmp_path / 'outbox.json'), lambda texts: {'text': '\n'.join(texts)},
+                             on_finished=lambda job, delivered: finished.append((job['messages'][0]['text'], delivered)),
+                             **options)
+        outbox.finished = finished
+        return outbox
+    return make
+
+
+def job(text, **options):
+    return new_job([{'text': text}], **options)
+
+
+def test_delivers_and_reports(make_outbox):
+    slack = FakeSlack()
+    outbox = make_outbox(slack)
+    outbox.enqueue(job('hello'))
+    assert outbox.flush(5) == 0
+    assert slack.attempts == ['hello']
+    assert outbox.finished == [('hello', True)]
+    assert outbox.stats['delivered'] == 1
+
+
+def test_retryable_errors_are_retried(make_outbox):
+    slack = FakeSlack({'hello': [slack_error('internal_error'), OSError('reset')]})
+    outbox = make_outbox(slack)
+    outbox.enqueue(job('hello'))
+    assert outbox.flush(5) == 0
+    assert slack.attempts == ['hello'] * 3
+    assert outbox.stats['retries'] == 2
+    assert outbox.finished == [('hello', True)]
+
+
+def test_permanent_error_drops_the_job(make_outbox):
+    slack = FakeSlack({'hello': [slack_error('channel_not_found')]})
+    outbox = make_outbox(slack)
+    outbox.enqueue(job('hello'))
+    assert outbox.flush(5) == 0
+    assert slack.attempts == ['hello']
+    assert outbox.stats['dropped'] == 1
+    assert outbox.finished == [('hello', False)]
+
+
+def test_rate_limit_pauses_delivery_for_retry_after(make_outbox):
+    slack = FakeSlack({'hello': [slack_error('ratelimited', 429, {'Retry-After': '1'})]})
+    outbox = make_outbox(slack)
+    outbox.enqueue(job('hello'))
+    started = time.monotonic()
+    assert outbox.flush(10) == 0
+    assert time.monotonic() - started >= 1
+    assert outbox.stats['rate_limited_seconds'] == 1
+    assert outbox.finished == [('hello', True)]
+
+
+def test_unexpected_errors_are_dropped_without_stopping_the_thread(make_outbox):
+    slack = FakeSlack({'broken': [KeyError('ts')] * MAX_UNEXPECTED_ATTEMPTS})
+    outbox = make_outbox(slack)
+    outbox.enqueue(job('broken'))
+    outbox.enqueue(job('fine'))
+    assert outbox.flush(5) == 0
+    assert slack.attempts.count('broken') == MAX_UNEXPECTED_ATTEMPTS
+    assert ('broken', False) in outbox.finished and ('fine', True) in outbox.finished
+    outbox.enqueue(job('later'))
+    assert outbox.flush(5) == 0
+    assert outbox.finished[-1] == ('later', True)
+
+
+def test_child_waits_for_its_parent(make_outbox):
+    """A reply queued with after= is only sent once the parent is delivered"""
+    slack = FakeSlack({'parent': [slack_error('internal_error')]})
+    outbox = make_outbox(slack)
+    parent = job('parent')
+    outbox.enqueue(parent)
+    outbox.enqueue(job('child', after=parent['id']))
+    assert outbox.flush(5) == 0
+    assert slack.attempts == ['parent', 'parent', 'child']
+
+
+def test_child_of_a_dropped_parent_is_still_sent(make_outbox):
+    slack = FakeSlack({'parent': [slack_error('channel_not_found')]})
+    outbox = make_outbox(slack)
+    parent = job('parent')
+    outbox.enqueue(parent)
+    outbox.enqueue(job('child', after=parent['id']))
+    assert outbox.flush(5) == 0
+    assert outbox.finished == [('parent', False), ('child', True)]
+
+
+def test_expired_jobs_from_an_earlier_run_are_dropped(make_outbox, tmp_path):
+    old = job('old', ledger_key=['event', 'start', 'agent@example.com'])
+    old['created_at'] = time.time() - 7200
+    fresh = job('fresh')
+    save_json(str(tmp_path / 'outbox.json'), {'jobs': [old, fresh], 'errors': []})
+    slack = FakeSlack()
+    outbox = make_outbox(slack, max_age_seconds=3600)
+    assert outbox.flush(5) == 0
+    assert slack.attempts == ['fresh']
+    assert outbox.finished == [('old', False), ('fresh', True)]
+
+
+def test_jobs_expire_while_being_retried(make_outbox):
+    slack = FakeSlack({'hello': [slack_error('internal_error')] * 100})
+    outbox = make_outbox(slack, max_age_seconds=0.3)
+    outbox.enqueue(job('hello'))
+    assert outbox.flush(5) == 0
+    assert outbox.finished == [('hello', False)]
+
+
+def test_undelivered_jobs_are_resent_by_the_next_run(make_outbox):
+    slack = FakeSlack({'hello': [slack_error('internal_error')] * 100})
+    outbox = make_outbox(slack, base_backoff=60, max_backoff=60)
+    outbox.enqueue(job('hello'))
+    assert outbox.flush(0.5) == 1
+
+    retry = FakeSlack()
+    outbox = make_outbox(retry)
+    assert outbox.flush(5) == 0
+    assert retry.attempts == ['hello']
+
+
+def test_errors_are_coalesced_into_one_post(make_outbox):
+    slack = FakeSlack()
+    outbox = make_outbox(slack, error_coalesce_seconds=60)
+    outbox.add_error('first')
+    outbox.add_error('second')
+    assert outbox.flush(5) == 0
+    assert slack.attempts == ['first\nsecond']
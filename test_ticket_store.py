@@ -0,0 +1,162 @@
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from ticket_store import TicketStore
+from zendesk_client import ZendeskAPIError
+
+AGENT = 42
+
+
+def iso(days_ago):
+    return (datetime.now(timezone.utc) - timedelta(days=days_ago)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def ticket(ticket_id, status='open', created=1, updated=1, assignee=AGENT):
+    return {'id': ticket_id, 'assignee_id': assignee, 'status': status, 'subject': f'Ticket {ticket_id}',
+            'created_at': iso(created), 'updated_at': iso(updated)}
+
+
+class FakeClient:
+    """Answers the store's exports from queued pages and records every request"""
+
+    def __init__(self):
+        self.pages = {'incremental/tickets/cursor.json': [], 'incremental/ticket_events.json': [],
+                      'satisfaction_ratings.json': []}
+        self.requests = []
+        self.searches = []
+        self.search_results = []
+
+    def fetch(self, endpoint, params=None):
+        self.requests.append((endpoint, dict(params or {})))
+        pages = self.pages[endpoint]
+        if pages:
+            return pages.pop(0)
+        if endpoint == 'incremental/tickets/cursor.json':
+            return {'tickets': [], 'after_cursor': None, 'end_of_stream': True}
+        if endpoint == 'incremental/ticket_events.json':
+            return {'ticket_events': [], 'end_time': int(time.time()), 'end_of_stream': True}
+        return {'satisfaction_ratings': [], 'meta': {'has_more': False}}
+
+    def iter_search(self, query, strict=False):
+        self.searches.append(query)
+        result = self.search_results.pop(0) if self.search_results else []
+        if isinstance(result, Exception):
+            raise result
+        return iter(result)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TicketStore(str(tmp_path / 'tickets.sqlite'))
+    yield store
+    store.close()
+
+
+def test_first_sync_reads_the_window_and_later_syncs_resume_from_the_cursor(store):
+    client = FakeClient()
+    client.pages['incremental/tickets/cursor.json'] = [
+        {'tickets': [ticket(1)], 'after_cursor': 'c1', 'end_of_stream': False},
+        {'tickets': [ticket(2)], 'after_cursor': 'c2', 'end_of_stream': True}
+    ]
+    assert store.sync(client)
+    ticket_requests = [params for endpoint, params in client.requests if endpoint == 'incremental/tickets/cursor.json']
+    assert 'start_time' in ticket_requests[0]
+    assert ticket_requests[1] == {'cursor': 'c1'}
+    assert {t['id'] for t in store.agent_tickets(AGENT)} == {1, 2}
+
+    client.requests.clear()
+    assert store.sync(client)
+    assert client.requests[0] == ('incremental/tickets/cursor.json', {'cursor': 'c2'})
+
+
+def test_failed_export_leaves_the_store_unsynced(store):
+    client = FakeClient()
+    client.pages['incremental/ticket_events.json'] = [None]
+    assert not store.sync(client)
+    assert store.last_synced_at() == 0
+
+
+def test_deleted_tickets_are_removed(store):
+    client = FakeClient()
+    client.pages['incremental/tickets/cursor.json'] = [
+        {'tickets': [ticket(1), ticket(2)], 'after_cursor': 'c1', 'end_of_stream': True}
+    ]
+    store.sync(client)
+    client.pages['incremental/tickets/cursor.json'] = [
+        {'tickets': [dict(ticket(2), status='deleted')], 'after_cursor': 'c2', 'end_of_stream': True}
+    ]
+    store.sync(client)
+    assert [t['id'] for t in store.agent_tickets(AGENT)] == [1]
+
+
+def test_comments_and_ratings_are_stored(store):
+    client = FakeClient()
+    client.pages['incremental/tickets/cursor.json'] = [
+        {'tickets': [ticket(1, status='solved')], 'after_cursor': 'c1', 'end_of_stream': True}
+    ]
+    client.pages['incremental/ticket_events.json'] = [{
+        'ticket_events': [{'ticket_id': 1, 'created_at': iso(1), 'child_events': [
+            {'id': 10, 'event_type': 'Comment', 'author_id': AGENT, 'public': True},
+            {'id': 11, 'event_type': 'Comment', 'author_id': AGENT, 'public': False},
+            {'id': 12, 'event_type': 'Comment', 'author_id': 7, 'public': True}
+        ]}],
+        'end_time': int(time.time()), 'end_of_stream': True
+    }]
+    client.pages['satisfaction_ratings.json'] = [{
+        'satisfaction_ratings': [{'ticket_id': 1, 'assignee_id': AGENT, 'score': 'good', 'updated_at': iso(1)}],
+        'meta': {'has_more': False}
+    }]
+    assert store.sync(client)
+    assert store.comment_counts(AGENT, [1]) == (1, 1)
+    assert store.rating_for(1)['score'] == 'good'
+
+
+def test_agent_is_seeded_once_after_a_complete_search(store):
+    client = FakeClient()
+    store.sync(client)
+    client.search_results = [[ticket(5, created=40, updated=20)]]
+    assert store.seed_agent(client, AGENT) == 1
+    assert store.seed_agent(client, AGENT) == 0
+    assert len(client.searches) == 1
+    assert client.searches[0].startswith(f'assignee:{AGENT} updated<=')
+    assert [t['id'] for t in store.agent_tickets(AGENT)] == [5]
+
+
+def test_failed_seed_is_retried(store):
+    client = FakeClient()
+    store.sync(client)
+    client.search_results = [ZendeskAPIError('search/export.json', 'a continuation page failed', 1), []]
+    with pytest.raises(ZendeskAPIError):
+        store.seed_agent(client, AGENT)
+    assert store.seed_agent(client, AGENT) == 0
+    assert len(client.searches) == 2
+    store.seed_agent(client, AGENT)
+    assert len(client.searches) == 2
+
+
+def test_agents_are_not_seeded_before_the_first_sync(store):
+    client = FakeClient()
+    assert store.seed_agent(client, AGENT) == 0
+    assert client.searches == []
+
+
+def test_prune_keeps_unsolved_tickets_and_recent_rows(store):
+    client = FakeClient()
+    client.pages['incremental/tickets/cursor.json'] = [{'tickets': [
+        ticket(1, status='solved', created=90, updated=60),
+        ticket(2, status='open', created=90, updated=60),
+        ticket(3, status='solved', created=3, updated=2)
+    ], 'after_cursor': 'c1', 'end_of_stream': True}]
+    client.pages['incremental/ticket_events.json'] = [{
+        'ticket_events': [
+            {'ticket_id': 1, 'created_at': iso(60), 'child_events': [
+                {'id': 10, 'event_type': 'Comment', 'author_id': AGENT, 'public': True}]},
+            {'ticket_id': 3, 'created_at': iso(2), 'child_events': [
+                {'id': 11, 'event_type': 'Comment', 'author_id': AGENT, 'public': True}]}
+        ],
+        'end_time': int(time.time()), 'end_of_stream': True
+    }]
+    assert store.sync(client)
+    assert store.comment_counts(AGENT, [1, 3]) == (1, 0)
+    ids = {t['id'] for t in store.agent_tickets(AGENT)}
+    assert 2 in ids and 3 in ids and 1 not in ids
@@ -0,0 +1,69 @@
+import pytest
+import user_directory
+from user_directory import UserDirectory
+
+AGENT = {'id': 42, 'name': 'Agent', 'email': 'agent@example.com', 'role': 'agent', 'phone': 'unused'}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(user_directory, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def make_directory(tmp_path):
+    def make(results, **options):
+        calls = []
+
+        def lookup(email):
+            calls.append(email)
+            return results.pop(0)
+        return UserDirectory(lookup, 3600, str(tmp_path / 'users.json'), **options), calls
+    return make
+
+
+def test_found_users_are_reused_until_the_ttl(clock, make_directory):
+    directory, calls = make_directory([AGENT, AGENT])
+    assert directory.get('agent@example.com')['id'] == 42
+    clock.now += 3599
+    directory.get('agent@example.com')
+    assert len(calls) == 1
+    clock.now += 2
+    directory.get('agent@example.com')
+    assert len(calls) == 2
+
+
+def test_misses_are_only_reused_briefly(clock, make_directory):
+    directory, calls = make_directory([None, AGENT], negative_ttl_seconds=60)
+    assert directory.get('agent@example.com') is None
+    assert directory.get('agent@example.com') is None
+    assert len(calls) == 1
+    clock.now += 61
+    assert directory.get('agent@example.com')['id'] == 42
+    assert len(calls) == 2
+
+
+def test_index_is_shared_with_the_next_process(clock, make_directory, tmp_path):
+    directory, _ = make_directory([AGENT])
+    directory.get('agent@example.com')
+    reloaded, calls = make_directory([])
+    assert reloaded.get('agent@example.com') == {'id': 42, 'name': 'Agent', 'email': 'agent@example.com', 'role': 'agent'}
+    assert calls == []
+
+
+def test_prefetched_users_expire_with_the_ttl(clock, make_directory):
+    directory, calls = make_directory([None])
+    assert directory.prefetch('group:1', [AGENT]) == 1
+    assert directory.get_cached('agent@example.com')[0]
+    clock.now += 3601
+    assert directory.get_cached('agent@example.com') == (False, None)
@@ -37,7 +37,10 @@ def test_zendesk_connection():
         print("\n🔍 Testing Zendesk API Connection...")
         client = ZendeskClient()
         
-        # The connection test is already called in __init__
+        # The client verifies lazily, so run the explicit health check
+        if not client.health_check():
+            print("❌ Zendesk health check failed")
+            return False
         print("✅ Zendesk client initialized successfully")
         return True
         
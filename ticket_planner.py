@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+# Zendesk statuses below "solved" in the search API's ordering
+UNSOLVED_STATUSES = ('new', 'open', 'pending', 'hold')
+
+
+def plan_agent_searches(user_id, now=None):
+    """Return the minimal set of ticket search queries covering every metric section
+
+    - Weekly, solved-for-CSAT and SLA sections all need tickets touched in the
+      last week; created>=week_ago is a subset of updated>=week_ago, so one
+      query covers all three.
+    - Aged tickets are unsolved and created over two weeks ago. Those updated
+      in the last week are already in the first query, so the second query
+      only asks for the rest and the two result sets don't overlap.
+    """
+    week_ago, two_weeks_ago = _window_dates(now)
+    return [
+        f'assignee:{user_id} updated>={week_ago}',
+        f'assignee:{user_id} created<={two_weeks_ago} updated<{week_ago} status<solved',
+    ]
+
+
+def _window_dates(now=None):
+    now = now or datetime.now()
+    week_ago = (now - timedelta(days=7)).strftime('%Y-%m-%d')
+    two_weeks_ago = (now - timedelta(days=14)).strftime('%Y-%m-%d')
+    return week_ago, two_weeks_ago
+
+
+def _date(timestamp):
+    # Zendesk timestamps are ISO 8601; the searches compare whole days
+    return (timestamp or '')[:10]
+
+
+class AgentTicketSet:
+    """One agent's tickets, fetched once and split locally into metric sections"""
+
+    def __init__(self, user_id, tickets, now=None):
+        self.user_id = user_id
+        self.fetched_at = datetime.now()
+        self.week_ago, self.two_weeks_ago = _window_dates(now)
+
+        by_id = {}
+        for ticket in tickets:
+            by_id[ticket['id']] = ticket
+        self.tickets = list(by_id.values())
+
+    def weekly(self):
+        """Tickets created in the last 7 days, newest first"""
+        tickets = [t for t in self.tickets if _date(t.get('created_at')) >= self.week_ago]
+        return sorted(tickets, key=lambda t: t.get('created_at') or '', reverse=True)
+
+    def aged(self):
+        """Unsolved tickets created over 2 weeks ago, oldest first"""
+        tickets = [
+            t for t in self.tickets
+            if _date(t.get('created_at')) <= self.two_weeks_ago
+            and t.get('status') in UNSOLVED_STATUSES
+        ]
+        return sorted(tickets, key=lambda t: t.get('created_at') or '')
+
+    def recently_updated(self):
+        """Tickets updated in the last 7 days, most recently updated first"""
+        tickets = [t for t in self.tickets if _date(t.get('updated_at')) >= self.week_ago]
+        return sorted(tickets, key=lambda t: t.get('updated_at') or '', reverse=True)
+
+    def solved_recently(self):
+        """Tickets solved and updated in the last 7 days (CSAT candidates)"""
+        return [t for t in self.recently_updated() if t.get('status') == 'solved']
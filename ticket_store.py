@@ -0,0 +1,323 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from ticket_planner import UNSOLVED_STATUSES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY,
+    assignee_id INTEGER,
+    status TEXT,
+    priority TEXT,
+    subject TEXT,
+    url TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_assignee_updated ON tickets (assignee_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_assignee_created ON tickets (assignee_id, created_at);
+
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY,
+    ticket_id INTEGER,
+    author_id INTEGER,
+    public INTEGER,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_comments_author_ticket ON comments (author_id, ticket_id);
+CREATE INDEX IF NOT EXISTS idx_comments_created ON comments (created_at);
+
+CREATE TABLE IF NOT EXISTS satisfaction_ratings (
+    ticket_id INTEGER PRIMARY KEY,
+    assignee_id INTEGER,
+    score TEXT,
+    comment TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- Written by earlier versions and never read
+DROP TABLE IF EXISTS ticket_metrics;
+"""
+
+TICKET_COLUMNS = ('id', 'assignee_id', 'status', 'priority', 'subject', 'url', 'created_at', 'updated_at')
+
+
+class TicketStore:
+    """Indexed local copy of tickets, comments and CSAT.
+
+    sync() pulls only what changed since the previous sync, using the
+    cursor-based incremental ticket export plus the ticket events and
+    satisfaction ratings exports, so report queries are local index lookups
+    whatever the ticket volume. SLA state is time-dependent and is still
+    read live. Unsolved tickets older than the first export window are
+    loaded per agent by seed_agent(), so only agents that are reported on
+    are seeded. Rows that fell out of every metrics window are pruned after
+    each sync, so the database doesn't grow with the account's history.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _get_state(self, key):
+        row = self._conn.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_state(self, key, value):
+        self._conn.execute(
+            'INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (key, str(value))
+        )
+
+    def last_synced_at(self):
+        """Unix time of the last completed sync, or 0 if never synced"""
+        with self._lock:
+            value = self._get_state('last_synced_at')
+        return float(value) if value else 0.0
+
+    def sync(self, client, initial_days=8, csat_days=30):
+        """Bring the store up to date through `client`
+
+        The first sync reads the last `initial_days` of activity; later
+        syncs resume from the stored cursors. Returns False if an export
+        isn't available. `client` is a ZendeskClient; only its public
+        fetch() and iter_search() are used.
+        """
+        started = time.time()
+        counts = {'tickets': 0, 'comments': 0, 'ratings': 0}
+        first_sync = self.last_synced_at() == 0
+
+        ok = (
+            self._sync_tickets(client, started - initial_days * 86400, counts)
+            and self._sync_comments(client, started - initial_days * 86400, counts)
+            and self._sync_ratings(client, started - csat_days * 86400, counts)
+        )
+        if not ok:
+            return False
+
+        with self._lock, self._conn:
+            if first_sync:
+                # Tickets changed since then are in the export; seed_agent() loads older ones
+                self._set_state('seed_before', started - initial_days * 86400)
+            self._set_state('last_synced_at', started)
+        pruned = self.prune(started - max(initial_days, csat_days) * 86400, started - csat_days * 86400)
+        print(f"🗄️ Ticket store synced in {time.time() - started:.1f}s: "
+              f"{counts['tickets']} tickets, {counts['comments']} comments, {counts['ratings']} ratings changed"
+              f"{f', {pruned} old rows pruned' if pruned else ''}")
+        return True
+
+    def prune(self, before, ratings_before):
+        """Delete solved tickets and comments last changed before `before`, and older ratings
+
+        Unsolved tickets are kept whatever their age; the aged-ticket section
+        reports them. Returns how many rows were deleted.
+        """
+        cutoff = _iso(before)
+        placeholders = ', '.join('?' for _ in UNSOLVED_STATUSES)
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                f"DELETE FROM tickets WHERE updated_at < ? AND status NOT IN ({placeholders})",
+                (cutoff, *UNSOLVED_STATUSES)
+            ).rowcount
+            deleted += self._conn.execute('DELETE FROM comments WHERE created_at < ?', (cutoff,)).rowcount
+            deleted += self._conn.execute(
+                'DELETE FROM satisfaction_ratings WHERE updated_at < ?', (_iso(ratings_before),)
+            ).rowcount
+        return deleted
+
+    def seed_agent(self, client, user_id):
+        """Load an agent's unsolved tickets last changed before the export window
+
+        Runs one search the first time an agent is reported on; the aged
+        ticket section needs these and the incremental export never returns
+        them. The agent only counts as seeded once the whole search came
+        back; a failed page raises ZendeskAPIError and the next call tries
+        again. Returns how many tickets were loaded.
+        """
+        key = f'seeded_agent:{user_id}'
+        with self._lock:
+            seed_before = self._get_state('seed_before')
+            if seed_before is None or self._get_state(key):
+                return 0
+
+        # A day of overlap with the export absorbs the account's time zone
+        date = datetime.fromtimestamp(float(seed_before) + 86400, tz=timezone.utc).strftime('%Y-%m-%d')
+        tickets = list(client.iter_search(f'assignee:{user_id} updated<={date} status<solved', strict=True))
+        self._upsert_tickets(tickets)
+        with self._lock, self._conn:
+            self._set_state(key, time.time())
+        print(f"🗄️ Ticket store seeded {len(tickets)} older unsolved tickets for user {user_id}")
+        return len(tickets)
+
+    def _sync_tickets(self, client, default_start, counts):
+        with self._lock:
+            cursor = self._get_state('tickets_cursor')
+        params = {}
+        if cursor:
+            params['cursor'] = cursor
+        else:
+            params['start_time'] = int(default_start)
+
+        while True:
+            result = client.fetch('incremental/tickets/cursor.json', params)
+            if result is None:
+                return False
+
+            tickets = result.get('tickets', [])
+            self._upsert_tickets(tickets)
+            counts['tickets'] += len(tickets)
+
+            after_cursor = result.get('after_cursor')
+            with self._lock, self._conn:
+                if after_cursor:
+                    self._set_state('tickets_cursor', after_cursor)
+            if result.get('end_of_stream') or not after_cursor:
+                return True
+            params = {'cursor': after_cursor}
+
+    def _sync_comments(self, client, default_start, counts):
+        with self._lock:
+            start_time = int(float(self._get_state('ticket_events_start_time') or default_start))
+        params = {'start_time': start_time, 'include': 'comment_events'}
+
+        # The export rejects start times less than a minute old
+        if time.time() - start_time < 60:
+            return True
+
+        while True:
+            result = client.fetch('incremental/ticket_events.json', params)
+            if result is None:
+                return False
+
+            rows = []
+            for event in result.get('ticket_events', []):
+                for child in event.get('child_events', []):
+                    if child.get('event_type') != 'Comment' or child.get('id') is None:
+                        continue
+                    rows.append((
+                        child['id'], event.get('ticket_id'), child.get('author_id'),
+                        1 if child.get('public', True) else 0, event.get('created_at')
+                    ))
+            end_time = result.get('end_time')
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO comments (id, ticket_id, author_id, public, created_at) '
+                    'VALUES (?, ?, ?, ?, ?)', rows
+                )
+                if end_time:
+                    self._set_state('ticket_events_start_time', int(end_time))
+            counts['comments'] += len(rows)
+
+            if result.get('end_of_stream') or not end_time or int(end_time) <= params['start_time']:
+                return True
+            params['start_time'] = int(end_time)
+
+    def _sync_ratings(self, client, default_start, counts):
+        with self._lock:
+            start_time = int(float(self._get_state('ratings_start_time') or default_start))
+        started = int(time.time())
+
+        params = {'score': 'received', 'start_time': start_time, 'page[size]': 100}
+        while True:
+            result = client.fetch('satisfaction_ratings.json', params)
+            if result is None:
+                return False
+
+            rows = [
+                (rating['ticket_id'], rating.get('assignee_id'), rating.get('score'),
+                 rating.get('comment', ''), rating.get('updated_at'))
+                for rating in result.get('satisfaction_ratings', [])
+                if rating.get('ticket_id') is not None
+            ]
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO satisfaction_ratings '
+                    '(ticket_id, assignee_id, score, comment, updated_at) VALUES (?, ?, ?, ?, ?)', rows
+                )
+            counts['ratings'] += len(rows)
+
+            meta = result.get('meta', {})
+            if not meta.get('has_more') or not meta.get('after_cursor'):
+                break
+            params['page[after]'] = meta['after_cursor']
+
+        with self._lock, self._conn:
+            self._set_state('ratings_start_time', started)
+        return True
+
+    def _upsert_tickets(self, tickets):
+        live = []
+        deleted = []
+        for ticket in tickets:
+            if ticket.get('status') == 'deleted':
+                deleted.append((ticket['id'],))
+            else:
+                live.append(tuple(ticket.get(column) for column in TICKET_COLUMNS))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO tickets ({', '.join(TICKET_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in TICKET_COLUMNS)})", live
+            )
+            self._conn.executemany('DELETE FROM tickets WHERE id = ?', deleted)
+
+    def agent_tickets(self, user_id, now=None):
+        """Tickets matching the planner's searches for an agent
+
+        Same coverage as plan_agent_searches(): touched in the last week, or
+        unsolved and created over two weeks ago.
+        """
+        now = now or datetime.now()
+        week_ago = (now - timedelta(days=7)).strftime('%Y-%m-%d')
+        # Dates compare as strings; the next day's prefix makes the bound inclusive
+        two_weeks_ago_end = (now - timedelta(days=13)).strftime('%Y-%m-%d')
+        placeholders = ', '.join('?' for _ in UNSOLVED_STATUSES)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(TICKET_COLUMNS)} FROM tickets WHERE assignee_id = ? AND ("
+                f"updated_at >= ? OR (created_at < ? AND status IN ({placeholders})))",
+                (user_id, week_ago, two_weeks_ago_end, *UNSOLVED_STATUSES)
+            ).fetchall()
+        # Leave missing fields out so callers' .get() defaults still apply
+        return [{key: row[key] for key in row.keys() if row[key] is not None} for row in rows]
+
+    def comment_counts(self, author_id, ticket_ids):
+        """Return (external, internal) comment counts by an author on the given tickets"""
+        ticket_ids = list(ticket_ids)
+        if not ticket_ids:
+            return 0, 0
+        placeholders = ', '.join('?' for _ in ticket_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT public, COUNT(*) AS total FROM comments "
+                f"WHERE author_id = ? AND ticket_id IN ({placeholders}) GROUP BY public",
+                (author_id, *ticket_ids)
+            ).fetchall()
+        counts = {row['public']: row['total'] for row in rows}
+        return counts.get(1, 0), counts.get(0, 0)
+
+    def rating_for(self, ticket_id):
+        """Return the stored satisfaction rating for a ticket, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT score, comment, assignee_id FROM satisfaction_ratings WHERE ticket_id = ?',
+                (ticket_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+
+def _iso(timestamp):
+    # Zendesk timestamps are UTC ISO 8601, so they compare as strings
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -0,0 +1,110 @@
+import threading
+import time
+from local_cache import cache_path, load_json, save_json
+
+# Only the fields the bot needs are persisted
+USER_FIELDS = ('id', 'name', 'email', 'role')
+# "No such user" is only reused within one check, so a newly added agent is found on the next
+NEGATIVE_TTL_SECONDS = 60
+
+
+class UserDirectory:
+    """Resolves agent emails to Zendesk users.
+
+    Lookups are memoized in memory and persisted to an on-disk index, both
+    expiring after ttl_seconds, so the same agent is resolved at most once
+    per TTL instead of once per metric section. Misses are only memoized for
+    negative_ttl_seconds. prefetch() loads a whole group of agents from a
+    single paginated listing.
+    """
+
+    def __init__(self, lookup, ttl_seconds, filename='zendesk_users.json',
+                 negative_ttl_seconds=NEGATIVE_TTL_SECONDS):
+        self._lookup = lookup
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.path = cache_path(filename)
+        self._memo = {}  # email -> (user, expires_at)
+        self._lock = threading.Lock()
+        data = load_json(self.path, {}) or {}
+        self._index = data.get('users', {})
+        self._groups = data.get('groups', {})
+        self.hits = 0
+        self.lookups = 0
+
+    def _is_fresh(self, cached_at):
+        return time.time() - cached_at < self.ttl_seconds
+
+    def get(self, email):
+        """Return the user for a sanitized email, or None if Zendesk has no match"""
+        found, user = self.get_cached(email)
+        if found:
+            return user
+        return self.remember(email, self._lookup(email))
+
+    def get_cached(self, email):
+        """Return (found, user) without calling Zendesk"""
+        with self._lock:
+            memo = self._memo.get(email)
+            if memo and time.time() < memo[1]:
+                self.hits += 1
+                return True, memo[0]
+
+            entry = self._index.get(email)
+            if entry and self._is_fresh(entry.get('cached_at', 0)):
+                self.hits += 1
+                self._memo[email] = (entry['user'], entry['cached_at'] + self.ttl_seconds)
+                return True, entry['user']
+            self._memo.pop(email, None)
+        return False, None
+
+    def remember(self, email, user):
+        """Record the result of a live lookup and return the cached user"""
+        with self._lock:
+            self.lookups += 1
+            if not user:
+                self._memo[email] = (None, time.time() + self.negative_ttl_seconds)
+                return None
+            user = self._slim(user)
+            self._memo[email] = (user, time.time() + self.ttl_seconds)
+            self._store(email, user)
+            self._save()
+            return user
+
+    def prefetch(self, key, users):
+        """Index every user from a bulk listing (e.g. one agent group)
+
+        Skipped when the same listing was loaded within the TTL. `users` may
+        be a lazy iterator; it is only consumed when a refresh is needed.
+        """
+        with self._lock:
+            if self._is_fresh(self._groups.get(key, 0)):
+                return 0
+
+        users = list(users)
+        count = 0
+        with self._lock:
+            for user in users:
+                email = (user.get('email') or '').strip().lower()
+                if not email:
+                    continue
+                self._store(email, user)
+                self._memo[email] = (self._slim(user), time.time() + self.ttl_seconds)
+                count += 1
+            self._groups[key] = time.time()
+            self._save()
+        return count
+
+    def _slim(self, user):
+        return {field: user.get(field) for field in USER_FIELDS}
+
+    def _store(self, email, user):
+        self._index[email] = {'user': self._slim(user), 'cached_at': time.time()}
+
+    def _save(self):
+        # Drop expired entries so the index doesn't grow without bound
+        self._index = {
+            email: entry for email, entry in self._index.items()
+            if self._is_fresh(entry.get('cached_at', 0))
+        }
+        save_json(self.path, {'users': self._index, 'groups': self._groups})
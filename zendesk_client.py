@@ -1,56 +1,332 @@
 import requests
 import re
-from datetime import datetime, timedelta
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from urllib.parse import urlparse
-from config import ZENDESK_BASE_URL, ZENDESK_EMAIL, ZENDESK_API_TOKEN
+from requests.adapters import HTTPAdapter
+from config import (
+    ZENDESK_BASE_URL, ZENDESK_EMAIL, ZENDESK_API_TOKEN,
+    ZENDESK_POOL_CONNECTIONS, ZENDESK_POOL_MAXSIZE,
+    ZENDESK_RATE_LIMIT_PER_MINUTE, ZENDESK_MAX_RETRIES, ZENDESK_RETRY_BUDGET_SECONDS,
+    ZENDESK_USER_CACHE_TTL_HOURS, ZENDESK_COMMENT_ACTIVITY_MAX_AGE_MINUTES,
+    ZENDESK_MAX_CONCURRENCY, ZENDESK_CSAT_INDEX_MAX_AGE_MINUTES, ZENDESK_CSAT_WINDOW_DAYS,
+    ZENDESK_CAPABILITY_TTL_HOURS, ZENDESK_TICKET_STORE, ZENDESK_TICKET_STORE_SYNC_MINUTES,
+    ZENDESK_HTTP_CACHE, ZENDESK_HTTP_CACHE_MAX_MB, ZENDESK_AUTH_CHECK_TTL_HOURS,
+    ZENDESK_FALLBACK_RETRY_MINUTES
+)
+from rate_limiter import RateLimitGovernor, RETRYABLE_STATUS_CODES
+from user_directory import UserDirectory
+from comment_activity import CommentActivity
+from csat_index import CsatIndex
+from endpoint_capabilities import EndpointCapabilities
+from ticket_store import TicketStore
+from http_cache import HttpCache
+from credential_cache import CredentialCache, credential_fingerprint
+from local_cache import cache_path
+from ticket_planner import AgentTicketSet, plan_agent_searches
+from agent_metrics import (
+    build_weekly_metrics, format_old_tickets, count_author_comments,
+    csat_entry, sla_breach
+)
+
+class ZendeskAPIError(Exception):
+    """Raised when Zendesk keeps failing after the retry budget is spent"""
+    
+    def __init__(self, endpoint, reason, attempts):
+        self.endpoint = endpoint
+        self.reason = reason
+        self.attempts = attempts
+        super().__init__(f"Zendesk request to {endpoint} failed after {attempts} attempts ({reason})")
 
 class ZendeskClient:
-    def __init__(self):
+    def __init__(self, pool_connections=None, pool_maxsize=None, governor=None, max_concurrency=None,
+                 ticket_store=None, http_cache=None):
         self.base_url = ZENDESK_BASE_URL
         self.auth = (f"{ZENDESK_EMAIL}/token", ZENDESK_API_TOKEN)
         self.headers = {
             'Content-Type': 'application/json',
             'User-Agent': 'ZendeskSlackbot/1.0'
         }
-        # Test connection on initialization
-        self.test_connection()
+        self.session = self._create_session(
+            pool_connections or ZENDESK_POOL_CONNECTIONS,
+            pool_maxsize or ZENDESK_POOL_MAXSIZE
+        )
+        self.governor = governor or RateLimitGovernor(
+            requests_per_minute=ZENDESK_RATE_LIMIT_PER_MINUTE,
+            max_retries=ZENDESK_MAX_RETRIES,
+            retry_budget=ZENDESK_RETRY_BUDGET_SECONDS
+        )
+        self.user_directory = UserDirectory(
+            self._search_user_by_email,
+            ttl_seconds=ZENDESK_USER_CACHE_TTL_HOURS * 3600
+        )
+        self._comment_activity = None
+        self._comment_activity_refreshed = 0
+        # A bulk path that failed uses its fallback until this time, then is tried again
+        # (so one transient error doesn't disable it for the life of a daemon)
+        self._comment_activity_unavailable_until = 0
+        self._comment_activity_lock = threading.Lock()
+        self._credential_fingerprint = credential_fingerprint(self.base_url, ZENDESK_EMAIL, ZENDESK_API_TOKEN)
+        self.capabilities = EndpointCapabilities(ZENDESK_CAPABILITY_TTL_HOURS * 3600, self._credential_fingerprint)
+        if http_cache is None and ZENDESK_HTTP_CACHE:
+            http_cache = HttpCache(int(ZENDESK_HTTP_CACHE_MAX_MB * 1024 * 1024))
+        self.http_cache = http_cache
+        self._csat_index = None
+        self._csat_index_refreshed = 0
+        self._csat_index_unavailable_until = 0
+        self._csat_index_lock = threading.Lock()
+        self._ticket_sets = {}
+        self._ticket_sets_lock = threading.Lock()
+        if ticket_store is None and ZENDESK_TICKET_STORE:
+            ticket_store = TicketStore(cache_path('zendesk_tickets.sqlite'))
+        self.ticket_store = ticket_store
+        self._ticket_store_unavailable_until = 0
+        self._ticket_store_lock = threading.Lock()
+        self.max_concurrency = max_concurrency or ZENDESK_MAX_CONCURRENCY
+        self._fetch_executor = None
+        self._fetch_executor_lock = threading.Lock()
+        # The connection is verified lazily on first use, and skipped while a
+        # recent successful check for these credentials is cached
+        self.credential_cache = CredentialCache(ZENDESK_AUTH_CHECK_TTL_HOURS * 3600)
+        self._connection_checked = False
+        self._connection_lock = threading.Lock()
+    
+    def _create_session(self, pool_connections, pool_maxsize):
+        """Create a keep-alive session with auth and headers set once"""
+        session = requests.Session()
+        session.auth = self.auth
+        session.headers.update(self.headers)
+        session.verify = True
+        # pool_block keeps threads waiting for a free connection instead of
+        # opening (and then discarding) extra ones beyond pool_maxsize
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=True
+        )
+        session.mount('https://', self._adapter)
+        session.mount('http://', self._adapter)
+        return session
+    
+    def get_connection_stats(self):
+        """Return request/connection counts and the keep-alive reuse ratio"""
+        pools = self._adapter.poolmanager.pools
+        requests_made = 0
+        connections_opened = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_made += pool.num_requests
+            connections_opened += pool.num_connections
+        
+        reuse_ratio = 0.0
+        if requests_made:
+            reuse_ratio = max(0.0, 1 - connections_opened / requests_made)
+        
+        return {
+            'requests': requests_made,
+            'connections': connections_opened,
+            'reuse_ratio': round(reuse_ratio, 3)
+        }
+    
+    def close(self):
+        """Close pooled connections and the fetch thread pool, and save the HTTP cache index"""
+        if self._fetch_executor is not None:
+            self._fetch_executor.shutdown(wait=False)
+        if self.ticket_store is not None:
+            self.ticket_store.close()
+        if self.http_cache is not None:
+            self.http_cache.close()
+        self.session.close()
     
     def _make_request(self, endpoint, params=None):
         """Make authenticated request to Zendesk API"""
+        if not self._connection_checked and endpoint != 'users/me.json':
+            self.ensure_connection()
+        
+        # Endpoints this account doesn't support are skipped without a request
+        if self.capabilities.is_unsupported(endpoint, params):
+            return None
+        
+        cache_key = None
+        cached = None
+        request_headers = None
+        if self.http_cache is not None and self.http_cache.is_cacheable(endpoint, params):
+            cache_key = self.http_cache.key(endpoint, params)
+            cached = self.http_cache.lookup(cache_key)
+            if cached:
+                request_headers = {'If-None-Match': cached[0]}
+        
         try:
             url = f"{self.base_url}/{endpoint}"
-            response = requests.get(
-                url, 
-                auth=self.auth, 
-                headers=self.headers, 
-                params=params,
-                timeout=30,
-                verify=True
-            )
+            response = self._get_with_retries(endpoint, url, params, request_headers)
+            if response.status_code == 304 and cached:
+                self.http_cache.record_hit(cache_key)
+                return cached[1]
             response.raise_for_status()
-            return response.json()
+            body = response.json()
+            etag = response.headers.get('ETag')
+            if cache_key and etag:
+                self.http_cache.store(cache_key, etag, body, revalidated=cached is not None)
+            return body
         except requests.exceptions.RequestException as e:
-            # Check if this is a known optional endpoint (SLA policies)
-            is_optional_endpoint = (
-                'sla_policies.json' in endpoint and 
-                hasattr(e, 'response') and 
-                e.response is not None and 
-                e.response.status_code == 404
-            )
-            
-            if not is_optional_endpoint:
-                # Enhanced error logging for debugging (skip logging for optional endpoints)
-                print(f"Error making request to Zendesk API: {type(e).__name__}")
-                print(f"URL: {self.base_url}/{endpoint}")
-                print(f"Status Code: {getattr(e.response, 'status_code', 'N/A')}")
-                if hasattr(e, 'response') and e.response is not None:
-                    try:
-                        error_details = e.response.json()
-                        print(f"Error Details: {error_details}")
-                    except:
-                        print(f"Response Text: {e.response.text}")
+            details = None
+            if getattr(e, 'response', None) is not None:
+                try:
+                    details = f"Error Details: {e.response.json()}"
+                except ValueError:
+                    details = f"Response Text: {e.response.text}"
+            self.record_failed_request(endpoint, params, getattr(e.response, 'status_code', None),
+                                       type(e).__name__, details)
             return None
     
+    def record_failed_request(self, endpoint, params, status_code, error_name, details=None):
+        """Handle a request Zendesk rejected: forget bad credentials, remember
+        unsupported optional endpoints and log everything else
+        
+        Shared with AsyncZendeskClient so both clients react the same way.
+        """
+        if status_code == 401:
+            self.credential_cache.forget(self._credential_fingerprint)
+        if self.capabilities.record_failure(endpoint, status_code, params):
+            return  # Unsupported endpoints are logged once by record_failure
+        
+        # Enhanced error logging for debugging
+        print(f"Error making request to Zendesk API: {error_name}")
+        print(f"URL: {self.base_url}/{endpoint}")
+        print(f"Status Code: {status_code if status_code is not None else 'N/A'}")
+        if details:
+            print(details)
+    
+    def _get_with_retries(self, endpoint, url, params, request_headers=None):
+        """GET through the rate-limit governor, retrying 429/5xx and network errors.
+        
+        Raises ZendeskAPIError once the retry count or time budget is spent so
+        that throttling is never mistaken for "no data".
+        """
+        governor = self.governor
+        deadline = time.monotonic() + governor.retry_budget
+        attempt = 0
+        while True:
+            governor.acquire()
+            status_code = None
+            response_headers = None
+            try:
+                response = self.session.get(url, params=params, headers=request_headers, timeout=30)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                reason = type(e).__name__
+            else:
+                governor.observe(response.status_code, response.headers)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+                status_code = response.status_code
+                response_headers = response.headers
+                reason = f"HTTP {status_code}"
+            
+            delay = governor.retry_delay(attempt, status_code, response_headers)
+            if attempt >= governor.max_retries or time.monotonic() + delay > deadline:
+                raise ZendeskAPIError(endpoint, reason, attempt + 1)
+            
+            print(f"⏳ Zendesk {reason} on {endpoint} - retrying in {delay:.1f}s "
+                  f"({attempt + 1}/{governor.max_retries})")
+            governor.record_retry()
+            time.sleep(delay)
+            attempt += 1
+    
+    def _paginate(self, endpoint, items_key, params=None, page_size=100):
+        """Yield items from a cursor-paginated list endpoint, page by page
+        
+        Nothing is yielded if the first page isn't available; a later page
+        that fails raises ZendeskAPIError so a partial list is never taken
+        for the whole one.
+        """
+        params = dict(params or {})
+        params['page[size]'] = page_size
+        while True:
+            result = self._make_request(endpoint, params)
+            if not result:
+                if 'page[after]' in params:
+                    raise ZendeskAPIError(endpoint, 'a continuation page failed', 1)
+                return
+            for item in result.get(items_key, []):
+                yield item
+            meta = result.get('meta', {})
+            if not meta.get('has_more') or not meta.get('after_cursor'):
+                return
+            params['page[after]'] = meta['after_cursor']
+    
+    def map_concurrently(self, func, items):
+        """Run func(item) for every item on the shared bounded thread pool
+        
+        Returns one dict per item, in input order, with either 'result' or
+        'error' set; every item is waited for, so callers see all failures.
+        The pool is shared by every caller on this client, so the
+        concurrency cap (and the rate-limit governor every request passes
+        through) is a budget for the whole run, not per agent.
+        """
+        items = list(items)
+        if not items:
+            return []
+        
+        with self._fetch_executor_lock:
+            if self._fetch_executor is None:
+                self._fetch_executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency,
+                    thread_name_prefix='zendesk-fetch'
+                )
+            executor = self._fetch_executor
+        
+        futures = [executor.submit(func, item) for item in items]
+        outcomes = []
+        for item, future in zip(items, futures):
+            try:
+                outcomes.append({'item': item, 'result': future.result(), 'error': None})
+            except Exception as e:
+                outcomes.append({'item': item, 'result': None, 'error': e})
+        return outcomes
+    
+    def fetch(self, endpoint, params=None):
+        """GET one endpoint; returns the JSON body, or None if Zendesk rejected the request"""
+        return self._make_request(endpoint, params)
+    
+    def fetch_many(self, endpoints):
+        """GET several endpoints concurrently; results come back in input order"""
+        return self.map_concurrently(self._make_request, endpoints)
+    
+    def _raise_on_failures(self, description, outcomes):
+        """Log per-ticket failures from a concurrent fetch, then raise the first one
+        
+        A section built from only the tickets that succeeded would look
+        complete but be wrong, so one failed ticket fails the section.
+        ZendeskAPIError (retries exhausted) reaches process_meeting, which
+        reports the outage or falls back to a precomputed snapshot.
+        """
+        failed = [outcome for outcome in outcomes if outcome['error'] is not None]
+        if failed:
+            print(f"❌ {len(failed)}/{len(outcomes)} {description} requests failed:")
+            for outcome in failed:
+                print(f"   - {outcome['item']}: {outcome['error']}")
+            raise failed[0]['error']
+    
+    def ensure_connection(self):
+        """Verify the credentials once per process unless a recent check is cached"""
+        with self._connection_lock:
+            if self._connection_checked:
+                return
+            if not self.credential_cache.is_verified(self._credential_fingerprint):
+                self.test_connection()
+            self._connection_checked = True
+    
+    def health_check(self):
+        """Explicitly verify the connection, bypassing the cached result"""
+        with self._connection_lock:
+            ok = self.test_connection()
+            self._connection_checked = True
+        return ok
+    
     def test_connection(self):
         """Test basic connection to Zendesk API"""
         try:
@@ -59,9 +335,11 @@ class ZendeskClient:
             if result:
                 user = result.get('user', {})
                 print(f"✅ Zendesk connection successful - authenticated as: {user.get('name', 'Unknown')} ({user.get('email', 'No email')})")
+                self.credential_cache.record(self._credential_fingerprint)
                 return True
             else:
                 print("❌ Zendesk connection test failed")
+                self.credential_cache.forget(self._credential_fingerprint)
                 return False
         except Exception as e:
             print(f"❌ Zendesk connection test error: {e}")
@@ -94,41 +372,306 @@ class ZendeskClient:
             return None
     
     def get_user_by_email(self, email):
-        """Find user by email address"""
+        """Find user by email address (served from the user directory cache)"""
         try:
             sanitized_email = self._sanitize_email(email)
-            params = {'query': f'email:{sanitized_email}'}
-            result = self._make_request('users/search.json', params)
-            
-            if result and result.get('count', 0) > 0:
-                return result['users'][0]
-            return None
+            return self.user_directory.get(sanitized_email)
         except ValueError as e:
             print(f"Invalid email provided: {type(e).__name__}")
             return None
     
-    def get_agent_tickets_last_week(self, agent_email):
-        """Get tickets assigned to agent in the last 7 days"""
+    def _search_user_by_email(self, sanitized_email):
+        """Look up a single user with the search API"""
+        params = {'query': f'email:{sanitized_email}'}
+        result = self._make_request('users/search.json', params)
+        
+        if result and result.get('count', 0) > 0:
+            return result['users'][0]
+        return None
+    
+    def prefetch_group_users(self, group_id):
+        """Load every agent in a group into the user directory with one paginated pass"""
+        group_id = str(group_id).strip()
+        if not group_id.isdigit():
+            print("Invalid Zendesk group ID for user prefetch")
+            return 0
+        
+        users = self._paginate(f'groups/{group_id}/users.json', 'users')
+        count = self.user_directory.prefetch(f'group:{group_id}', users)
+        if count:
+            print(f"👥 Prefetched {count} Zendesk users from group {group_id}")
+        return count
+    
+    def iter_search(self, query, max_results=None, page_size=100, object_type='ticket', strict=False):
+        """Stream search results page by page from the cursor-based export endpoint
+        
+        Unlike search.json this isn't capped at 1000 results. The next page
+        is requested in the background while the caller works through the
+        current one, and nothing beyond max_results is downloaded. A page
+        after the first that fails raises ZendeskAPIError; with `strict` a
+        failed first page raises too, so no results really means no matches.
+        """
+        if max_results is not None:
+            page_size = max(1, min(page_size, max_results))
+        params = {'query': query, 'filter[type]': object_type, 'page[size]': page_size}
+        
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='zendesk-search')
+        future = executor.submit(self._make_request, 'search/export.json', dict(params))
+        yielded = 0
+        try:
+            while future is not None:
+                result = future.result()
+                future = None
+                if not result:
+                    if 'page[after]' in params:
+                        raise ZendeskAPIError('search/export.json', 'a continuation page failed', 1)
+                    if strict:
+                        raise ZendeskAPIError('search/export.json', 'the search was rejected', 1)
+                    return
+                
+                results = result.get('results', [])
+                meta = result.get('meta', {})
+                wants_more = max_results is None or yielded + len(results) < max_results
+                if meta.get('has_more') and meta.get('after_cursor') and wants_more:
+                    params['page[after]'] = meta['after_cursor']
+                    future = executor.submit(self._make_request, 'search/export.json', dict(params))
+                
+                for item in results:
+                    yield item
+                    yielded += 1
+                    if max_results is not None and yielded >= max_results:
+                        return
+        finally:
+            if future is not None:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
+    def _search_tickets(self, query, max_results=None):
+        """Run a ticket search and return every matching ticket"""
+        return list(self.iter_search(query, max_results=max_results))
+    
+    def sync_ticket_store(self, force=False):
+        """Pull changes into the local ticket store if the last sync is stale
+        
+        Returns True when metrics can be answered from the store.
+        """
+        if self.ticket_store is None:
+            return False
+        with self._ticket_store_lock:
+            if time.time() < self._ticket_store_unavailable_until:
+                return False
+            age = time.time() - self.ticket_store.last_synced_at()
+            if force or age >= ZENDESK_TICKET_STORE_SYNC_MINUTES * 60:
+                if not self.ticket_store.sync(self):
+                    print(f"⚠️ Ticket store sync failed - using live Zendesk queries for the next "
+                          f"{ZENDESK_FALLBACK_RETRY_MINUTES:g} minutes")
+                    self._ticket_store_unavailable_until = time.time() + ZENDESK_FALLBACK_RETRY_MINUTES * 60
+                    return False
+            return True
+    
+    def get_agent_ticket_set(self, agent_email, max_age_seconds=300):
+        """Fetch an agent's tickets once with the planned searches and reuse them
+        
+        Every metric section reads from the returned AgentTicketSet, so the
+        weekly, aged, CSAT and SLA sections no longer run their own searches.
+        """
         user = self.get_user_by_email(agent_email)
         if not user:
             return None
         
         user_id = user['id']
-        week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+        cached = self.cached_ticket_set(user_id, max_age_seconds)
+        if cached:
+            return cached
         
-        params = {
-            'query': f'assignee:{user_id} created>={week_ago} type:ticket',
-            'sort_by': 'created_at',
-            'sort_order': 'desc'
-        }
+        if self.sync_ticket_store():
+            self.ticket_store.seed_agent(self, user_id)
+            tickets = self.ticket_store.agent_tickets(user_id)
+        else:
+            tickets = []
+            for query in plan_agent_searches(user_id):
+                tickets.extend(self._search_tickets(query))
+        
+        return self.store_ticket_set(AgentTicketSet(user_id, tickets))
+    
+    def cached_ticket_set(self, user_id, max_age_seconds=300):
+        """The agent's ticket set from an earlier fetch or snapshot, if it's recent enough"""
+        with self._ticket_sets_lock:
+            cached = self._ticket_sets.get(user_id)
+        if cached and (datetime.now() - cached.fetched_at).total_seconds() < max_age_seconds:
+            return cached
+        return None
+    
+    def store_ticket_set(self, ticket_set):
+        """Keep a fetched ticket set for the other sections of the agent's report"""
+        with self._ticket_sets_lock:
+            self._ticket_sets[ticket_set.user_id] = ticket_set
+        return ticket_set
+    
+    def fetch_agent_tickets(self, agent_email, as_of=None):
+        """Run an agent's planned searches with the date windows they will have at `as_of`
+        
+        Used to precompute a meeting's tickets ahead of time; `as_of` is a
+        naive local datetime like the planner's. Returns None if the agent
+        isn't found.
+        """
+        user = self.get_user_by_email(agent_email)
+        if not user:
+            return None
+        
+        tickets = []
+        for query in plan_agent_searches(user['id'], now=as_of):
+            tickets.extend(self._search_tickets(query))
+        return tickets
+    
+    def seed_agent_ticket_set(self, agent_email, tickets, since=None):
+        """Install a precomputed ticket list as the agent's ticket set
+        
+        If `since` (an aware datetime) is given, tickets updated after it are
+        fetched with one search and merged in first. Returns the number of
+        changed tickets, or None if the agent isn't found.
+        """
+        user = self.get_user_by_email(agent_email)
+        if not user:
+            return None
         
-        result = self._make_request('search.json', params)
-        return result.get('results', []) if result else []
+        user_id = user['id']
+        changed = []
+        if since is not None:
+            since_utc = since.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+            changed = self._search_tickets(f'assignee:{user_id} updated>{since_utc}')
+        
+        by_id = {ticket['id']: ticket for ticket in tickets}
+        for ticket in changed:
+            by_id[ticket['id']] = ticket
+        
+        self.store_ticket_set(AgentTicketSet(user_id, list(by_id.values())))
+        return len(changed)
+    
+    def get_agent_tickets_last_week(self, agent_email):
+        """Get tickets assigned to agent in the last 7 days"""
+        ticket_set = self.get_agent_ticket_set(agent_email)
+        if not ticket_set:
+            return None
+        return ticket_set.weekly()
     
     def get_ticket_comments(self, ticket_id):
         """Get all comments for a specific ticket"""
-        result = self._make_request(f'tickets/{ticket_id}/comments.json')
-        return result.get('comments', []) if result else []
+        return list(self._paginate(f'tickets/{ticket_id}/comments.json', 'comments'))
+    
+    def get_comment_activity(self, days=8):
+        """Get comment counts for all authors from the incremental ticket events export
+        
+        The stream is read once and shared by every agent processed in this
+        run; later calls only read events added since the last refresh.
+        Returns None if the export isn't available (it requires an admin token).
+        """
+        with self._comment_activity_lock:
+            if time.time() < self._comment_activity_unavailable_until:
+                return None
+            
+            max_age = ZENDESK_COMMENT_ACTIVITY_MAX_AGE_MINUTES * 60
+            activity = self._comment_activity
+            if activity and time.time() - self._comment_activity_refreshed < max_age:
+                return activity
+            # The export rejects start times less than a minute old
+            if activity and time.time() - activity.cursor < 60:
+                return activity
+            
+            if activity is None:
+                activity = CommentActivity(time.time() - days * 86400)
+            
+            if not self._stream_ticket_events(activity):
+                print(f"⚠️ Incremental ticket events unavailable - counting comments per ticket for the next "
+                      f"{ZENDESK_FALLBACK_RETRY_MINUTES:g} minutes")
+                self._comment_activity_unavailable_until = time.time() + ZENDESK_FALLBACK_RETRY_MINUTES * 60
+                self._comment_activity = None
+                return None
+            
+            # A long-lived client keeps refreshing the same stream; drop what left the window
+            activity.prune(time.time() - days * 86400)
+            self._comment_activity = activity
+            self._comment_activity_refreshed = time.time()
+            return activity
+    
+    def _stream_ticket_events(self, activity):
+        """Read ticket events with comments from activity.cursor to now"""
+        params = {'start_time': activity.cursor, 'include': 'comment_events'}
+        while True:
+            result = self._make_request('incremental/ticket_events.json', params)
+            if result is None:
+                return False
+            
+            activity.add_events(result.get('ticket_events', []))
+            end_time = result.get('end_time')
+            if end_time:
+                activity.cursor = max(activity.cursor, int(end_time))
+            
+            if result.get('end_of_stream') or not end_time or int(end_time) <= params['start_time']:
+                return True
+            params['start_time'] = int(end_time)
+    
+    def _count_comments_per_ticket(self, user_id, tickets):
+        """Fallback comment count with one comments request per ticket"""
+        outcomes = self.map_concurrently(self.get_ticket_comments, [ticket['id'] for ticket in tickets])
+        self._raise_on_failures('ticket comments', outcomes)
+        
+        return count_author_comments(user_id, [outcome['result'] for outcome in outcomes])
+    
+    def get_csat_index(self):
+        """Get satisfaction ratings for the CSAT window from one paginated listing
+        
+        Shared by the positive and negative sections of every agent. Returns
+        None if the listing isn't available (CSAT disabled or no admin token)
+        or a later page failed, since a partial index would miss ratings.
+        """
+        with self._csat_index_lock:
+            if time.time() < self._csat_index_unavailable_until:
+                return None
+            
+            max_age = ZENDESK_CSAT_INDEX_MAX_AGE_MINUTES * 60
+            if self._csat_index and time.time() - self._csat_index_refreshed < max_age:
+                return self._csat_index
+            
+            index = CsatIndex(time.time() - ZENDESK_CSAT_WINDOW_DAYS * 86400)
+            params = {'score': 'received', 'start_time': index.start_time, 'page[size]': 100}
+            while True:
+                page = self._make_request('satisfaction_ratings.json', params)
+                if page is None:
+                    where = 'unavailable' if 'page[after]' not in params else 'failed partway through'
+                    print(f"⚠️ Satisfaction ratings listing {where} - fetching ratings per ticket for the next "
+                          f"{ZENDESK_FALLBACK_RETRY_MINUTES:g} minutes")
+                    self._csat_index_unavailable_until = time.time() + ZENDESK_FALLBACK_RETRY_MINUTES * 60
+                    return None
+                index.add_ratings(page.get('satisfaction_ratings', []))
+                meta = page.get('meta', {})
+                if not meta.get('has_more') or not meta.get('after_cursor'):
+                    break
+                params['page[after]'] = meta['after_cursor']
+            
+            self._csat_index = index
+            self._csat_index_refreshed = time.time()
+            return index
+    
+    def get_ticket_slas(self, ticket_ids):
+        """Get side-loaded SLA state for tickets, 100 per show_many request
+        
+        Returns {ticket_id: slas}; tickets without SLA policies map to {}.
+        """
+        ticket_ids = list(ticket_ids)
+        chunks = [ticket_ids[i:i + 100] for i in range(0, len(ticket_ids), 100)]
+        outcomes = self.map_concurrently(self._show_many_with_slas, chunks)
+        self._raise_on_failures('ticket SLA', outcomes)
+        
+        slas = {}
+        for outcome in outcomes:
+            for ticket in (outcome['result'] or {}).get('tickets', []):
+                slas[ticket['id']] = ticket.get('slas') or {}
+        return slas
+    
+    def _show_many_with_slas(self, ticket_ids):
+        params = {'ids': ','.join(str(ticket_id) for ticket_id in ticket_ids), 'include': 'slas'}
+        return self._make_request('tickets/show_many.json', params)
     
     def get_agent_performance_metrics(self, agent_email):
         """Get comprehensive performance metrics for an agent"""
@@ -141,21 +684,7 @@ class ZendeskClient:
             return None
         
         user_id = user.get('id')
-        
-        metrics = {
-            'total_tickets': len(tickets),
-            'urgent_tickets': [],
-            'on_hold_tickets': [],
-            'solved_tickets': 0,
-            'internal_comments': 0,
-            'external_comments': 0,
-            'agent_name': user.get('name', 'Unknown'),
-            'agent_email': agent_email,
-            'old_tickets': [],
-            'positive_csat': [],
-            'negative_csat': [],
-            'sla_breaches': []
-        }
+        metrics = build_weekly_metrics(user, agent_email, tickets)
         
         # Get additional metrics
         metrics['old_tickets'] = self.get_old_tickets(agent_email)
@@ -163,173 +692,83 @@ class ZendeskClient:
         metrics['negative_csat'] = self.get_csat_tickets(agent_email, positive=False)
         metrics['sla_breaches'] = self.get_sla_breach_tickets(agent_email)
         
-        for ticket in tickets:
-            # Count solved tickets
-            if ticket.get('status') == 'solved':
-                metrics['solved_tickets'] += 1
-            
-            # Track urgent tickets
-            if ticket.get('priority') == 'urgent':
-                metrics['urgent_tickets'].append({
-                    'id': ticket['id'],
-                    'subject': ticket.get('subject', 'No subject'),
-                    'status': ticket.get('status'),
-                    'url': ticket.get('url')
-                })
-            
-            # Track on-hold tickets
-            if ticket.get('status') == 'hold':
-                metrics['on_hold_tickets'].append({
-                    'id': ticket['id'],
-                    'subject': ticket.get('subject', 'No subject'),
-                    'url': ticket.get('url')
-                })
-            
-            # Count comments (internal vs external)
-            comments = self.get_ticket_comments(ticket['id'])
-            for comment in comments:
-                if comment.get('author_id') == user_id:
-                    if comment.get('public', True):
-                        metrics['external_comments'] += 1
-                    else:
-                        metrics['internal_comments'] += 1
+        # Count comments (internal vs external) on last week's tickets
+        ticket_ids = [ticket['id'] for ticket in tickets]
+        if self.sync_ticket_store():
+            external, internal = self.ticket_store.comment_counts(user_id, ticket_ids)
+        else:
+            activity = self.get_comment_activity()
+            if activity is not None:
+                external, internal = activity.counts_for(user_id, ticket_ids)
+            else:
+                external, internal = self._count_comments_per_ticket(user_id, tickets)
+        metrics['external_comments'] = external
+        metrics['internal_comments'] = internal
         
         return metrics
     
-    def get_tickets_by_status(self, agent_email, status):
+    def get_tickets_by_status(self, agent_email, status, max_results=None):
         """Get tickets by specific status for an agent"""
         user = self.get_user_by_email(agent_email)
         if not user:
             return []
         
         user_id = user.get('id')
-        params = {
-            'query': f'assignee:{user_id} status:{status} type:ticket'
-        }
-        
-        result = self._make_request('search.json', params)
-        return result.get('results', []) if result else []
+        return self._search_tickets(f'assignee:{user_id} status:{status}', max_results=max_results)
     
     def get_old_tickets(self, agent_email):
         """Get tickets assigned to agent that are over 2 weeks old"""
-        user = self.get_user_by_email(agent_email)
-        if not user:
+        ticket_set = self.get_agent_ticket_set(agent_email)
+        if not ticket_set:
             return []
         
-        user_id = user.get('id')
-        two_weeks_ago = (datetime.now() - timedelta(days=14)).strftime('%Y-%m-%d')
-        
-        params = {
-            'query': f'assignee:{user_id} created<={two_weeks_ago} type:ticket status<solved status<closed',
-            'sort_by': 'created_at',
-            'sort_order': 'asc'
-        }
-        
-        result = self._make_request('search.json', params)
-        tickets = result.get('results', []) if result else []
-        
-        old_tickets = []
-        for ticket in tickets:
-            old_tickets.append({
-                'id': ticket['id'],
-                'subject': ticket.get('subject', 'No subject'),
-                'status': ticket.get('status'),
-                'priority': ticket.get('priority'),
-                'created_at': ticket.get('created_at'),
-                'url': ticket.get('url')
-            })
-        
-        return old_tickets
+        return format_old_tickets(ticket_set.aged())
     
     def get_csat_tickets(self, agent_email, positive=True):
         """Get tickets with CSAT ratings (positive or negative) in the last week"""
-        user = self.get_user_by_email(agent_email)
-        if not user:
+        ticket_set = self.get_agent_ticket_set(agent_email)
+        if not ticket_set:
             return []
         
-        user_id = user.get('id')
-        week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-        
-        # Get tickets solved by this agent in the last week
-        params = {
-            'query': f'assignee:{user_id} updated>={week_ago} status:solved type:ticket',
-            'sort_by': 'updated_at',
-            'sort_order': 'desc'
-        }
-        
-        result = self._make_request('search.json', params)
-        tickets = result.get('results', []) if result else []
+        # Tickets solved by this agent in the last week
+        tickets = ticket_set.solved_recently()
         
         csat_tickets = []
-        for ticket in tickets:
-            # Get satisfaction ratings for this ticket
-            satisfaction = self._make_request(f'tickets/{ticket["id"]}/satisfaction_rating.json')
-            
-            if satisfaction and satisfaction.get('satisfaction_rating'):
-                rating = satisfaction['satisfaction_rating']
-                score = rating.get('score')
-                
-                # Determine if this is positive or negative rating
-                is_positive = score in ['good', 'great']
-                is_negative = score in ['bad', 'not_good']
-                
-                if (positive and is_positive) or (not positive and is_negative):
-                    csat_tickets.append({
-                        'id': ticket['id'],
-                        'subject': ticket.get('subject', 'No subject'),
-                        'score': score,
-                        'comment': rating.get('comment', ''),
-                        'url': ticket.get('url')
-                    })
+        if self.sync_ticket_store():
+            ratings = [self.ticket_store.rating_for(ticket['id']) for ticket in tickets]
+        else:
+            index = self.get_csat_index()
+            if index is not None:
+                ratings = [index.rating_for(ticket['id']) for ticket in tickets]
+            else:
+                # Get satisfaction ratings ticket by ticket
+                outcomes = self.fetch_many([f'tickets/{ticket["id"]}/satisfaction_rating.json' for ticket in tickets])
+                self._raise_on_failures('satisfaction rating', outcomes)
+                ratings = [(outcome['result'] or {}).get('satisfaction_rating') for outcome in outcomes]
+        
+        for ticket, rating in zip(tickets, ratings):
+            entry = csat_entry(ticket, rating, positive)
+            if entry:
+                csat_tickets.append(entry)
         
         return csat_tickets
     
     def get_sla_breach_tickets(self, agent_email):
         """Get tickets with SLA breaches for an agent"""
-        user = self.get_user_by_email(agent_email)
-        if not user:
+        ticket_set = self.get_agent_ticket_set(agent_email)
+        if not ticket_set:
             return []
         
-        user_id = user.get('id')
-        week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-        
-        # Get tickets assigned to this agent in the last week
-        params = {
-            'query': f'assignee:{user_id} updated>={week_ago} type:ticket',
-            'sort_by': 'updated_at',
-            'sort_order': 'desc'
-        }
+        # Tickets assigned to this agent and updated in the last week
+        tickets = ticket_set.recently_updated()
         
-        result = self._make_request('search.json', params)
-        tickets = result.get('results', []) if result else []
+        # SLA state for every ticket comes side-loaded with show_many
+        slas = self.get_ticket_slas(ticket['id'] for ticket in tickets)
         
         breach_tickets = []
         for ticket in tickets:
-            # Try to get SLA policy information for this ticket
-            sla_policies = self._make_request(f'tickets/{ticket["id"]}/sla_policies.json')
-            
-            # Skip SLA processing if endpoint doesn't exist (404 error)
-            if not sla_policies:
-                continue
-                
-            if sla_policies.get('sla_policies'):
-                for policy in sla_policies['sla_policies']:
-                    policy_metrics = policy.get('policy_metrics', [])
-                    
-                    for metric in policy_metrics:
-                        if metric.get('breach') and metric.get('business_hours') is not None:
-                            # Calculate breach time
-                            breach_time = metric.get('business_hours', 0)
-                            breach_minutes = int(breach_time / 60) if breach_time else 0
-                            
-                            breach_tickets.append({
-                                'id': ticket['id'],
-                                'subject': ticket.get('subject', 'No subject'),
-                                'metric': metric.get('metric'),
-                                'breach_minutes': breach_minutes,
-                                'breach_hours': round(breach_minutes / 60, 1) if breach_minutes > 60 else 0,
-                                'url': ticket.get('url')
-                            })
-                            break  # Only report first breach per ticket
+            breach = sla_breach(ticket, slas.get(ticket['id']))
+            if breach:
+                breach_tickets.append(breach)
         
         return breach_tickets